@@ -0,0 +1,286 @@
+"""End-to-end performance benchmark of the analysis pipeline.
+
+Usage::
+
+    python benchmark.py --json results.json
+    python benchmark.py --sizes 1920x1080 --densities high --repeat 20 \
+        --identify-latency 0.8 --fetch-latency 0.5 --item-latency 0.05
+    python benchmark.py --json new.json --compare results.json
+
+Runs headless on synthetic screenshots of every ``--sizes`` x
+``--densities`` combination, with :class:`mock_openai_client.LatencyMock`
+standing in for the API. Each scenario times these stages, in milliseconds:
+
+``decode``
+    decoding the captured PNG (the capture itself needs a desktop)
+``diff``
+    comparing the frame with the previous one and finding the changed box
+``encode``
+    preprocessing and encoding the frame for upload
+``identify``
+    :func:`openai_client.identify_image` with the mock, incl. the level index
+``analyze``
+    the whole :func:`openai_client.analyze_image` pipeline incl. fetching
+``cache_write``/``cache_load``/``cache_lookup``
+    writing the fetched items to a fresh SQLite store, loading it and
+    looking the terms up again
+``parse_words``
+    turning the result into display entries
+``markdown``
+    rendering the markdown of every entry
+
+Results are written as JSON together with the settings they were measured
+with. ``--compare`` prints the p50 change of every stage against an earlier
+result file and exits with status 1 when a stage got slower than
+``--tolerance`` allows.
+"""
+import argparse
+import base64
+import io
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from PIL import Image, ImageDraw
+
+import imaging
+import openai_client
+import telemetry
+from cache import SqliteTermStore, TermCache, get_term_cache, items_by_term, set_store
+from config import load_language_config
+from display import item_to_markdown, parse_words
+from mock_openai_client import LatencyMock
+
+DEFAULT_SIZES = ["1280x720", "1920x1080", "2560x1440"]
+# Density name -> (text lines on screen, identified terms)
+DENSITIES: Dict[str, Tuple[int, int]] = {
+    "low": (4, 5),
+    "medium": (12, 20),
+    "high": (30, 60),
+}
+
+
+def synthetic_screenshot(width: int, height: int, lines: int, seed: int = 0) -> Image.Image:
+    """Return a screen-like image with ``lines`` rows of glyph-sized marks."""
+    rng = random.Random(seed)
+    img = Image.new("RGB", (width, height), (rng.randint(20, 60),) * 3)
+    draw = ImageDraw.Draw(img)
+    glyph = max(12, height // 45)
+    margin = width // 20
+    top = height - margin - lines * glyph * 3 // 2
+    draw.rectangle((margin // 2, max(0, top - glyph), width - margin // 2, height - margin // 2), fill=(240, 240, 235))
+    for row in range(lines):
+        y = top + row * glyph * 3 // 2
+        x = margin
+        end = width - margin - rng.randint(0, width // 3)
+        while x + glyph < end:
+            if rng.random() > 0.1:
+                shade = rng.randint(0, 80)
+                draw.rectangle((x + 1, y + 1, x + glyph - 2, y + glyph - 2), fill=(shade, shade, shade))
+            x += glyph
+    return img
+
+
+def _changed_copy(img: Image.Image, seed: int) -> Image.Image:
+    """Return ``img`` with its last text line redrawn, like a new subtitle."""
+    rng = random.Random(seed)
+    changed = img.copy()
+    draw = ImageDraw.Draw(changed)
+    glyph = max(12, img.height // 45)
+    y = img.height - img.width // 20 - glyph * 3 // 2
+    for x in range(img.width // 20, img.width // 2, glyph):
+        shade = rng.randint(0, 80)
+        draw.rectangle((x + 1, y + 1, x + glyph - 2, y + glyph - 2), fill=(shade, shade, shade))
+    return changed
+
+
+def _png_b64(img: Image.Image) -> str:
+    buf = io.BytesIO()
+    img.save(buf, format="PNG")
+    return base64.b64encode(buf.getvalue()).decode("utf-8")
+
+
+def _summary(samples: List[float]) -> Dict[str, float]:
+    ordered = sorted(samples)
+    return {
+        "count": len(ordered),
+        "mean": sum(ordered) / len(ordered),
+        "p50": ordered[len(ordered) // 2],
+        "p90": ordered[min(len(ordered) - 1, int(len(ordered) * 0.9))],
+        "max": ordered[-1],
+    }
+
+
+def _timed(timings: Dict[str, List[float]], stage: str, func: Callable, *args, **kwargs):
+    started = time.perf_counter()
+    result = func(*args, **kwargs)
+    timings.setdefault(stage, []).append((time.perf_counter() - started) * 1000)
+    return result
+
+
+def run_scenario(
+    size: str,
+    density: str,
+    mock: LatencyMock,
+    *,
+    repeat: int,
+    target_lang: str,
+    report_lang: str,
+    workdir: str,
+    seed: int = 0,
+) -> Dict[str, Dict[str, float]]:
+    """Time every stage ``repeat`` times on one synthetic screenshot."""
+    width, height = (int(v) for v in size.lower().split("x"))
+    lines, terms = DENSITIES[density]
+    mock.terms = terms
+    previous = synthetic_screenshot(width, height, lines, seed)
+    capture_b64 = _png_b64(_changed_copy(previous, seed + 1))
+    levels = load_language_config().get(target_lang, [])
+    timings: Dict[str, List[float]] = {}
+
+    for i in range(repeat):
+        img = _timed(timings, "decode", imaging.decode_image, capture_b64)
+        _timed(timings, "diff", lambda: (imaging.image_diff_ratio(previous, img), imaging.changed_bbox(previous, img)))
+        img_b64, _ = _timed(timings, "encode", imaging.encode_image, img, imaging.options_for(""), record=False)
+        _timed(
+            timings, "identify", openai_client.identify_image,
+            "", target_lang, report_lang, "",
+            img_b64=img_b64, identify_func=mock.identify, use_identify_cache=False,
+        )
+        result = _timed(
+            timings, "analyze", openai_client.analyze_image,
+            "", target_lang, report_lang, "",
+            img_b64=img_b64, identify_func=mock.identify, fetch_func=mock.fetch, use_identify_cache=False,
+        )
+
+        details: Dict[str, List[Dict]] = {"vocabulary": [], "grammar": []}
+        for info in result.values():
+            for kind in details:
+                details[kind].extend(item for item in info.get(kind, []) if isinstance(item, dict))
+        items = items_by_term(details)
+        store = SqliteTermStore(os.path.join(workdir, f"{size}-{density}-{i}.sqlite3"))
+        writer = TermCache(store)
+        for kind in items:
+            writer.put(kind, items[kind])
+        _timed(timings, "cache_write", writer.close)
+        reader = TermCache(store)
+        _timed(timings, "cache_load", reader.load)
+        _timed(timings, "cache_lookup", lambda: [reader.get_many(kind, list(items[kind])) for kind in items])
+        reader.close()
+        store.close()
+
+        entries = _timed(timings, "parse_words", parse_words, result, levels)
+        _timed(timings, "markdown", lambda: [item_to_markdown(e) for e in entries if e.data])
+    return {stage: _summary(samples) for stage, samples in timings.items()}
+
+
+def _git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except Exception:
+        return None
+
+
+def compare(results: Dict, baseline: Dict, tolerance: float) -> List[str]:
+    """Print the p50 change of every stage and return the stages slower than ``tolerance``."""
+    regressions = []
+    for scenario, stages in results["scenarios"].items():
+        old_stages = baseline.get("scenarios", {}).get(scenario)
+        if not old_stages:
+            continue
+        for stage, summary in stages.items():
+            old = old_stages.get(stage)
+            if not old or not old["p50"]:
+                continue
+            change = summary["p50"] / old["p50"] - 1
+            flag = ""
+            if change > tolerance:
+                flag = "  <-- slower"
+                regressions.append(f"{scenario} {stage}")
+            print(f"{scenario:>22} {stage:>13}: {old['p50']:9.2f} -> {summary['p50']:9.2f} ms ({change:+.0%}){flag}")
+    return regressions
+
+
+def main(argv: List[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the analysis pipeline with a latency-injecting mock API.")
+    parser.add_argument("--sizes", nargs="+", default=DEFAULT_SIZES, help="screenshot sizes such as 1920x1080")
+    parser.add_argument("--densities", nargs="+", default=list(DENSITIES), choices=list(DENSITIES))
+    parser.add_argument("--repeat", type=int, default=5, help="runs per scenario")
+    parser.add_argument("--identify-latency", type=float, default=0.0, help="seconds per identify call")
+    parser.add_argument("--fetch-latency", type=float, default=0.0, help="seconds per detail request")
+    parser.add_argument("--item-latency", type=float, default=0.0, help="extra seconds per fetched item")
+    parser.add_argument("--jitter", type=float, default=0.0, help="relative latency variation, e.g. 0.2")
+    parser.add_argument("--reuse", type=float, default=0.0, help="share of terms repeated across calls")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--target-lang", default="Japanese")
+    parser.add_argument("--report-lang", default="en")
+    parser.add_argument("--json", default=None, help="write the results to this file")
+    parser.add_argument("--compare", default=None, help="earlier results to compare with")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed p50 slowdown, e.g. 0.2 for 20%%")
+    args = parser.parse_args(argv)
+
+    mock = LatencyMock(
+        identify_latency=args.identify_latency,
+        fetch_latency=args.fetch_latency,
+        item_latency=args.item_latency,
+        jitter=args.jitter,
+        reuse=args.reuse,
+        seed=args.seed,
+    )
+    # Keep benchmark runs out of the user's telemetry and term cache
+    telemetry.configure({"telemetry": False})
+    results: Dict = {
+        "meta": {
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "revision": _git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "options": {k: v for k, v in vars(args).items() if k not in ("json", "compare")},
+            "pipeline_options": dict(openai_client._options),
+        },
+        "scenarios": {},
+    }
+    with tempfile.TemporaryDirectory() as workdir:
+        pipeline_store = SqliteTermStore(os.path.join(workdir, "pipeline.sqlite3"))
+        set_store(pipeline_store)
+        for size in args.sizes:
+            for density in args.densities:
+                name = f"{size}/{density}"
+                stages = run_scenario(
+                    size, density, mock,
+                    repeat=max(1, args.repeat),
+                    target_lang=args.target_lang,
+                    report_lang=args.report_lang,
+                    workdir=workdir,
+                    seed=args.seed,
+                )
+                results["scenarios"][name] = stages
+                print(name + ": " + ", ".join(f"{stage} {s['p50']:.1f}" for stage, s in stages.items()) + " ms")
+        get_term_cache().close()
+        pipeline_store.close()
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print("Slower than the baseline: " + ", ".join(regressions))
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,23 +1,370 @@
+import atexit
 import json
+import logging
 import os
-from typing import Dict
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
 
 CACHE_FILE = os.path.join(os.path.expanduser("~"), ".language_helper_cache.json")
+CACHE_DB = os.path.join(os.path.expanduser("~"), ".language_helper_cache.sqlite3")
+
+# Cached item kinds and the field each item is keyed by
+KEY_FIELDS = {"vocabulary": "word", "grammar": "grammar_point"}
+
+# SQLite limits the number of bound parameters per statement
+_MAX_PARAMS = 500
+
+
+class TermStore:
+    """Storage backend for cached vocabulary and grammar details."""
+
+    def get_many(self, kind: str, terms: Iterable[str]) -> Dict[str, Dict]:
+        """Return the cached items of ``kind`` for the given terms."""
+        raise NotImplementedError
+
+    def upsert(self, kind: str, items: Dict[str, Dict]) -> None:
+        """Insert or replace the given items of ``kind``."""
+        raise NotImplementedError
+
+    def load_all(self) -> Dict:
+        """Return the whole cache as ``{"vocabulary": {...}, "grammar": {...}}``."""
+        raise NotImplementedError
+
+    def close(self) -> None:
+        pass
+
+
+class JsonTermStore(TermStore):
+    """Legacy store that keeps the whole cache in a single JSON file."""
+
+    def __init__(self, path: str = CACHE_FILE):
+        self.path = path
+
+    def _read(self) -> Dict:
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except Exception:
+            return {}
+
+    def get_many(self, kind: str, terms: Iterable[str]) -> Dict[str, Dict]:
+        items = self._read().get(kind, {})
+        return {t: items[t] for t in terms if t in items}
+
+    def upsert(self, kind: str, items: Dict[str, Dict]) -> None:
+        if not items:
+            return
+        cache = self._read()
+        cache.setdefault(kind, {}).update(items)
+        try:
+            with open(self.path, "w", encoding="utf-8") as f:
+                json.dump(cache, f)
+        except Exception:
+            pass
+
+    def load_all(self) -> Dict:
+        return self._read()
+
+
+class SqliteTermStore(TermStore):
+    """Store backed by an indexed SQLite table with one row per term."""
+
+    def __init__(self, path: str = CACHE_DB):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS terms ("
+                " kind TEXT NOT NULL,"
+                " term TEXT NOT NULL,"
+                " data TEXT NOT NULL,"
+                " updated_at REAL NOT NULL,"
+                " PRIMARY KEY (kind, term)"
+                ") WITHOUT ROWID"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)"
+            )
+
+    def get_many(self, kind: str, terms: Iterable[str]) -> Dict[str, Dict]:
+        terms = list(dict.fromkeys(terms))
+        result: Dict[str, Dict] = {}
+        with self._lock:
+            for start in range(0, len(terms), _MAX_PARAMS):
+                chunk = terms[start:start + _MAX_PARAMS]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT term, data FROM terms WHERE kind = ? AND term IN ({placeholders})",
+                    [kind, *chunk],
+                ).fetchall()
+                for term, data in rows:
+                    try:
+                        result[term] = json.loads(data)
+                    except Exception:
+                        continue
+        return result
+
+    def upsert(self, kind: str, items: Dict[str, Dict]) -> None:
+        if not items:
+            return
+        now = time.time()
+        rows = [
+            (kind, term, json.dumps(item, ensure_ascii=False), now)
+            for term, item in items.items()
+        ]
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO terms (kind, term, data, updated_at) VALUES (?, ?, ?, ?)",
+                rows,
+            )
+
+    def load_all(self) -> Dict:
+        cache: Dict[str, Dict] = {kind: {} for kind in KEY_FIELDS}
+        with self._lock:
+            rows = self._conn.execute("SELECT kind, term, data FROM terms").fetchall()
+        for kind, term, data in rows:
+            try:
+                cache.setdefault(kind, {})[term] = json.loads(data)
+            except Exception:
+                continue
+        return cache
+
+    def get_meta(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def set_meta(self, key: str, value: str) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value)
+            )
+
+    def migrate_from_json(self, path: str = CACHE_FILE) -> int:
+        """Import the legacy JSON cache once and return the number of items copied.
+
+        The JSON file is left in place so older versions keep working.
+        """
+        if self.get_meta("json_migrated") or not os.path.exists(path):
+            return 0
+        legacy = JsonTermStore(path).load_all()
+        count = 0
+        for kind in KEY_FIELDS:
+            items = legacy.get(kind) or {}
+            self.upsert(kind, items)
+            count += len(items)
+        self.set_meta("json_migrated", str(time.time()))
+        return count
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+_store: Optional[TermStore] = None
+_store_lock = threading.Lock()
+
+
+def get_store() -> TermStore:
+    """Return the active term store, opening the SQLite store on first use."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            try:
+                store = SqliteTermStore(CACHE_DB)
+                store.migrate_from_json(CACHE_FILE)
+                _store = store
+            except Exception as e:
+                logger.warning("Falling back to JSON cache: %s", e)
+                _store = JsonTermStore(CACHE_FILE)
+        return _store
+
+
+def set_store(store: TermStore) -> None:
+    """Replace the active term store, e.g. with a custom backend."""
+    global _store
+    with _store_lock:
+        _store = store
+
+
+class TermCache:
+    """Process-wide in-memory view of the term store.
+
+    Lookups are served from memory once :meth:`load` has run. Writes mark
+    entries dirty and a background thread batches them into the store.
+    """
+
+    def __init__(self, store: Optional[TermStore] = None, flush_interval: float = 2.0):
+        self._store = store
+        self.flush_interval = flush_interval
+        self._items: Dict[str, Dict[str, Dict]] = {kind: {} for kind in KEY_FIELDS}
+        self._dirty: Dict[str, set] = {kind: set() for kind in KEY_FIELDS}
+        self._lock = threading.RLock()
+        self._loaded = False
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def store(self) -> TermStore:
+        return self._store or get_store()
+
+    @property
+    def loaded(self) -> bool:
+        return self._loaded
+
+    def load(self) -> None:
+        """Read the whole store into memory and start the flusher."""
+        if self._loaded:
+            return
+        data = self.store.load_all()
+        with self._lock:
+            for kind in KEY_FIELDS:
+                items = dict(data.get(kind) or {})
+                # Entries written before loading are newer than the store
+                items.update(self._items[kind])
+                self._items[kind] = items
+            self._loaded = True
+        self.start()
+
+    def start(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="term-cache-flusher", daemon=True)
+        self._thread.start()
+
+    def get_many(self, kind: str, terms: Iterable[str]) -> Dict[str, Dict]:
+        terms = list(dict.fromkeys(terms))
+        with self._lock:
+            items = self._items[kind]
+            found = {t: items[t] for t in terms if t in items}
+            if self._loaded:
+                return found
+        missing = [t for t in terms if t not in found]
+        if missing:
+            fetched = self.store.get_many(kind, missing)
+            with self._lock:
+                for term, item in fetched.items():
+                    self._items[kind].setdefault(term, item)
+            found.update(fetched)
+        return found
+
+    def put(self, kind: str, items: Dict[str, Dict]) -> None:
+        if not items:
+            return
+        with self._lock:
+            self._items[kind].update(items)
+            self._dirty[kind].update(items)
+        if self._thread is None or not self._thread.is_alive():
+            self.start()
+        self._wake.set()
+
+    def snapshot(self) -> Dict:
+        if not self._loaded:
+            self.flush()
+            return self.store.load_all()
+        with self._lock:
+            return {kind: dict(items) for kind, items in self._items.items()}
+
+    def flush(self) -> None:
+        """Write all dirty entries to the store."""
+        with self._lock:
+            batches = {}
+            for kind, terms in self._dirty.items():
+                if terms:
+                    batches[kind] = {t: self._items[kind][t] for t in terms}
+                    self._dirty[kind] = set()
+        for kind, items in batches.items():
+            try:
+                self.store.upsert(kind, items)
+            except Exception as e:
+                logger.warning("Failed to flush %d %s items: %s", len(items), kind, e)
+                with self._lock:
+                    self._dirty[kind].update(items)
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self._wake.wait()
+            if self._stop.is_set():
+                break
+            # Give concurrent writers a moment so they land in the same batch
+            self._stop.wait(self.flush_interval)
+            self._wake.clear()
+            self.flush()
+
+    def close(self) -> None:
+        """Stop the flusher and write any pending entries."""
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+        self.flush()
+
+
+_term_cache: Optional[TermCache] = None
+
+
+def get_term_cache() -> TermCache:
+    """Return the process-wide :class:`TermCache`."""
+    global _term_cache
+    with _store_lock:
+        if _term_cache is None:
+            _term_cache = TermCache()
+            atexit.register(_term_cache.close)
+        return _term_cache
+
+
+def lookup_terms(vocab: List[str], grammar: List[str]) -> Dict[str, Dict[str, Dict]]:
+    """Return cached items for the given terms only."""
+    term_cache = get_term_cache()
+    return {
+        "vocabulary": term_cache.get_many("vocabulary", vocab) if vocab else {},
+        "grammar": term_cache.get_many("grammar", grammar) if grammar else {},
+    }
+
+
+def items_by_term(details: Dict) -> Dict[str, Dict[str, Dict]]:
+    """Key the items of a ``deliver_report`` response by their term."""
+    result: Dict[str, Dict[str, Dict]] = {}
+    for kind, field in KEY_FIELDS.items():
+        result[kind] = {}
+        for item in details.get(kind, []) or []:
+            term = item.get(field) if isinstance(item, dict) else None
+            if term:
+                result[kind][term] = item
+    return result
+
+
+def store_details(details: Dict) -> Dict[str, Dict[str, Dict]]:
+    """Cache the items of a ``deliver_report`` response and return them keyed by term.
+
+    Items are visible to lookups immediately and written to disk in the background.
+    """
+    keyed = items_by_term(details)
+    term_cache = get_term_cache()
+    for kind, items in keyed.items():
+        term_cache.put(kind, items)
+    return keyed
 
 
 def load_cache() -> Dict:
-    if not os.path.exists(CACHE_FILE):
-        return {}
-    try:
-        with open(CACHE_FILE, "r", encoding="utf-8") as f:
-            return json.load(f)
-    except Exception:
-        return {}
+    return get_term_cache().snapshot()
 
 
 def save_cache(cache: Dict) -> None:
     try:
-        with open(CACHE_FILE, "w", encoding="utf-8") as f:
-            json.dump(cache, f)
+        term_cache = get_term_cache()
+        for kind in KEY_FIELDS:
+            term_cache.put(kind, cache.get(kind) or {})
     except Exception:
         pass
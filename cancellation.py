@@ -0,0 +1,134 @@
+"""Cooperative cancellation of a running capture, identify or fetch.
+
+The worker running an operation enters :func:`cancel_scope` with a
+:class:`CancelToken`; code below it calls :func:`checkpoint` between steps,
+waits with :func:`sleep` and registers open streams with
+:func:`closing_on_cancel` so :meth:`CancelToken.cancel` interrupts them. The
+token travels in a :class:`contextvars.ContextVar`, so worker pools started
+with :func:`telemetry.submit_in_context` see it too.
+
+:class:`Cancelled` derives from :class:`BaseException`, like
+:class:`asyncio.CancelledError`, so the ``except Exception`` handlers that
+skip failed chunks or tiles do not swallow it.
+"""
+import contextvars
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class Cancelled(BaseException):
+    """The operation was cancelled by the user."""
+
+
+class CancelToken:
+    """Flag shared between the GUI and a worker; set once by :meth:`cancel`."""
+
+    def __init__(self):
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._callbacks: List[Callable[[], None]] = []
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def cancel(self) -> None:
+        """Mark the token cancelled and run the registered callbacks."""
+        with self._lock:
+            if self._event.is_set():
+                return
+            self._event.set()
+            callbacks = list(self._callbacks)
+            self._callbacks.clear()
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as e:
+                logger.warning("Cancel callback failed: %s", e)
+
+    def check(self) -> None:
+        if self._event.is_set():
+            raise Cancelled()
+
+    def wait(self, seconds: float) -> None:
+        """Sleep for ``seconds`` unless cancelled first, then raise :class:`Cancelled`."""
+        if self._event.wait(seconds):
+            raise Cancelled()
+
+    def on_cancel(self, callback: Callable[[], None]) -> Callable[[], None]:
+        """Call ``callback`` on cancellation; returns a function that unregisters it."""
+        with self._lock:
+            if not self._event.is_set():
+                self._callbacks.append(callback)
+                registered = True
+            else:
+                registered = False
+        if not registered:
+            callback()
+
+        def remove() -> None:
+            with self._lock:
+                if callback in self._callbacks:
+                    self._callbacks.remove(callback)
+
+        return remove
+
+
+_current: contextvars.ContextVar[Optional[CancelToken]] = contextvars.ContextVar("cancel_token", default=None)
+
+
+@contextmanager
+def cancel_scope(token: CancelToken):
+    """Make ``token`` the token checked by the code run inside the block."""
+    reset = _current.set(token)
+    try:
+        yield token
+    finally:
+        _current.reset(reset)
+
+
+def current_token() -> Optional[CancelToken]:
+    """Return the token of the current operation, or ``None`` outside :func:`cancel_scope`."""
+    return _current.get()
+
+
+def checkpoint() -> None:
+    """Raise :class:`Cancelled` if the current operation was cancelled."""
+    token = _current.get()
+    if token is not None:
+        token.check()
+
+
+def sleep(seconds: float) -> None:
+    """``time.sleep`` that ends early with :class:`Cancelled` on cancellation."""
+    token = _current.get()
+    if token is None:
+        time.sleep(seconds)
+    else:
+        token.wait(seconds)
+
+
+@contextmanager
+def closing_on_cancel(resource):
+    """Close ``resource`` as soon as the current operation is cancelled.
+
+    Errors raised by the interrupted resource inside the block are reported
+    as :class:`Cancelled`.
+    """
+    token = _current.get()
+    if token is None:
+        yield resource
+        return
+    remove = token.on_cancel(resource.close)
+    try:
+        yield resource
+    except Exception:
+        token.check()
+        raise
+    finally:
+        remove()
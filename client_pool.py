@@ -0,0 +1,310 @@
+"""Shared OpenAI clients with pooled connections, timeouts and retries.
+
+Clients are created per ``(api_key, base_url)`` so a key changed in the
+settings dialog takes effect on the next call, while repeated calls with the
+same key reuse the keep-alive connections of one ``httpx`` pool. The SDK's
+own retries are disabled in favour of :meth:`ClientManager.call`, which
+retries rate limits, server errors and connection failures with jittered
+exponential backoff and records what the retries cost.
+
+Changing the connection options replaces the pooled clients. Replaced
+clients are not closed while a request or stream still holds them; their
+connections are closed once the last reference is gone, or at exit.
+"""
+import asyncio
+import logging
+import random
+import threading
+import time
+import weakref
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import httpx
+import openai
+
+import cancellation
+import telemetry
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_OPTIONS: Dict[str, Any] = {
+    "connect_timeout": 10.0,
+    "read_timeout": 120.0,
+    "max_retries": 3,
+    "backoff_base": 0.5,
+    "backoff_max": 20.0,
+    "max_connections": 20,
+    "keepalive_expiry": 60.0,
+    "api_base_url": None,
+}
+
+# Latency samples kept per stage for the statistics
+_SAMPLE_LIMIT = 200
+
+
+def _is_retryable(error: Exception, retry_timeouts: bool = True) -> bool:
+    if isinstance(error, openai.APITimeoutError) and not retry_timeouts:
+        return False
+    if isinstance(error, (openai.RateLimitError, openai.InternalServerError, openai.APIConnectionError)):
+        return True
+    if isinstance(error, openai.APIStatusError):
+        return error.status_code == 429 or error.status_code >= 500
+    return False
+
+
+def _retry_after(error: Exception) -> Optional[float]:
+    response = getattr(error, "response", None)
+    if response is None:
+        return None
+    try:
+        return float(response.headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+class ClientManager:
+    """Create, reuse and call OpenAI clients."""
+
+    def __init__(self, options: Optional[Dict[str, Any]] = None):
+        self.options = dict(DEFAULT_OPTIONS)
+        if options:
+            self.options.update(options)
+        self._lock = threading.Lock()
+        self._clients: Dict[Tuple[str, Optional[str]], openai.OpenAI] = {}
+        self._async_clients: Dict[Tuple[str, Optional[str], int], Tuple[Any, openai.AsyncOpenAI]] = {}
+        self._stats: Dict[str, Dict[str, Any]] = {}
+
+    def configure(self, settings: Dict) -> None:
+        """Apply connection options from ``settings``; changed options replace pooled clients.
+
+        Clients handed out before stay usable for the requests running on them.
+        """
+        changed = False
+        with self._lock:
+            for key in DEFAULT_OPTIONS:
+                if key not in settings:
+                    continue
+                value = settings[key] if settings[key] != "" else None
+                if value != self.options.get(key):
+                    self.options[key] = value
+                    changed = True
+        if changed:
+            with self._lock:
+                self._clients.clear()
+                self._async_clients.clear()
+
+    def _timeout(self) -> httpx.Timeout:
+        return httpx.Timeout(self.options["read_timeout"], connect=self.options["connect_timeout"])
+
+    def _limits(self) -> httpx.Limits:
+        return httpx.Limits(
+            max_connections=self.options["max_connections"],
+            max_keepalive_connections=self.options["max_connections"],
+            keepalive_expiry=self.options["keepalive_expiry"],
+        )
+
+    def get(self, api_key: str, base_url: Optional[str] = None) -> openai.OpenAI:
+        """Return the pooled client for ``api_key`` and ``base_url``."""
+        base_url = base_url or self.options["api_base_url"]
+        key = (api_key, base_url)
+        with self._lock:
+            client = self._clients.get(key)
+            if client is None:
+                http_client = httpx.Client(timeout=self._timeout(), limits=self._limits())
+                client = openai.OpenAI(
+                    api_key=api_key,
+                    base_url=base_url,
+                    timeout=self._timeout(),
+                    max_retries=0,
+                    http_client=http_client,
+                )
+                # Streams keep their client alive, so the pool is only closed
+                # when nobody uses the client any more
+                weakref.finalize(client, http_client.close)
+                self._clients[key] = client
+            return client
+
+    def get_async(self, api_key: str, base_url: Optional[str] = None) -> openai.AsyncOpenAI:
+        """Return the pooled async client for the running event loop."""
+        base_url = base_url or self.options["api_base_url"]
+        loop = asyncio.get_running_loop()
+        key = (api_key, base_url, id(loop))
+        with self._lock:
+            # Async connection pools are bound to their loop; forget closed loops
+            for stale in [k for k, (l, _) in self._async_clients.items() if l.is_closed()]:
+                del self._async_clients[stale]
+            entry = self._async_clients.get(key)
+            if entry is None or entry[0] is not loop:
+                client = openai.AsyncOpenAI(
+                    api_key=api_key,
+                    base_url=base_url,
+                    timeout=self._timeout(),
+                    max_retries=0,
+                    http_client=httpx.AsyncClient(timeout=self._timeout(), limits=self._limits()),
+                )
+                entry = (loop, client)
+                self._async_clients[key] = entry
+            return entry[1]
+
+    def _backoff(self, attempt: int, error: Exception) -> float:
+        delay = _retry_after(error)
+        if delay is None:
+            cap = min(self.options["backoff_max"], self.options["backoff_base"] * (2 ** attempt))
+            delay = random.uniform(0, cap)
+        return min(delay, self.options["backoff_max"])
+
+    def call(
+        self, func: Callable[..., Any], *args, stage: str = "api", retry_timeouts: bool = True, **kwargs
+    ) -> Any:
+        """Call ``func`` and retry transient failures with jittered backoff.
+
+        With ``retry_timeouts`` off a timeout is raised at once, for callers
+        that handle it themselves. Cancellation of the current operation (see
+        :mod:`cancellation`) ends the backoff and drops late responses.
+        """
+        started = time.monotonic()
+        attempt = 0
+        while True:
+            cancellation.checkpoint()
+            try:
+                result = func(*args, **kwargs)
+            except Exception as e:
+                if attempt >= self.options["max_retries"] or not _is_retryable(e, retry_timeouts):
+                    self._record(stage, time.monotonic() - started, attempt, failed=True)
+                    raise
+                delay = self._backoff(attempt, e)
+                logger.debug("%s: %s, retry %d in %.1fs", stage, type(e).__name__, attempt + 1, delay)
+                self._record_wait(stage, delay)
+                cancellation.sleep(delay)
+                attempt += 1
+                continue
+            self._record(stage, time.monotonic() - started, attempt)
+            # A response that arrives after cancellation is dropped
+            cancellation.checkpoint()
+            return result
+
+    async def call_async(
+        self, func: Callable[..., Any], *args, stage: str = "api", retry_timeouts: bool = True, **kwargs
+    ) -> Any:
+        """Async counterpart of :meth:`call`."""
+        started = time.monotonic()
+        attempt = 0
+        while True:
+            try:
+                result = await func(*args, **kwargs)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                if attempt >= self.options["max_retries"] or not _is_retryable(e, retry_timeouts):
+                    self._record(stage, time.monotonic() - started, attempt, failed=True)
+                    raise
+                delay = self._backoff(attempt, e)
+                logger.debug("%s: %s, retry %d in %.1fs", stage, type(e).__name__, attempt + 1, delay)
+                self._record_wait(stage, delay)
+                await asyncio.sleep(delay)
+                attempt += 1
+                continue
+            self._record(stage, time.monotonic() - started, attempt)
+            return result
+
+    def _stage_stats(self, stage: str) -> Dict[str, Any]:
+        return self._stats.setdefault(
+            stage,
+            {
+                "calls": 0,
+                "retries": 0,
+                "failures": 0,
+                "retry_wait": 0.0,
+                "prompt_tokens": 0,
+                "cached_tokens": 0,
+                "completion_tokens": 0,
+                "latencies": [],
+            },
+        )
+
+    def _record(self, stage: str, latency: float, retries: int, failed: bool = False) -> None:
+        telemetry.add(f"{stage}_calls")
+        telemetry.add(f"{stage}_api_ms", latency * 1000)
+        if retries:
+            telemetry.add(f"{stage}_retries", retries)
+        with self._lock:
+            stats = self._stage_stats(stage)
+            stats["calls"] += 1
+            stats["retries"] += retries
+            if failed:
+                stats["failures"] += 1
+            latencies: List[float] = stats["latencies"]
+            latencies.append(latency)
+            del latencies[:-_SAMPLE_LIMIT]
+
+    def _record_wait(self, stage: str, delay: float) -> None:
+        with self._lock:
+            self._stage_stats(stage)["retry_wait"] += delay
+
+    def record_usage(self, stage: str, usage: Any) -> None:
+        """Add the token usage reported by a response to the stage statistics."""
+        if usage is None:
+            return
+        details = getattr(usage, "prompt_tokens_details", None)
+        prompt = getattr(usage, "prompt_tokens", 0) or 0
+        cached = getattr(details, "cached_tokens", 0) or 0
+        completion = getattr(usage, "completion_tokens", 0) or 0
+        logger.debug("%s tokens: prompt %d (cached %d), completion %d", stage, prompt, cached, completion)
+        telemetry.add(f"{stage}_prompt_tokens", prompt)
+        telemetry.add(f"{stage}_cached_tokens", cached)
+        telemetry.add(f"{stage}_completion_tokens", completion)
+        with self._lock:
+            stats = self._stage_stats(stage)
+            stats["prompt_tokens"] += prompt
+            stats["cached_tokens"] += cached
+            stats["completion_tokens"] += completion
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Return call, retry, latency and token statistics per stage.
+
+        ``retry_wait`` is the total backoff time in seconds and the latency
+        figures include retries. ``cached_ratio`` is the share of prompt tokens
+        served from the provider's prompt cache.
+        """
+        result = {}
+        with self._lock:
+            for stage, stats in self._stats.items():
+                latencies = sorted(stats["latencies"])
+                summary = {k: v for k, v in stats.items() if k != "latencies"}
+                if stats["prompt_tokens"]:
+                    summary["cached_ratio"] = stats["cached_tokens"] / stats["prompt_tokens"]
+                if latencies:
+                    summary["latency_mean"] = sum(latencies) / len(latencies)
+                    summary["latency_p50"] = latencies[len(latencies) // 2]
+                    summary["latency_p90"] = latencies[min(len(latencies) - 1, int(len(latencies) * 0.9))]
+                result[stage] = summary
+        return result
+
+    def close(self) -> None:
+        """Close pooled sync clients at shutdown; async clients are dropped with their loop.
+
+        Requests still running on these clients fail, so this is not used to
+        apply new options, see :meth:`configure`.
+        """
+        with self._lock:
+            clients = list(self._clients.values())
+            self._clients.clear()
+            self._async_clients.clear()
+        for client in clients:
+            try:
+                client.close()
+            except Exception:
+                pass
+
+
+_manager: Optional[ClientManager] = None
+_manager_lock = threading.Lock()
+
+
+def get_client_manager() -> ClientManager:
+    """Return the process-wide :class:`ClientManager`."""
+    global _manager
+    with _manager_lock:
+        if _manager is None:
+            _manager = ClientManager()
+        return _manager
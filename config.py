@@ -1,6 +1,6 @@
 import os
 import json
-from typing import Dict
+from typing import Dict, List
 
 CONFIG_FILE = os.path.join(os.path.expanduser("~"), ".language_helper.json")
 
@@ -23,6 +23,16 @@ def save_settings(settings: Dict) -> None:
         pass
 
 
+def load_language_config() -> Dict[str, List[str]]:
+    """Return the level list of each supported language from language_config.json."""
+    path = os.path.join(os.path.dirname(__file__), "language_config.json")
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except Exception:
+        return {"English": ["A1", "A2", "B1", "B2", "C1", "C2"]}
+
+
 def load_ui_strings() -> Dict:
     path = os.path.join(os.path.dirname(__file__), "ui_strings.json")
     try:
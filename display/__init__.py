@@ -214,6 +214,46 @@ def item_to_markdown(entry: WordEntry) -> str:
     return vocab_to_markdown(entry.data)
 
 
+def parse_words(data: dict, levels: List[str]) -> List[WordEntry]:
+    """Return the entries of an analysis result; ``levels`` are ordered hardest first."""
+    result: List[WordEntry] = []
+    for level_key, info in data.items():
+        try:
+            difficulty = levels.index(level_key) + 1
+        except ValueError:
+            difficulty = len(levels)
+        if not info:
+            continue
+        for vocab in info.get("vocabulary", []):
+            if isinstance(vocab, str):
+                word = vocab
+                pos_text = "Unknown"
+                data = {}
+            else:
+                word = vocab.get("word", "")
+                pos = vocab.get("pos", {})
+                subtype = pos.get('subtype')
+                label = pos.get('label', 'Unknown')
+                pos_text = f"{label},{subtype}" if subtype is not None else label
+                data = vocab
+            result.append(WordEntry(word, difficulty, data, pos=pos_text))
+        for gram in info.get("grammar", []):
+            if isinstance(gram, str):
+                word = gram
+                data = {}
+            else:
+                word = gram.get("grammar_point", "")
+                data = gram
+            result.append(WordEntry(word, difficulty, data, is_grammar=True))
+
+    result = sorted(
+        result,
+        key=lambda x: (x.is_grammar, x.pos, x.difficulty)
+    )
+
+    return result
+
+
 class DisplayArea(QtWidgets.QWidget):
     """Widget showing vocabulary/grammar lists with a preview pane."""
 
@@ -221,6 +261,7 @@ class DisplayArea(QtWidgets.QWidget):
         super().__init__(parent)
         self._vocab_entries: List[WordEntry] = []
         self._grammar_entries: List[WordEntry] = []
+        self._shown_entry: WordEntry | None = None
 
         layout = QtWidgets.QHBoxLayout(self)
 
@@ -257,15 +298,40 @@ class DisplayArea(QtWidgets.QWidget):
         self._grammar_entries = [e for e in entries if e.is_grammar and e.difficulty <= level]
         self.update_lists()
         self.text_view.clear()
+        self._shown_entry = None
+
+    @staticmethod
+    def _vocab_label(e: WordEntry) -> str:
+        return f"{e.word}[{e.pos}], N{e.difficulty}"
+
+    @staticmethod
+    def _grammar_label(e: WordEntry) -> str:
+        return f"{e.word}, N{e.difficulty}"
 
     def update_lists(self) -> None:
         self.vocab_list.clear()
         for e in self._vocab_entries:
-            self.vocab_list.addItem(f"{e.word}[{e.pos}], N{e.difficulty}")
+            self.vocab_list.addItem(self._vocab_label(e))
 
         self.grammar_list.clear()
         for e in self._grammar_entries:
-            self.grammar_list.addItem(f"{e.word}, N{e.difficulty}")
+            self.grammar_list.addItem(self._grammar_label(e))
+
+    def refresh_entries(self) -> None:
+        """Update list labels and the open preview after entries gained details.
+
+        Unlike :meth:`set_entries` this keeps the selection and scroll position.
+        """
+        for row, e in enumerate(self._vocab_entries):
+            item = self.vocab_list.item(row)
+            if item is not None:
+                item.setText(self._vocab_label(e))
+        for row, e in enumerate(self._grammar_entries):
+            item = self.grammar_list.item(row)
+            if item is not None:
+                item.setText(self._grammar_label(e))
+        if self._shown_entry is not None and self.text_view.toPlainText().strip() == "":
+            self._render(self._shown_entry)
 
     def show_detail(self, item: QtWidgets.QListWidgetItem, is_grammar: bool) -> None:
         if is_grammar:
@@ -274,6 +340,10 @@ class DisplayArea(QtWidgets.QWidget):
         else:
             index = self.vocab_list.row(item)
             entry = self._vocab_entries[index]
+        self._shown_entry = entry
+        self._render(entry)
+
+    def _render(self, entry: WordEntry) -> None:
         md = item_to_markdown(entry)
         self.text_view.setMarkdown(md)
         
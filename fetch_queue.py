@@ -0,0 +1,240 @@
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional, Tuple
+
+from cache import lookup_terms, items_by_term
+
+logger = logging.getLogger(__name__)
+
+FETCH_QUEUE_FILE = os.path.join(os.path.expanduser("~"), ".language_helper_fetch_queue.json")
+
+DEFAULT_BATCH_SIZE = 4
+# Seconds between the start of two background batches
+DEFAULT_INTERVAL = 5.0
+DEFAULT_MAX_ATTEMPTS = 3
+
+# fetch(vocab, grammar, target_lang, report_lang) -> details
+FetchFunc = Callable[[List[str], List[str], str, str], Dict]
+
+
+class FetchQueue:
+    """Persistent, prioritized queue of terms whose details are fetched in the background.
+
+    Entries are fetched in small single-kind batches by a worker thread, but
+    only while no interactive request is running (see :meth:`interactive`),
+    the queue is not paused and at least ``interval`` seconds passed since
+    the previous batch. Lower ``priority`` values go first and, within a
+    priority, the most recently enqueued terms. The queue is saved to
+    ``path`` on every change so pending terms survive a restart.
+    """
+
+    def __init__(
+        self,
+        fetch: FetchFunc,
+        on_details: Optional[Callable[[Dict], None]] = None,
+        path: str = FETCH_QUEUE_FILE,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        interval: float = DEFAULT_INTERVAL,
+        max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+    ):
+        self.fetch = fetch
+        self.on_details = on_details
+        self.path = path
+        self.batch_size = batch_size
+        self.interval = interval
+        self.max_attempts = max_attempts
+        self._entries: List[Dict] = []
+        self._sequence = 0
+        self._paused = False
+        self._interactive = 0
+        self._last_batch = 0.0
+        self._closed = False
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._load()
+
+    def __len__(self) -> int:
+        with self._cond:
+            return len(self._entries)
+
+    @property
+    def paused(self) -> bool:
+        return self._paused
+
+    def start(self) -> None:
+        with self._cond:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+
+    def enqueue(
+        self,
+        vocab: List[str],
+        grammar: List[str],
+        target_lang: str,
+        report_lang: str,
+        priority: int = 0,
+    ) -> int:
+        """Queue terms for a background fetch and return how many were added or re-prioritized."""
+        changed = 0
+        with self._cond:
+            self._sequence += 1
+            index = {self._entry_key(e): e for e in self._entries}
+            for kind, terms in (("vocabulary", vocab), ("grammar", grammar)):
+                for term in terms:
+                    key = (kind, term, target_lang, report_lang)
+                    entry = index.get(key)
+                    if entry is None:
+                        entry = {
+                            "kind": kind,
+                            "term": term,
+                            "target_lang": target_lang,
+                            "report_lang": report_lang,
+                            "attempts": 0,
+                        }
+                        self._entries.append(entry)
+                        index[key] = entry
+                    entry["priority"] = min(priority, entry.get("priority", priority))
+                    entry["sequence"] = self._sequence
+                    changed += 1
+            if changed:
+                self._save()
+                self._cond.notify_all()
+        return changed
+
+    def pause(self) -> None:
+        with self._cond:
+            self._paused = True
+
+    def resume(self) -> None:
+        with self._cond:
+            self._paused = False
+            self._cond.notify_all()
+
+    def clear(self) -> None:
+        with self._cond:
+            self._entries.clear()
+            self._save()
+
+    @contextmanager
+    def interactive(self):
+        """Hold background batches back while an interactive request runs."""
+        with self._cond:
+            self._interactive += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._interactive -= 1
+                self._cond.notify_all()
+
+    def close(self, timeout: float = 5.0) -> None:
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+            thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+
+    @staticmethod
+    def _entry_key(entry: Dict) -> Tuple[str, str, str, str]:
+        return entry["kind"], entry["term"], entry["target_lang"], entry["report_lang"]
+
+    def _ready_in(self) -> Optional[float]:
+        """Return seconds until a batch may start, or ``None`` to wait for a notification."""
+        if self._paused or self._interactive or not self._entries:
+            return None
+        return max(0.0, self._last_batch + self.interval - time.monotonic())
+
+    def _take_batch(self) -> List[Dict]:
+        ordered = sorted(self._entries, key=lambda e: (e["priority"], -e["sequence"]))
+        first = ordered[0]
+        group = (first["kind"], first["target_lang"], first["report_lang"])
+        batch = [e for e in ordered if (e["kind"], e["target_lang"], e["report_lang"]) == group]
+        return batch[:self.batch_size]
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while True:
+                    if self._closed:
+                        return
+                    wait = self._ready_in()
+                    if wait == 0:
+                        break
+                    self._cond.wait(wait)
+                batch = self._take_batch()
+                self._last_batch = time.monotonic()
+            self._fetch_batch(batch)
+
+    def _fetch_batch(self, batch: List[Dict]) -> None:
+        kind = batch[0]["kind"]
+        target_lang = batch[0]["target_lang"]
+        report_lang = batch[0]["report_lang"]
+        terms = [e["term"] for e in batch]
+        vocab, grammar = (terms, []) if kind == "vocabulary" else ([], terms)
+        # Terms fetched interactively in the meantime need no request
+        cached = lookup_terms(vocab, grammar)[kind]
+        vocab = [t for t in vocab if t not in cached]
+        grammar = [t for t in grammar if t not in cached]
+        details: Dict[str, List[Dict]] = {"vocabulary": [], "grammar": []}
+        details[kind] = list(cached.values())
+        if vocab or grammar:
+            try:
+                fetched = self.fetch(vocab, grammar, target_lang, report_lang) or {}
+                details[kind].extend(fetched.get(kind, []) or [])
+            except Exception as e:
+                logger.debug("Background fetch failed: %s", e)
+        done = set(items_by_term(details)[kind])
+
+        with self._cond:
+            for entry in batch:
+                if not any(e is entry for e in self._entries):
+                    continue
+                if entry["term"] in done:
+                    self._entries.remove(entry)
+                    continue
+                entry["attempts"] += 1
+                if entry["attempts"] >= self.max_attempts:
+                    logger.warning("Giving up on background fetch of %s", entry["term"])
+                    self._entries.remove(entry)
+                else:
+                    # Let the rest of the queue go first before retrying
+                    entry["priority"] += 1
+            self._save()
+        if self.on_details and details[kind]:
+            self.on_details(details)
+
+    def _load(self) -> None:
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except Exception:
+            return
+        for entry in data.get("entries", []):
+            try:
+                self._entries.append({
+                    "kind": entry["kind"],
+                    "term": entry["term"],
+                    "target_lang": entry["target_lang"],
+                    "report_lang": entry["report_lang"],
+                    "priority": int(entry.get("priority", 0)),
+                    "sequence": int(entry.get("sequence", 0)),
+                    "attempts": int(entry.get("attempts", 0)),
+                })
+            except Exception:
+                continue
+        self._sequence = max([e["sequence"] for e in self._entries] + [0])
+
+    def _save(self) -> None:
+        try:
+            with open(self.path, "w", encoding="utf-8") as f:
+                json.dump({"entries": self._entries}, f, ensure_ascii=False)
+        except Exception:
+            pass
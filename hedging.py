@@ -0,0 +1,217 @@
+"""Hedged requests: send a duplicate when the first one is slower than usual.
+
+A request that has not answered after the ``hedge_percentile`` of recent
+latencies gets a second, identical request; the first answer wins. The
+share of requests that may be duplicated is capped by ``hedge_budget`` so
+hedging adds at most that fraction to the cost.
+
+In threads each attempt runs in its own :func:`cancellation.cancel_scope`;
+the losing attempt's token is cancelled, which closes the streams it
+registered with :func:`cancellation.closing_on_cancel`. Functions check
+:func:`in_attempt` to stream their request so it can be closed.
+"""
+import asyncio
+import contextvars
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable, Deque, Dict, Optional
+
+import cancellation
+import telemetry
+from cancellation import CancelToken
+
+DEFAULT_OPTIONS: Dict[str, Any] = {
+    "identify_hedge": False,
+    "hedge_percentile": 90,
+    # Largest share of requests that may get a duplicate
+    "hedge_budget": 0.1,
+    # Latencies observed before the first hedge
+    "hedge_min_samples": 10,
+}
+# Latencies kept for the percentile
+_SAMPLE_LIMIT = 100
+
+_in_attempt: contextvars.ContextVar[bool] = contextvars.ContextVar("hedged_attempt", default=False)
+
+
+class HedgePolicy:
+    """Decide when to hedge and count how often hedges were sent and won."""
+
+    def __init__(self, options: Optional[Dict[str, Any]] = None):
+        self.options = dict(DEFAULT_OPTIONS)
+        if options:
+            self.options.update(options)
+        self._lock = threading.Lock()
+        self._latencies: Deque[float] = deque(maxlen=_SAMPLE_LIMIT)
+        self._requests = 0
+        self._hedges = 0
+        self._wins = 0
+
+    def configure(self, settings: Dict) -> None:
+        with self._lock:
+            for key in DEFAULT_OPTIONS:
+                if settings.get(key) is not None:
+                    self.options[key] = settings[key]
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.options["identify_hedge"])
+
+    def delay(self) -> Optional[float]:
+        """Return the seconds to wait before hedging, or ``None`` while too few latencies are known."""
+        with self._lock:
+            if len(self._latencies) < max(1, self.options["hedge_min_samples"]):
+                return None
+            ordered = sorted(self._latencies)
+        index = min(len(ordered) - 1, int(len(ordered) * self.options["hedge_percentile"] / 100))
+        return ordered[index]
+
+    def start(self) -> None:
+        with self._lock:
+            self._requests += 1
+
+    def allow_hedge(self) -> bool:
+        """Take a hedge from the budget; ``False`` when it is used up."""
+        with self._lock:
+            if self._hedges + 1 > self.options["hedge_budget"] * self._requests:
+                return False
+            self._hedges += 1
+        telemetry.add("identify_hedged")
+        return True
+
+    def finish(self, latency: float, hedge_won: bool = False) -> None:
+        """Record the latency the caller saw, from the first request to the answer that was used.
+
+        When the hedge wins this includes the wait before it was sent, so the
+        percentile keeps tracking the slow primaries the hedge is there for.
+        """
+        with self._lock:
+            self._latencies.append(latency)
+            if hedge_won:
+                self._wins += 1
+        if hedge_won:
+            telemetry.add("identify_hedge_won")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            requests, hedges, wins = self._requests, self._hedges, self._wins
+        return {
+            "requests": requests,
+            "hedges": hedges,
+            "hedge_wins": wins,
+            "hedge_rate": hedges / requests if requests else 0.0,
+            "hedge_win_rate": wins / hedges if hedges else 0.0,
+            "delay": self.delay(),
+        }
+
+
+def in_attempt() -> bool:
+    """Return whether the caller runs as an attempt of :func:`hedged_call` that may be cancelled."""
+    return _in_attempt.get()
+
+
+def _run_attempt(token: CancelToken, func: Callable[..., Any], *args) -> Any:
+    _in_attempt.set(True)
+    with cancellation.cancel_scope(token):
+        return func(*args)
+
+
+def hedged_call(policy: HedgePolicy, func: Callable[..., Any], *args) -> Any:
+    """Call ``func(*args)`` and hedge it with a second call if it is slow.
+
+    Once a hedge may be sent, every call runs under its own cancel token. When
+    one answers, the token of the other is cancelled, which closes its
+    stream; cancelling the current operation cancels both.
+    """
+    policy.start()
+    delay = policy.delay()
+    started = time.monotonic()
+    if delay is None:
+        result = func(*args)
+        policy.finish(time.monotonic() - started)
+        return result
+
+    pool = ThreadPoolExecutor(max_workers=2)
+    tokens = [CancelToken(), CancelToken()]
+
+    def cancel_attempts() -> None:
+        for token in tokens:
+            token.cancel()
+
+    parent = cancellation.current_token()
+    remove = parent.on_cancel(cancel_attempts) if parent else None
+    try:
+        primary = telemetry.submit_in_context(pool, _run_attempt, tokens[0], func, *args)
+        pending = {primary}
+        done, _ = wait(pending, timeout=delay)
+        if not done and policy.allow_hedge():
+            pending.add(telemetry.submit_in_context(pool, _run_attempt, tokens[1], func, *args))
+        error: Optional[BaseException] = None
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                pending.discard(future)
+                try:
+                    result = future.result()
+                except Exception as e:
+                    error = error or e
+                    continue
+                policy.finish(time.monotonic() - started, hedge_won=future is not primary)
+                return result
+        raise error
+    finally:
+        # The attempt still running lost; the finished one is not affected
+        cancel_attempts()
+        if remove:
+            remove()
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+async def hedged_call_async(policy: HedgePolicy, make_call: Callable[[], Any]) -> Any:
+    """Async counterpart of :func:`hedged_call`; the losing request is cancelled.
+
+    ``make_call`` returns a new awaitable of the request on every call.
+    """
+    policy.start()
+    delay = policy.delay()
+    started = time.monotonic()
+    if delay is None:
+        result = await make_call()
+        policy.finish(time.monotonic() - started)
+        return result
+
+    primary = asyncio.ensure_future(make_call())
+    pending = {primary}
+    try:
+        done, _ = await asyncio.wait({primary}, timeout=delay)
+        if not done and policy.allow_hedge():
+            pending.add(asyncio.ensure_future(make_call()))
+        error: Optional[BaseException] = None
+        while pending:
+            done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                pending.discard(task)
+                if task.exception() is not None:
+                    error = error or task.exception()
+                    continue
+                policy.finish(time.monotonic() - started, hedge_won=task is not primary)
+                return task.result()
+        raise error
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+_policy: Optional[HedgePolicy] = None
+_policy_lock = threading.Lock()
+
+
+def get_hedge_policy() -> HedgePolicy:
+    """Return the process-wide :class:`HedgePolicy` of identify requests."""
+    global _policy
+    with _policy_lock:
+        if _policy is None:
+            _policy = HedgePolicy()
+        return _policy
@@ -0,0 +1,179 @@
+"""Compare the local identify engine with the API on a set of screenshots.
+
+Usage::
+
+    python identify_benchmark.py shots/*.png
+    python identify_benchmark.py shots/*.png --repeat 3 --json results.json
+
+Every image is identified by :func:`local_identify.local_identify_terms` and
+by the API (:func:`openai_client._identify_terms`, or the mock with
+``--mock``). The API result is the reference: recall is the share of its
+terms the local engine also found, precision the share of local terms the
+API reported, and level agreement the share of common terms put at the same
+level. Latencies are wall-clock seconds per call.
+"""
+import argparse
+import base64
+import json
+import os
+import sys
+import time
+from typing import Callable, Dict, List, Optional
+
+from config import load_settings
+from prompts import get_prompt_factory
+import openai_client
+import local_identify
+from mock_openai_client import mock_identify_terms
+
+
+def _levels_by_term(terms: Dict) -> Dict[str, Dict[str, str]]:
+    result: Dict[str, Dict[str, str]] = {"vocabulary": {}, "grammar": {}}
+    for level, info in (terms or {}).items():
+        if not info:
+            continue
+        for kind in result:
+            for term in info.get(kind, []) or []:
+                result[kind].setdefault(term, level)
+    return result
+
+
+def compare(reference: Dict, candidate: Dict) -> Dict[str, Dict[str, float]]:
+    """Return recall, precision and level agreement of ``candidate`` per kind."""
+    ref = _levels_by_term(reference)
+    cand = _levels_by_term(candidate)
+    scores = {}
+    for kind in ref:
+        common = set(ref[kind]) & set(cand[kind])
+        same_level = sum(1 for term in common if ref[kind][term] == cand[kind][term])
+        scores[kind] = {
+            "reference": len(ref[kind]),
+            "found": len(cand[kind]),
+            "recall": len(common) / len(ref[kind]) if ref[kind] else 1.0,
+            "precision": len(common) / len(cand[kind]) if cand[kind] else 1.0,
+            "level_agreement": same_level / len(common) if common else 1.0,
+        }
+    return scores
+
+
+def _timed(func: Callable[[], Dict], repeat: int):
+    latencies: List[float] = []
+    result: Dict = {}
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        latencies.append(time.perf_counter() - started)
+    return result, latencies
+
+
+def _summary(latencies: List[float]) -> Dict[str, float]:
+    ordered = sorted(latencies)
+    if not ordered:
+        return {}
+    return {
+        "mean": sum(ordered) / len(ordered),
+        "p50": ordered[len(ordered) // 2],
+        "max": ordered[-1],
+    }
+
+
+def benchmark(
+    paths: List[str],
+    target_lang: str,
+    report_lang: str,
+    api_key: str,
+    *,
+    api_func: Optional[Callable] = None,
+    repeat: int = 1,
+) -> Dict:
+    factory = get_prompt_factory(report_lang)
+    api = api_func or openai_client._identify_terms
+    images = []
+    latencies: Dict[str, List[float]] = {"local": [], "api": []}
+    totals: Dict[str, Dict[str, int]] = {
+        kind: {"reference": 0, "common": 0, "found": 0} for kind in ("vocabulary", "grammar")
+    }
+    for path in paths:
+        with open(path, "rb") as f:
+            img_b64 = base64.b64encode(f.read()).decode("utf-8")
+        local_result, local_times = _timed(
+            lambda: local_identify.local_identify_terms(img_b64, factory, target_lang, api_key), repeat
+        )
+        api_result, api_times = _timed(lambda: api(img_b64, factory, target_lang, api_key), repeat)
+        latencies["local"].extend(local_times)
+        latencies["api"].extend(api_times)
+        scores = compare(api_result, local_result)
+        for kind, score in scores.items():
+            totals[kind]["reference"] += score["reference"]
+            totals[kind]["found"] += score["found"]
+            totals[kind]["common"] += round(score["recall"] * score["reference"])
+        images.append({
+            "path": path,
+            "local_latency": _summary(local_times),
+            "api_latency": _summary(api_times),
+            "scores": scores,
+        })
+        print(
+            f"{os.path.basename(path)}: local {_summary(local_times)['mean']:.2f}s, "
+            f"api {_summary(api_times)['mean']:.2f}s, "
+            f"vocabulary recall {scores['vocabulary']['recall']:.0%}, "
+            f"grammar recall {scores['grammar']['recall']:.0%}"
+        )
+
+    overall = {}
+    for kind, total in totals.items():
+        overall[kind] = {
+            "recall": total["common"] / total["reference"] if total["reference"] else 1.0,
+            "precision": total["common"] / total["found"] if total["found"] else 1.0,
+        }
+    return {
+        "images": images,
+        "latency": {engine: _summary(values) for engine, values in latencies.items()},
+        "overall": overall,
+    }
+
+
+def main(argv: List[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the local identify engine against the API.")
+    parser.add_argument("images", nargs="+", help="screenshot files")
+    parser.add_argument("--target-lang", default="Japanese")
+    parser.add_argument("--report-lang", default=None, help="defaults to the saved report language")
+    parser.add_argument("--repeat", type=int, default=1, help="calls per image and engine")
+    parser.add_argument("--json", default=None, help="write the full results to this file")
+    parser.add_argument("--api-key", default=None)
+    parser.add_argument("--mock", action="store_true", help="use mock_identify_terms as the reference")
+    args = parser.parse_args(argv)
+
+    settings = load_settings()
+    openai_client.configure(settings)
+    local_identify.configure(settings)
+    ok, reason = local_identify.available()
+    if not ok:
+        print(f"Local identify engine unavailable: {reason}")
+        return 1
+    report_lang = args.report_lang or settings.get("report_language", "en")
+    api_key = args.api_key or settings.get("api_key") or os.environ.get("OPENAI_API_KEY", "")
+    if not api_key and not args.mock:
+        print("API key not provided")
+        return 1
+
+    results = benchmark(
+        args.images,
+        args.target_lang,
+        report_lang,
+        api_key,
+        api_func=mock_identify_terms if args.mock else None,
+        repeat=max(1, args.repeat),
+    )
+    for engine, summary in results["latency"].items():
+        print(f"{engine}: mean {summary['mean']:.2f}s, p50 {summary['p50']:.2f}s, max {summary['max']:.2f}s")
+    for kind, score in results["overall"].items():
+        print(f"{kind}: recall {score['recall']:.0%}, precision {score['precision']:.0%}")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
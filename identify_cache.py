@@ -0,0 +1,269 @@
+import atexit
+import base64
+import hashlib
+import io
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, NamedTuple, Optional
+
+from PIL import Image
+
+import imaging
+
+logger = logging.getLogger(__name__)
+
+IDENTIFY_CACHE_FILE = os.path.join(os.path.expanduser("~"), ".language_helper_identify_cache.json")
+
+# Bits per side of the difference hash, giving a 256-bit hash
+HASH_SIZE = 16
+# A changed subtitle line moves the hash of a whole frame by only a few
+# bits, so the hash only preselects candidates that are then compared pixel
+# by pixel, see IdentifyCache.get
+DEFAULT_THRESHOLD = 2
+DEFAULT_MAX_ENTRIES = 256
+# Frames kept in memory for the pixel comparison, downscaled to this edge
+FRAME_LIMIT = 16
+FRAME_EDGE = 1280
+
+
+def image_hash(img: Image.Image, hash_size: int = HASH_SIZE) -> int:
+    """Return the difference hash (dHash) of ``img`` as an integer.
+
+    Each bit records whether a pixel of the downscaled grayscale image is
+    brighter than its right neighbour, so small rendering noise and scaling
+    leave the hash unchanged while a different text layout flips many bits.
+    """
+    small = img.convert("L").resize((hash_size + 1, hash_size), Image.BILINEAR)
+    pixels = small.tobytes()
+    value = 0
+    for row in range(hash_size):
+        offset = row * (hash_size + 1)
+        for col in range(hash_size):
+            value = (value << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    return value
+
+
+def image_hash_b64(img_b64: str) -> int:
+    return image_hash(Image.open(io.BytesIO(base64.b64decode(img_b64))))
+
+
+class Screen(NamedTuple):
+    """What the cache knows about a screenshot: its dHash, a digest of its
+    pixels and a grayscale frame for the pixel comparison."""
+
+    hash: int
+    digest: str
+    frame: Image.Image
+
+
+def screen_from_image(img: Image.Image) -> Screen:
+    rgb = img.convert("RGB")
+    digest = hashlib.blake2b(rgb.tobytes(), digest_size=16)
+    digest.update(f"{rgb.size}".encode())
+    frame = rgb.convert("L")
+    if max(frame.size) > FRAME_EDGE:
+        frame.thumbnail((FRAME_EDGE, FRAME_EDGE), Image.BILINEAR)
+    return Screen(image_hash(rgb), digest.hexdigest(), frame)
+
+
+def screen_from_b64(img_b64: str) -> Screen:
+    return screen_from_image(Image.open(io.BytesIO(base64.b64decode(img_b64))))
+
+
+def same_pixels(a: Image.Image, b: Image.Image) -> bool:
+    """Return whether two frames differ by no more than encoding noise anywhere."""
+    return imaging.changed_bbox(a, b, padding=0) is None
+
+
+def hamming_distance(a: int, b: int) -> int:
+    return (a ^ b).bit_count()
+
+
+class IdentifyCache:
+    """Persistent LRU cache of identify results of screenshots.
+
+    A screen is reused when its pixels are identical to a cached one, or,
+    for screens cached in this session, when its dHash is within
+    ``threshold`` bits and no pixel differs beyond encoding noise. Only
+    digests and hashes are persisted, so after a restart only identical
+    screens hit.
+
+    Like :class:`cache.TermCache`, writes only mark the cache dirty and a
+    background thread saves the file, at most every ``flush_interval``
+    seconds.
+    """
+
+    def __init__(
+        self,
+        path: str = IDENTIFY_CACHE_FILE,
+        threshold: int = DEFAULT_THRESHOLD,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        flush_interval: float = 2.0,
+    ):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, Dict]" = OrderedDict()
+        self._frames: "OrderedDict[str, Image.Image]" = OrderedDict()
+        self._dirty = False
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._load()
+
+    @staticmethod
+    def _key(digest: str, namespace: str) -> str:
+        return f"{namespace}:{digest}"
+
+    def _find(self, screen: Screen, namespace: str) -> Optional[str]:
+        key = self._key(screen.digest, namespace)
+        if key in self._entries:
+            return key
+        candidates = []
+        for k, entry in self._entries.items():
+            if entry["namespace"] != namespace or k not in self._frames:
+                continue
+            dist = hamming_distance(screen.hash, entry["hash"])
+            if dist <= self.threshold:
+                candidates.append((dist, k))
+        for _, k in sorted(candidates):
+            if same_pixels(self._frames[k], screen.frame):
+                return k
+        return None
+
+    def get(self, screen: Screen, namespace: str) -> Optional[Dict]:
+        """Return the cached terms of an identical or pixel-equivalent screen."""
+        if self.threshold < 0:
+            return None
+        with self._lock:
+            key = self._find(screen, namespace)
+            if key is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return self._entries[key]["terms"]
+
+    def put(self, screen: Screen, namespace: str, terms: Dict) -> None:
+        with self._lock:
+            key = self._key(screen.digest, namespace)
+            self._entries[key] = {
+                "hash": screen.hash, "digest": screen.digest, "namespace": namespace, "terms": terms,
+            }
+            self._entries.move_to_end(key)
+            self._frames[key] = screen.frame
+            self._frames.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                old, _ = self._entries.popitem(last=False)
+                self._frames.pop(old, None)
+            while len(self._frames) > FRAME_LIMIT:
+                self._frames.popitem(last=False)
+        self._mark_dirty()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._frames.clear()
+            self.hits = 0
+            self.misses = 0
+        self._mark_dirty()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+                "entries": len(self._entries),
+            }
+
+    def _load(self) -> None:
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except Exception:
+            return
+        # Stored oldest first so the LRU order survives restarts; entries of
+        # older versions without a pixel digest cannot be verified and are dropped
+        for entry in data.get("entries", []):
+            try:
+                digest = entry["digest"]
+                namespace = entry["namespace"]
+                self._entries[self._key(digest, namespace)] = {
+                    "hash": int(entry["hash"], 16),
+                    "digest": digest,
+                    "namespace": namespace,
+                    "terms": entry["terms"],
+                }
+            except Exception:
+                continue
+
+    def _mark_dirty(self) -> None:
+        with self._lock:
+            self._dirty = True
+            if self._thread is None or not self._thread.is_alive():
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._run, name="identify-cache-flusher", daemon=True)
+                self._thread.start()
+        self._wake.set()
+
+    def flush(self) -> None:
+        """Write the cache to disk if it changed since the last write."""
+        with self._lock:
+            if not self._dirty:
+                return
+            self._dirty = False
+            entries = [
+                {"hash": f"{e['hash']:x}", "digest": e["digest"], "namespace": e["namespace"], "terms": e["terms"]}
+                for e in self._entries.values()
+            ]
+        try:
+            with open(self.path, "w", encoding="utf-8") as f:
+                json.dump({"entries": entries}, f, ensure_ascii=False)
+        except Exception as e:
+            logger.warning("Failed to save the identify cache: %s", e)
+            with self._lock:
+                self._dirty = True
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self._wake.wait()
+            if self._stop.is_set():
+                break
+            # Screens identified in quick succession land in the same write
+            self._stop.wait(self.flush_interval)
+            self._wake.clear()
+            self.flush()
+
+    def close(self) -> None:
+        """Stop the flusher and write any pending changes."""
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+        self.flush()
+
+
+_identify_cache: Optional[IdentifyCache] = None
+_identify_cache_lock = threading.Lock()
+
+
+def get_identify_cache() -> IdentifyCache:
+    """Return the process-wide :class:`IdentifyCache`."""
+    global _identify_cache
+    with _identify_cache_lock:
+        if _identify_cache is None:
+            _identify_cache = IdentifyCache()
+            atexit.register(_identify_cache.close)
+        return _identify_cache
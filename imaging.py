@@ -0,0 +1,264 @@
+import base64
+import io
+import logging
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from PIL import Image, ImageChops, ImageOps
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_IMAGE_OPTIONS: Dict[str, Any] = {
+    # Longest edge in pixels after downscaling; 0 keeps the captured size
+    "max_edge": 0,
+    "grayscale": False,
+    "autocontrast": False,
+    # PNG, JPEG or WEBP
+    "format": "PNG",
+    # JPEG/WebP quality
+    "quality": 85,
+    "png_compress_level": 6,
+    # OpenAI image detail: auto, low or high
+    "detail": "auto",
+}
+
+IMAGE_FORMATS = ["PNG", "JPEG", "WEBP"]
+IMAGE_DETAILS = ["auto", "low", "high"]
+# Tile grids offered for tiled identify, written as columns x rows
+TILE_GRIDS = ["1x1", "2x1", "1x2", "2x2", "3x2", "2x3", "3x3"]
+# Per-pixel grayscale difference below which a change counts as encoding noise
+DELTA_NOISE = 24
+
+_MIME_TYPES = {"PNG": "image/png", "JPEG": "image/jpeg", "WEBP": "image/webp"}
+# Leading base64 characters of each format's magic bytes
+_B64_SIGNATURES = {"iVBOR": "image/png", "/9j/": "image/jpeg", "UklGR": "image/webp"}
+
+_options: Dict[str, Any] = dict(DEFAULT_IMAGE_OPTIONS)
+# Per-window overrides keyed by window title
+_profiles: Dict[str, Dict[str, Any]] = {}
+_last_stats: Dict[str, Any] = {}
+_stats_lock = threading.Lock()
+
+
+def configure(settings: Dict) -> None:
+    """Apply ``image_*`` options and ``image_profiles`` from ``settings``."""
+    for key in DEFAULT_IMAGE_OPTIONS:
+        value = settings.get(f"image_{key}")
+        if value is not None:
+            _options[key] = value
+    profiles = settings.get("image_profiles")
+    if isinstance(profiles, dict):
+        _profiles.clear()
+        _profiles.update(profiles)
+
+
+def options_for(title: Optional[str] = None) -> Dict[str, Any]:
+    """Return the image options for the window ``title``."""
+    options = dict(_options)
+    if title and title in _profiles:
+        options.update(_profiles[title])
+    return options
+
+
+def preprocess_image(img: Image.Image, options: Optional[Dict[str, Any]] = None) -> Image.Image:
+    """Downscale and normalize ``img`` according to ``options``."""
+    options = options or _options
+    max_edge = options.get("max_edge") or 0
+    if max_edge and max(img.size) > max_edge:
+        img = img.copy()
+        img.thumbnail((max_edge, max_edge), Image.LANCZOS)
+    if options.get("grayscale"):
+        img = img.convert("L")
+    if options.get("autocontrast"):
+        if img.mode not in ("L", "RGB"):
+            img = img.convert("RGB")
+        img = ImageOps.autocontrast(img, cutoff=1)
+    return img
+
+
+def encode_image(
+    img: Image.Image,
+    options: Optional[Dict[str, Any]] = None,
+    record: bool = True,
+) -> Tuple[str, Dict[str, Any]]:
+    """Preprocess and encode ``img`` to base64.
+
+    Returns the base64 string and statistics about the payload: size,
+    format, raw and base64 bytes, and preprocessing and encoding time in
+    milliseconds. Unless ``record`` is false the statistics are also kept
+    for :func:`last_encode_stats`.
+    """
+    options = options or _options
+    started = time.perf_counter()
+    original_size = img.size
+    img = preprocess_image(img, options)
+    preprocessed = time.perf_counter()
+
+    fmt = str(options.get("format") or "PNG").upper()
+    if fmt not in _MIME_TYPES:
+        fmt = "PNG"
+    buf = io.BytesIO()
+    if fmt == "PNG":
+        img.save(buf, format="PNG", compress_level=int(options.get("png_compress_level", 6)))
+    else:
+        if img.mode not in ("L", "RGB"):
+            img = img.convert("RGB")
+        img.save(buf, format=fmt, quality=int(options.get("quality", 85)))
+    data = buf.getvalue()
+    img_b64 = base64.b64encode(data).decode("utf-8")
+    finished = time.perf_counter()
+
+    stats = {
+        "original_size": original_size,
+        "size": img.size,
+        "format": fmt,
+        "bytes": len(data),
+        "b64_bytes": len(img_b64),
+        "preprocess_ms": (preprocessed - started) * 1000,
+        "encode_ms": (finished - preprocessed) * 1000,
+    }
+    if record:
+        with _stats_lock:
+            _last_stats.clear()
+            _last_stats.update(stats)
+    return img_b64, stats
+
+
+def last_encode_stats() -> Dict[str, Any]:
+    with _stats_lock:
+        return dict(_last_stats)
+
+
+def image_mime(img_b64: str) -> str:
+    """Return the MIME type of a base64 encoded image from its leading bytes."""
+    for prefix, mime in _B64_SIGNATURES.items():
+        if img_b64.startswith(prefix):
+            return mime
+    return "image/png"
+
+
+def image_detail(options: Optional[Dict[str, Any]] = None) -> str:
+    """Return the ``detail`` of the image request under ``options``, see :func:`options_for`."""
+    options = options or _options
+    detail = options.get("detail") or "auto"
+    return detail if detail in IMAGE_DETAILS else "auto"
+
+
+def decode_image(img_b64: str) -> Image.Image:
+    img = Image.open(io.BytesIO(base64.b64decode(img_b64)))
+    img.load()
+    return img
+
+
+def parse_grid(grid: Any) -> Tuple[int, int]:
+    """Return ``(columns, rows)`` of a grid such as ``"3x2"``; invalid grids are 1x1."""
+    try:
+        cols, rows = (int(n) for n in str(grid).lower().split("x"))
+    except ValueError:
+        return 1, 1
+    return max(1, cols), max(1, rows)
+
+
+def split_tiles(img: Image.Image, cols: int, rows: int, overlap: float = 0.15) -> List[Image.Image]:
+    """Split ``img`` into a ``cols`` x ``rows`` grid of tiles, left to right and top to bottom.
+
+    Each tile extends by ``overlap`` of a cell into its neighbours so text
+    crossing a cell border appears whole in at least one tile.
+    """
+    width, height = img.size
+    cell_w = width / cols
+    cell_h = height / rows
+    pad_w = cell_w * overlap
+    pad_h = cell_h * overlap
+    tiles = []
+    for row in range(rows):
+        for col in range(cols):
+            box = (
+                max(0, int(col * cell_w - pad_w)),
+                max(0, int(row * cell_h - pad_h)),
+                min(width, int((col + 1) * cell_w + pad_w + 0.5)),
+                min(height, int((row + 1) * cell_h + pad_h + 0.5)),
+            )
+            tiles.append(img.crop(box))
+    return tiles
+
+
+def tile_image_b64(img_b64: str, cols: int, rows: int, overlap: float = 0.15) -> List[str]:
+    """Split a base64 encoded image into tiles and encode each of them."""
+    img = decode_image(img_b64)
+    # The capture was already preprocessed; only re-encode the tiles
+    options = dict(_options, max_edge=0)
+    return [encode_image(tile, options, record=False)[0] for tile in split_tiles(img, cols, rows, overlap)]
+
+
+def image_diff_ratio(img1: Image.Image, img2: Image.Image) -> float:
+    """Return the mean absolute pixel difference of two images between 0 and 1."""
+    img1 = img1.convert("RGB")
+    img2 = img2.convert("RGB")
+    if img1.size != img2.size:
+        img2 = img2.resize(img1.size)
+    diff = ImageChops.difference(img1, img2)
+    hist = diff.histogram()
+    # The histogram holds 256 bins per band, one band after another
+    sq = sum((i % 256) * hist[i] for i in range(len(hist)))
+    max_diff = 255 * img1.size[0] * img1.size[1] * 3
+    return sq / max_diff
+
+
+def changed_bbox(
+    previous: Image.Image,
+    current: Image.Image,
+    padding: int = 16,
+    noise: int = DELTA_NOISE,
+) -> Optional[Tuple[int, int, int, int]]:
+    """Return the box around the pixels of ``current`` that differ from ``previous``.
+
+    The box is grown by ``padding`` pixels on every side. Returns ``None`` when
+    nothing changed or the images cannot be compared because their sizes differ.
+    """
+    if previous.size != current.size:
+        return None
+    diff = ImageChops.difference(previous.convert("L"), current.convert("L"))
+    box = diff.point(lambda v: 255 if v > noise else 0).getbbox()
+    if box is None:
+        return None
+    width, height = current.size
+    left, top, right, bottom = box
+    return (
+        max(0, left - padding),
+        max(0, top - padding),
+        min(width, right + padding),
+        min(height, bottom + padding),
+    )
+
+
+def box_area_ratio(box: Tuple[int, int, int, int], size: Tuple[int, int]) -> float:
+    width, height = size
+    if not width or not height:
+        return 1.0
+    return (box[2] - box[0]) * (box[3] - box[1]) / (width * height)
+
+
+def changed_region(
+    current: Image.Image,
+    img_b64: str,
+    previous: Optional[Image.Image],
+    padding: int,
+    max_area: float,
+    options: Dict[str, Any],
+) -> str:
+    """Return ``img_b64`` cropped to the part of ``current`` that differs from ``previous``.
+
+    The full frame is returned when there is no previous capture, nothing
+    comparable changed, or the change covers more than ``max_area`` of the
+    frame. The crop is encoded with ``options`` at its own size.
+    """
+    if previous is None:
+        return img_b64
+    box = changed_bbox(previous, current, padding=padding)
+    if box is None or box_area_ratio(box, current.size) > max_area:
+        return img_b64
+    region_b64, stats = encode_image(current.crop(box), dict(options, max_edge=0))
+    logger.debug("Sending changed region %s: %d of %d bytes", box, stats["b64_bytes"], len(img_b64))
+    return region_b64
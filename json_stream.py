@@ -0,0 +1,104 @@
+import json
+from typing import Dict, Iterable, List, Tuple
+
+DEFAULT_KINDS = ("vocabulary", "grammar")
+
+
+class IncrementalItemParser:
+    """Extract finished items from a ``deliver_report`` JSON document as it arrives.
+
+    The document has the shape ``{"vocabulary": [{...}, ...], "grammar": [...]}``.
+    Text can be fed in arbitrary pieces; every object inside one of the item
+    arrays is decoded and returned as soon as its closing brace is seen, while
+    the rest of the document may still be incomplete.
+    """
+
+    def __init__(self, kinds: Iterable[str] = DEFAULT_KINDS):
+        self.kinds = set(kinds)
+        self.items: List[Tuple[str, Dict]] = []
+        self._text = ""
+        self._pos = 0
+        self._stack: List[str] = []
+        self._in_string = False
+        self._escape = False
+        self._string_start = 0
+        self._last_string = None
+        self._key = None
+        self._item_start = None
+
+    def feed(self, chunk: str) -> List[Tuple[str, Dict]]:
+        """Consume ``chunk`` and return the ``(kind, item)`` pairs it completed."""
+        self._text += chunk
+        text = self._text
+        found: List[Tuple[str, Dict]] = []
+        i = self._pos
+        while i < len(text):
+            c = text[i]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif c == "\\":
+                    self._escape = True
+                elif c == '"':
+                    self._in_string = False
+                    if len(self._stack) == 1:
+                        self._last_string = text[self._string_start + 1:i]
+            elif c == '"':
+                self._in_string = True
+                self._string_start = i
+            elif c in "{[":
+                self._stack.append(c)
+                if (
+                    c == "{"
+                    and len(self._stack) == 3
+                    and self._stack[:2] == ["{", "["]
+                    and self._key in self.kinds
+                ):
+                    self._item_start = i
+            elif c in "}]":
+                if c == "}" and len(self._stack) == 3 and self._item_start is not None:
+                    try:
+                        item = json.loads(text[self._item_start:i + 1])
+                    except ValueError:
+                        item = None
+                    if isinstance(item, dict):
+                        found.append((self._key, item))
+                    self._item_start = None
+                if self._stack:
+                    self._stack.pop()
+            elif c == ":" and len(self._stack) == 1:
+                self._key = self._last_string
+            i += 1
+        self._pos = i
+        self._trim()
+        self.items.extend(found)
+        return found
+
+    def _trim(self) -> None:
+        # Only text belonging to an unfinished item or string is needed later
+        if self._item_start is not None:
+            offset = self._item_start
+        elif self._in_string:
+            offset = self._string_start
+        else:
+            offset = self._pos
+        if offset:
+            self._text = self._text[offset:]
+            self._pos -= offset
+            self._string_start -= offset
+            if self._item_start is not None:
+                self._item_start -= offset
+
+    def result(self) -> Dict[str, List[Dict]]:
+        """Return every item completed so far grouped by kind."""
+        grouped: Dict[str, List[Dict]] = {kind: [] for kind in sorted(self.kinds)}
+        for kind, item in self.items:
+            grouped.setdefault(kind, []).append(item)
+        return grouped
+
+
+def parse_partial_items(text: str, kinds: Iterable[str] = DEFAULT_KINDS) -> Dict[str, List[Dict]]:
+    """Return the complete items found in a possibly truncated document."""
+    parser = IncrementalItemParser(kinds)
+    parser.feed(text)
+    return parser.result()
@@ -0,0 +1,186 @@
+"""Local term → level index used to classify identified terms.
+
+Each language is indexed from the bundled list ``levels/<code>.txt`` (or
+``.csv``) followed by an optional user list of the same name in
+``~/.language_helper_levels``, whose entries override the bundled ones.
+Language names from ``language_config.json`` are mapped to file codes with
+:data:`LANGUAGE_CODES`; other languages use their lower-cased name.
+
+Lists use the formats read by :func:`read_word_list`: plain text with level
+headers such as ``# N3`` (entries starting with ``〜`` are grammar, a header
+like ``# N3 grammar`` forces the kind), or CSV with ``term,level,kind``
+columns.
+"""
+import csv
+import logging
+import os
+import re
+import threading
+from typing import Dict, List, Optional, Set, Tuple
+
+from config import load_language_config
+
+logger = logging.getLogger(__name__)
+
+LEVELS_DIR = os.path.join(os.path.dirname(__file__), "levels")
+USER_LEVELS_DIR = os.path.join(os.path.expanduser("~"), ".language_helper_levels")
+LANGUAGE_CODES = {"Japanese": "ja"}
+
+KINDS = ("vocabulary", "grammar")
+_HEADER_RE = re.compile(r"^#\s*([A-Za-z]+\d+)\s*(vocabulary|vocab|grammar)?\s*$", re.IGNORECASE)
+_GRAMMAR_PREFIXES = ("〜", "～", "~")
+
+
+def _guess_kind(term: str) -> str:
+    return "grammar" if term.startswith(_GRAMMAR_PREFIXES) else "vocabulary"
+
+
+def _normalize_kind(kind: str) -> str:
+    kind = (kind or "").strip().lower()
+    if kind.startswith("gram"):
+        return "grammar"
+    if kind.startswith("vocab") or kind == "word":
+        return "vocabulary"
+    return ""
+
+
+def read_text_list(path: str) -> Dict[str, Dict[str, List[str]]]:
+    levels: Dict[str, Dict[str, List[str]]] = {}
+    level, kind = "N5", ""
+    with open(path, "r", encoding="utf-8-sig") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            match = _HEADER_RE.match(line)
+            if match:
+                level = match.group(1).upper()
+                kind = _normalize_kind(match.group(2) or "")
+                continue
+            if line.startswith("#"):
+                continue
+            bucket = levels.setdefault(level, {k: [] for k in KINDS})
+            bucket[kind or _guess_kind(line)].append(line)
+    return levels
+
+
+def read_csv_list(path: str) -> Dict[str, Dict[str, List[str]]]:
+    levels: Dict[str, Dict[str, List[str]]] = {}
+    with open(path, "r", encoding="utf-8-sig", newline="") as f:
+        for row in csv.reader(f):
+            if not row or not row[0].strip() or row[0].strip().lower() == "term":
+                continue
+            term = row[0].strip()
+            level = row[1].strip().upper() if len(row) > 1 and row[1].strip() else "N5"
+            kind = _normalize_kind(row[2]) if len(row) > 2 else ""
+            bucket = levels.setdefault(level, {k: [] for k in KINDS})
+            bucket[kind or _guess_kind(term)].append(term)
+    return levels
+
+
+def read_word_list(path: str) -> Dict[str, Dict[str, List[str]]]:
+    """Return ``{level: {"vocabulary": [...], "grammar": [...]}}`` for a list file."""
+    if path.lower().endswith(".csv"):
+        return read_csv_list(path)
+    return read_text_list(path)
+
+
+def normalize_term(kind: str, term: str) -> str:
+    """Return the lookup key of ``term``; grammar points lose their ``〜`` prefix."""
+    term = term.strip()
+    if kind == "grammar":
+        term = term.lstrip("".join(_GRAMMAR_PREFIXES)).strip()
+    return term
+
+
+class LevelIndex:
+    """In-memory lookup from vocabulary and grammar to their level."""
+
+    def __init__(self, levels: List[str]):
+        # Hardest level first, as in language_config.json
+        self.levels = list(levels)
+        self._terms: Dict[str, Dict[str, str]] = {kind: {} for kind in KINDS}
+
+    def __len__(self) -> int:
+        return sum(len(terms) for terms in self._terms.values())
+
+    def add(self, data: Dict[str, Dict[str, List[str]]]) -> None:
+        """Add the terms of a word list, overriding known terms."""
+        for level, info in data.items():
+            if level not in self.levels:
+                continue
+            for kind in KINDS:
+                for term in info.get(kind, []):
+                    self._terms[kind][normalize_term(kind, term)] = level
+
+    def load_file(self, path: str) -> bool:
+        try:
+            self.add(read_word_list(path))
+        except Exception as e:
+            logger.warning("Could not read level list %s: %s", path, e)
+            return False
+        return True
+
+    def level_of(self, kind: str, term: str) -> Optional[str]:
+        return self._terms.get(kind, {}).get(normalize_term(kind, term))
+
+    def classify(self, terms: Dict) -> Tuple[Dict, int]:
+        """Move the terms of an identify result to their indexed level.
+
+        Returns the corrected result and the number of terms whose level
+        changed. Terms the index does not know stay where they were.
+        """
+        result = {level: {"vocabulary": [], "grammar": []} for level in self.levels}
+        moved = 0
+        for level, info in terms.items():
+            result.setdefault(level, {"vocabulary": [], "grammar": []})
+            if not info:
+                continue
+            for kind in KINDS:
+                for term in info.get(kind, []) or []:
+                    indexed = self.level_of(kind, term) or level
+                    if indexed != level:
+                        moved += 1
+                    if term not in result[indexed][kind]:
+                        result[indexed][kind].append(term)
+        return result, moved
+
+    def levels_easier_than(self, learner_level: str, margin: int) -> Set[str]:
+        """Return the levels more than ``margin`` levels easier than ``learner_level``."""
+        if learner_level not in self.levels:
+            return set()
+        position = self.levels.index(learner_level)
+        return set(self.levels[position + margin + 1:])
+
+
+def _list_path(directory: str, code: str) -> Optional[str]:
+    for ext in (".txt", ".csv"):
+        path = os.path.join(directory, code + ext)
+        if os.path.exists(path):
+            return path
+    return None
+
+
+def build_level_index(target_lang: str) -> LevelIndex:
+    """Build the index of ``target_lang`` from the bundled and user lists."""
+    index = LevelIndex(load_language_config().get(target_lang, []))
+    code = LANGUAGE_CODES.get(target_lang, target_lang.lower())
+    for directory in (LEVELS_DIR, USER_LEVELS_DIR):
+        path = _list_path(directory, code)
+        if path:
+            index.load_file(path)
+    return index
+
+
+_indexes: Dict[str, LevelIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def get_level_index(target_lang: str) -> LevelIndex:
+    """Return the process-wide :class:`LevelIndex` of ``target_lang``."""
+    with _indexes_lock:
+        index = _indexes.get(target_lang)
+        if index is None:
+            index = build_level_index(target_lang)
+            _indexes[target_lang] = index
+        return index
@@ -0,0 +1,224 @@
+"""Offline identify engine: OCR plus Japanese morphological analysis.
+
+:func:`local_identify_terms` has the signature of
+:func:`openai_client._identify_terms` and can be passed as ``identify_func``.
+Text is read with Tesseract through ``pytesseract``, split into words with
+``fugashi`` (MeCab with UniDic) and reduced to dictionary forms; grammar
+points are found with the patterns in :data:`GRAMMAR_PATTERNS`. Both packages
+are optional and only needed when the local engine is selected::
+
+    pip install pytesseract fugashi unidic-lite
+
+Tesseract itself and its ``jpn`` language data have to be installed
+separately. Levels come from :mod:`level_index`.
+"""
+import logging
+import re
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from config import load_language_config
+from level_index import get_level_index
+import imaging
+
+logger = logging.getLogger(__name__)
+
+try:
+    import pytesseract
+except ImportError:
+    pytesseract = None
+
+try:
+    import fugashi
+except ImportError:
+    fugashi = None
+
+DEFAULT_OPTIONS: Dict[str, Any] = {
+    # Tesseract language; jpn_vert reads vertical text such as manga
+    "ocr_lang": "jpn",
+    # Level of words whose level is not known
+    "unknown_level": "N1",
+}
+
+# Parts of speech kept as vocabulary (UniDic pos1)
+CONTENT_POS = {"名詞", "動詞", "形容詞", "形状詞", "副詞", "連体詞"}
+# Sub-categories dropped even when pos1 is kept (UniDic pos2)
+SKIPPED_POS2 = {"固有名詞", "数詞", "非自立可能"}
+
+# (pattern, grammar point, level) for common JLPT grammar
+GRAMMAR_PATTERNS: List[Tuple[str, str, str]] = [
+    (r"にもかかわらず", "〜にもかかわらず", "N2"),
+    (r"わけにはいかない", "〜わけにはいかない", "N3"),
+    (r"わけではない", "〜わけではない", "N3"),
+    (r"わけがない", "〜わけがない", "N3"),
+    (r"ことになる|ことになっ", "〜ことになる", "N4"),
+    (r"ことにする|ことにし", "〜ことにする", "N4"),
+    (r"ようにする|ようにし", "〜ようにする", "N4"),
+    (r"ようになる|ようになっ", "〜ようになる", "N4"),
+    (r"ばかり", "〜ばかり", "N4"),
+    (r"はずがない", "〜はずがない", "N3"),
+    (r"はずだ|はずです", "〜はずだ", "N4"),
+    (r"かもしれない|かもしれません", "〜かもしれない", "N4"),
+    (r"なければならない|なければなりません|なきゃ", "〜なければならない", "N4"),
+    (r"てしまう|てしまっ|ちゃう|ちゃっ", "〜てしまう", "N4"),
+    (r"ておく|ておい", "〜ておく", "N4"),
+    (r"てもいい|てもいいです", "〜てもいい", "N5"),
+    (r"てはいけない|ちゃいけない|てはいけません", "〜てはいけない", "N5"),
+    (r"たことがある|たことがあり", "〜たことがある", "N5"),
+    (r"たほうがいい|た方がいい", "〜たほうがいい", "N5"),
+    (r"ながら", "〜ながら", "N5"),
+    (r"ために", "〜ために", "N4"),
+    (r"らしい", "〜らしい", "N4"),
+    (r"みたい", "〜みたい", "N4"),
+    (r"に違いない|にちがいない", "〜に違いない", "N3"),
+    (r"に対して|に対し", "〜に対して", "N3"),
+    (r"によって|により", "〜によって", "N3"),
+    (r"ものの", "〜ものの", "N2"),
+    (r"に限らず", "〜に限らず", "N2"),
+    (r"ざるを得ない|ざるをえない", "〜ざるを得ない", "N2"),
+    (r"を問わず", "〜を問わず", "N2"),
+    (r"ずにはいられない", "〜ずにはいられない", "N2"),
+    (r"を余儀なくされ", "〜を余儀なくされる", "N1"),
+    (r"ならではの", "〜ならではの", "N1"),
+    (r"といえども", "〜といえども", "N1"),
+]
+
+_KANA_ONLY = re.compile(r"^[぀-ヿー]+$")
+_JAPANESE = re.compile(r"[぀-ヿ一-鿿]")
+
+_options: Dict[str, Any] = dict(DEFAULT_OPTIONS)
+_tagger = None
+# Result of available(), checked once until the next configure()
+_availability: Optional[Tuple[bool, str]] = None
+_compiled = [(re.compile(pattern), name, level) for pattern, name, level in GRAMMAR_PATTERNS]
+
+
+def configure(settings: Dict) -> None:
+    """Apply ``local_*`` options from ``settings``."""
+    global _availability
+    _availability = None
+    for key in DEFAULT_OPTIONS:
+        value = settings.get(f"local_{key}")
+        if value:
+            _options[key] = value
+
+
+def available() -> Tuple[bool, str]:
+    """Return whether the local engine can run and, if not, why.
+
+    Looking for Tesseract starts a process, so the answer is kept until
+    :func:`configure` is called again.
+    """
+    global _availability
+    if _availability is None:
+        _availability = _check_available()
+    return _availability
+
+
+def _check_available() -> Tuple[bool, str]:
+    if pytesseract is None:
+        return False, "pytesseract is not installed"
+    if fugashi is None:
+        return False, "fugashi is not installed"
+    try:
+        pytesseract.get_tesseract_version()
+    except Exception as e:
+        return False, f"Tesseract is not available: {e}"
+    return True, ""
+
+
+def _get_tagger():
+    global _tagger
+    if _tagger is None:
+        _tagger = fugashi.Tagger()
+    return _tagger
+
+
+def ocr_text(img_b64: str) -> str:
+    """Return the text in the image, with the spaces Tesseract puts between characters removed."""
+    img = imaging.decode_image(img_b64)
+    if img.mode not in ("L", "RGB"):
+        img = img.convert("RGB")
+    text = pytesseract.image_to_string(img, lang=_options["ocr_lang"])
+    return "\n".join(re.sub(r"\s+", "", line) for line in text.splitlines() if line.strip())
+
+
+def _dictionary_form(word) -> str:
+    feature = word.feature
+    for field in ("orthBase", "lemma"):
+        value = getattr(feature, field, None)
+        if value and value != "*":
+            # UniDic lemmas may carry a disambiguation suffix such as "-外来語"
+            return value.split("-")[0]
+    return word.surface
+
+
+def extract_vocabulary(text: str) -> List[str]:
+    """Return the content words of ``text`` in dictionary form, in order of appearance."""
+    words: List[str] = []
+    for word in _get_tagger()(text):
+        feature = word.feature
+        if getattr(feature, "pos1", None) not in CONTENT_POS:
+            continue
+        if getattr(feature, "pos2", None) in SKIPPED_POS2:
+            continue
+        base = _dictionary_form(word)
+        if not _JAPANESE.search(base):
+            continue
+        if len(base) == 1 and _KANA_ONLY.match(base):
+            continue
+        if base not in words:
+            words.append(base)
+    return words
+
+
+def extract_grammar(text: str) -> List[Tuple[str, str]]:
+    """Return ``(grammar point, level)`` pairs found in ``text``."""
+    found: List[Tuple[str, str]] = []
+    seen = set()
+    for pattern, name, level in _compiled:
+        if name not in seen and pattern.search(text):
+            seen.add(name)
+            found.append((name, level))
+    return found
+
+
+def classify(
+    text: str,
+    target_lang: str,
+    level_of: Optional[Callable[[str, str], Optional[str]]] = None,
+) -> Dict[str, Dict[str, List[str]]]:
+    """Return the identify structure for ``text``.
+
+    ``level_of(kind, term)`` may return the level of a term; words it does not
+    know go to the ``unknown_level`` option.
+    """
+    levels = load_language_config().get(target_lang) or [_options["unknown_level"]]
+    result = {level: {"vocabulary": [], "grammar": []} for level in levels}
+    fallback = _options["unknown_level"] if _options["unknown_level"] in result else levels[0]
+
+    for word in extract_vocabulary(text):
+        level = level_of("vocabulary", word) if level_of else None
+        result[level if level in result else fallback]["vocabulary"].append(word)
+    for name, level in extract_grammar(text):
+        result[level if level in result else fallback]["grammar"].append(name)
+    return result
+
+
+def local_identify_terms(img_b64: str, factory, target_lang: str, api_key: str) -> Dict:
+    """Identify vocabulary and grammar in the image without calling the API."""
+    if target_lang != "Japanese":
+        raise ValueError(f"The local identify engine does not support {target_lang}")
+    ok, reason = available()
+    if not ok:
+        raise RuntimeError(f"Local identify engine unavailable: {reason}")
+    started = time.perf_counter()
+    text = ocr_text(img_b64)
+    recognized = time.perf_counter()
+    result = classify(text, target_lang, level_of=get_level_index(target_lang).level_of)
+    finished = time.perf_counter()
+    logger.debug(
+        "Local identify: OCR %.0f ms, analysis %.0f ms, %d characters",
+        (recognized - started) * 1000, (finished - recognized) * 1000, len(text),
+    )
+    return result
@@ -1,3 +1,5 @@
+import logging
+import os
 import sys
 
 from PyQt5 import QtWidgets
@@ -7,6 +9,10 @@ from ui import SettingsDialog, MainWindow
 
 
 def main() -> None:
+    logging.basicConfig(
+        level=os.environ.get("LANGUAGE_HELPER_LOG_LEVEL", "WARNING").upper(),
+        format="%(levelname)s %(name)s: %(message)s",
+    )
     app = QtWidgets.QApplication(sys.argv)
     settings = load_settings()
     dialog = SettingsDialog(settings)
@@ -1,7 +1,15 @@
 # Mock OpenAI client for test mode
-from typing import Dict, List
+import asyncio
+import copy
+import itertools
+import random
+import threading
+import time
+from typing import Dict, List, Optional
 
 import openai_client
+import openai_client_async
+from cache import KEY_FIELDS
 
 MOCK_IDENTIFY_RESPONSE = {
     "N1": None,
@@ -167,9 +175,114 @@ def mock_identify_terms(img_b64: str, factory, target_lang: str, api_key: str) -
     return MOCK_IDENTIFY_RESPONSE
 
 
+def mock_items(vocab: List[str], grammar: List[str]) -> Dict:
+    """Return one detail item per requested term.
+
+    Terms of ``MOCK_ITEM_RESPONSE`` get their own item; other terms get a
+    copy of one of its items under their name.
+    """
+    result: Dict[str, List[Dict]] = {"vocabulary": [], "grammar": []}
+    for kind, terms in (("vocabulary", vocab), ("grammar", grammar)):
+        templates = MOCK_ITEM_RESPONSE[kind]
+        known = {item[KEY_FIELDS[kind]]: item for item in templates}
+        for i, term in enumerate(terms):
+            item = copy.deepcopy(known.get(term) or templates[i % len(templates)])
+            item[KEY_FIELDS[kind]] = term
+            result[kind].append(item)
+    return result
+
+
 def mock_fetch_details(vocab: List[str], grammar: List[str], factory, target_lang: str, api_key: str) -> Dict:
-    """Return fixed detail response for testing."""
-    return MOCK_ITEM_RESPONSE
+    """Return a mock detail item for every requested term."""
+    return mock_items(vocab, grammar)
+
+
+async def mock_identify_terms_async(img_b64: str, factory, target_lang: str, api_key: str) -> Dict:
+    """Async version of :func:`mock_identify_terms`."""
+    return MOCK_IDENTIFY_RESPONSE
+
+
+async def mock_fetch_details_async(vocab: List[str], grammar: List[str], factory, target_lang: str, api_key: str) -> Dict:
+    """Async version of :func:`mock_fetch_details`."""
+    return mock_items(vocab, grammar)
+
+
+class LatencyMock:
+    """Identify and fetch mocks that take time like the API and return generated terms.
+
+    ``identify`` reports ``terms`` terms (a ``grammar_ratio`` share of them
+    grammar) spread over the levels of ``MOCK_IDENTIFY_RESPONSE``, after
+    ``identify_latency`` seconds. ``fetch`` returns one item per requested
+    term, built from the items of ``MOCK_ITEM_RESPONSE``, after
+    ``fetch_latency`` plus ``item_latency`` seconds per item. Every latency
+    varies by up to ``jitter`` of itself. Terms are new on every identify
+    call, except for a ``reuse`` share taken from a fixed pool, so repeated
+    calls exercise both cache hits and fetches. Results are deterministic
+    for a given ``seed``.
+    """
+
+    def __init__(
+        self,
+        *,
+        identify_latency: float = 0.0,
+        fetch_latency: float = 0.0,
+        item_latency: float = 0.0,
+        jitter: float = 0.0,
+        terms: int = 10,
+        grammar_ratio: float = 0.25,
+        reuse: float = 0.0,
+        seed: Optional[int] = None,
+    ):
+        self.identify_latency = identify_latency
+        self.fetch_latency = fetch_latency
+        self.item_latency = item_latency
+        self.jitter = jitter
+        self.terms = terms
+        self.grammar_ratio = grammar_ratio
+        self.reuse = reuse
+        self._random = random.Random(seed)
+        self._calls = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def _delay(self, seconds: float) -> float:
+        if seconds <= 0:
+            return 0.0
+        with self._lock:
+            factor = 1 + self._random.uniform(-self.jitter, self.jitter)
+        return max(0.0, seconds * factor)
+
+    def _terms(self) -> Dict:
+        call = next(self._calls)
+        levels = list(MOCK_IDENTIFY_RESPONSE)
+        result = {level: {"vocabulary": [], "grammar": []} for level in levels}
+        grammar_count = round(self.terms * self.grammar_ratio)
+        with self._lock:
+            for i in range(self.terms):
+                kind = "grammar" if i < grammar_count else "vocabulary"
+                source = "pool" if self._random.random() < self.reuse else f"call{call}"
+                prefix = "〜" if kind == "grammar" else ""
+                level = levels[i % len(levels)]
+                result[level][kind].append(f"{prefix}{kind}-{source}-{i}")
+        return result
+
+    def _fetch_delay(self, vocab: List[str], grammar: List[str]) -> float:
+        return self._delay(self.fetch_latency + self.item_latency * (len(vocab) + len(grammar)))
+
+    def identify(self, img_b64: str, factory, target_lang: str, api_key: str) -> Dict:
+        time.sleep(self._delay(self.identify_latency))
+        return self._terms()
+
+    def fetch(self, vocab: List[str], grammar: List[str], factory, target_lang: str, api_key: str) -> Dict:
+        time.sleep(self._fetch_delay(vocab, grammar))
+        return mock_items(vocab, grammar)
+
+    async def identify_async(self, img_b64: str, factory, target_lang: str, api_key: str) -> Dict:
+        await asyncio.sleep(self._delay(self.identify_latency))
+        return self._terms()
+
+    async def fetch_async(self, vocab: List[str], grammar: List[str], factory, target_lang: str, api_key: str) -> Dict:
+        await asyncio.sleep(self._fetch_delay(vocab, grammar))
+        return mock_items(vocab, grammar)
 
 
 def analyze_image(
@@ -190,3 +303,23 @@ def analyze_image(
         identify_func=mock_identify_terms,
         fetch_func=mock_fetch_details,
     )
+
+
+async def analyze_image_async(
+    title: str,
+    target_lang: str,
+    report_lang: str,
+    api_key: str,
+    *,
+    img_b64: str | None = None,
+) -> Dict:
+    """Run openai_client_async.analyze_image_async using mock functions."""
+    return await openai_client_async.analyze_image_async(
+        title,
+        target_lang,
+        report_lang,
+        api_key,
+        img_b64=img_b64,
+        identify_func=mock_identify_terms_async,
+        fetch_func=mock_fetch_details_async,
+    )
@@ -0,0 +1,165 @@
+"""Per-stage model selection with fallback to alternative models.
+
+``model_routes`` maps each route of :data:`ROUTES` to a list of models, the
+primary first; by default every route has a single model and fallbacks are
+opt-in. A request goes to the primary model; when it times out or its
+function call arguments cannot be parsed, the next model of the list is
+tried. ``model_timeouts`` gives each route the seconds a model may take to
+start answering: the first chunk of a streamed response, the whole response
+otherwise. Detail responses take long, so their routes have no limit by
+default. The limit applies to the last model too, which then raises the
+timeout. Latencies and failures are kept per model.
+"""
+import logging
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, TypeVar
+
+import httpx
+import openai
+
+import telemetry
+
+logger = logging.getLogger(__name__)
+
+ROUTES = ["identify", "vocabulary", "grammar"]
+DEFAULT_MODEL = "gpt-4.1-mini"
+DEFAULT_OPTIONS: Dict[str, Any] = {
+    "model_routes": {route: [DEFAULT_MODEL] for route in ROUTES},
+    # Seconds until a model starts answering, per route; None or 0 for no limit
+    "model_timeouts": {"identify": 60.0, "vocabulary": None, "grammar": None},
+}
+# Latency samples kept per model for the statistics
+_SAMPLE_LIMIT = 200
+# Streamed responses time out while reading, outside the SDK's own error types
+_TIMEOUTS = (openai.APITimeoutError, httpx.TimeoutException)
+
+T = TypeVar("T")
+# attempt(model, timeout) -> result; timeout is None when the route has no limit
+Attempt = Callable[[str, Optional[float]], T]
+
+
+class UnparseableResponse(ValueError):
+    """The model answered with arguments that could not be decoded.
+
+    ``result`` is what the caller returns if no other model is left.
+    """
+
+    def __init__(self, message: str, result: Any = None):
+        super().__init__(message)
+        self.result = result
+
+
+class ModelRouter:
+    """Pick the model of each request and fall back when it fails."""
+
+    def __init__(self, options: Optional[Dict[str, Any]] = None):
+        self.options = dict(DEFAULT_OPTIONS)
+        if options:
+            self.options.update(options)
+        self._lock = threading.Lock()
+        self._stats: Dict[str, Dict[str, Any]] = {}
+
+    def configure(self, settings: Dict) -> None:
+        with self._lock:
+            for key in DEFAULT_OPTIONS:
+                if settings.get(key) is not None:
+                    self.options[key] = settings[key]
+
+    def models(self, route: str) -> List[str]:
+        """Return the models of ``route``, primary first."""
+        models = [m for m in (self.options["model_routes"].get(route) or []) if m]
+        return models or [DEFAULT_MODEL]
+
+    def primary(self, route: str) -> str:
+        return self.models(route)[0]
+
+    def timeout(self, route: str) -> Optional[float]:
+        """Return the seconds a model of ``route`` may take to start answering, or ``None``."""
+        return (self.options["model_timeouts"] or {}).get(route) or None
+
+    def _failed(self, route: str, models: List[str], index: int, error: Exception, started: float) -> bool:
+        """Record a failed attempt and return whether another model is left."""
+        self._record(models[index], time.monotonic() - started, failed=True)
+        if index == len(models) - 1:
+            return False
+        reason = "timed out" if isinstance(error, _TIMEOUTS) else "returned unparseable arguments"
+        logger.debug("%s: %s %s, falling back to %s", route, models[index], reason, models[index + 1])
+        telemetry.add(f"{route}_fallbacks")
+        with self._lock:
+            self._model_stats(models[index])["fallbacks"] += 1
+        return True
+
+    def call(self, route: str, attempt: Attempt) -> T:
+        """Run ``attempt`` with the models of ``route`` until one succeeds."""
+        models = self.models(route)
+        for index, model in enumerate(models):
+            started = time.monotonic()
+            try:
+                result = attempt(model, self.timeout(route))
+            except (*_TIMEOUTS, UnparseableResponse) as e:
+                if self._failed(route, models, index, e, started):
+                    continue
+                if isinstance(e, UnparseableResponse):
+                    return e.result
+                raise
+            self._record(model, time.monotonic() - started)
+            return result
+        raise RuntimeError(f"No model configured for {route}")
+
+    async def call_async(self, route: str, attempt: Callable[[str, Optional[float]], Awaitable[T]]) -> T:
+        """Async counterpart of :meth:`call`."""
+        models = self.models(route)
+        for index, model in enumerate(models):
+            started = time.monotonic()
+            try:
+                result = await attempt(model, self.timeout(route))
+            except (*_TIMEOUTS, UnparseableResponse) as e:
+                if self._failed(route, models, index, e, started):
+                    continue
+                if isinstance(e, UnparseableResponse):
+                    return e.result
+                raise
+            self._record(model, time.monotonic() - started)
+            return result
+        raise RuntimeError(f"No model configured for {route}")
+
+    def _model_stats(self, model: str) -> Dict[str, Any]:
+        return self._stats.setdefault(model, {"calls": 0, "failures": 0, "fallbacks": 0, "latencies": []})
+
+    def _record(self, model: str, latency: float, failed: bool = False) -> None:
+        with self._lock:
+            stats = self._model_stats(model)
+            stats["calls"] += 1
+            if failed:
+                stats["failures"] += 1
+            latencies: List[float] = stats["latencies"]
+            latencies.append(latency)
+            del latencies[:-_SAMPLE_LIMIT]
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Return calls, failures, fallbacks and latency figures in seconds per model."""
+        result = {}
+        with self._lock:
+            for model, stats in self._stats.items():
+                latencies = sorted(stats["latencies"])
+                summary = {k: v for k, v in stats.items() if k != "latencies"}
+                if latencies:
+                    summary["latency_mean"] = sum(latencies) / len(latencies)
+                    summary["latency_p50"] = latencies[len(latencies) // 2]
+                    summary["latency_p90"] = latencies[min(len(latencies) - 1, int(len(latencies) * 0.9))]
+                result[model] = summary
+        return result
+
+
+_router: Optional[ModelRouter] = None
+_router_lock = threading.Lock()
+
+
+def get_model_router() -> ModelRouter:
+    """Return the process-wide :class:`ModelRouter`."""
+    global _router
+    with _router_lock:
+        if _router is None:
+            _router = ModelRouter()
+        return _router
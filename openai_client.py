@@ -1,18 +1,63 @@
-import io
-import base64
 import json
-from typing import Dict, List, Callable, Any, Optional
+import functools
+import logging
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from typing import Dict, List, Callable, Any, Optional, Set, Tuple
 
+import httpx
 from PIL import ImageGrab
 import pygetwindow as gw
-import openai
 
 from prompts import get_prompt_factory
-from schema import get_schema
-from cache import load_cache, save_cache
+from schema import get_schema, get_item_schema
+from cache import lookup_terms, store_details, items_by_term, KEY_FIELDS
+from identify_cache import get_identify_cache, screen_from_b64
+from json_stream import IncrementalItemParser, parse_partial_items
+from client_pool import get_client_manager
+from token_budget import get_token_estimator, DEFAULT_TOKEN_BUDGET
+from level_index import get_level_index
+from hedging import get_hedge_policy, hedged_call, in_attempt
+from model_routing import get_model_router, UnparseableResponse
+import cancellation
+import imaging
+import telemetry
 
+logger = logging.getLogger(__name__)
+
+
+# Runtime options, see :func:`configure`
+_options: Dict[str, Any] = {
+    "detail_chunk_size": 8,
+    "detail_max_workers": 4,
+    "adaptive_batching": True,
+    "detail_token_budget": DEFAULT_TOKEN_BUDGET,
+    "max_repair_rounds": 2,
+    # Columns x rows of tiles identified separately, "1x1" identifies the whole image
+    "identify_tile_grid": "1x1",
+    "identify_tile_overlap": 0.15,
+    # Correct identified levels with the local level index
+    "use_level_index": True,
+    # Skip detail fetches for terms more than this many levels easier than the
+    # learner's level; a negative value fetches everything
+    "level_skip_margin": 1,
+    # Schema descriptions sent to the model, see schema.SCHEMA_MINIFY_MODES
+    "schema_minify": "off",
+}
+
+
+def configure(settings: Dict) -> None:
+    """Apply the runtime options found in ``settings``."""
+    for key in _options:
+        if settings.get(key) is not None:
+            _options[key] = settings[key]
+    get_client_manager().configure(settings)
+    imaging.configure(settings)
+    telemetry.configure(settings)
+    get_hedge_policy().configure(settings)
+    get_model_router().configure(settings)
 
-openai_client = None
 
 def grab_window_image(title: str) -> str:
     """Capture the selected window and return base64 string."""
@@ -22,85 +67,876 @@ def grab_window_image(title: str) -> str:
             if w.width > 0 and w.height > 0:
                 rect = (w.left, w.top, w.left + w.width, w.top + w.height)
             break
+    started = time.perf_counter()
     try:
         img = ImageGrab.grab(bbox=rect) if rect else ImageGrab.grab()
         if img.width == 0 or img.height == 0:
             img = ImageGrab.grab()
     except Exception:
         img = ImageGrab.grab()
-    buf = io.BytesIO()
-    img.save(buf, format="PNG")
-    return base64.b64encode(buf.getvalue()).decode("utf-8")
-
-
-def _identify_terms(img_b64: str, factory, target_lang: str, api_key: str) -> Dict:
-    """Ask OpenAI to identify vocabulary and grammar in the image."""
-    global openai_client
-    if openai_client is None:
-        openai_client = openai.OpenAI(api_key=api_key)
-    _, identify_schema = get_schema(target_lang)
-    prompt = factory.create_identify_prompt(target_lang)
-    openai.api_key = api_key
-    
-    response = openai_client.chat.completions.create(
-        model="gpt-4.1-mini",
-        messages=[
+    capture_ms = (time.perf_counter() - started) * 1000
+    img_b64, stats = imaging.encode_image(img, imaging.options_for(title))
+    telemetry.note_capture({**stats, "capture_ms": capture_ms})
+    logger.debug(
+        "Encoded %dx%d %s: %d bytes in %.0f ms",
+        *stats["size"], stats["format"], stats["b64_bytes"], stats["encode_ms"],
+    )
+    return img_b64
+
+
+@functools.lru_cache(maxsize=None)
+def _request_template(factory_cls: type, target_lang: str, minify: str) -> Dict[str, Any]:
+    """Build the static parts of the identify and detail requests once.
+
+    The system prompts and function definitions come first in every request
+    and never change for a language pair, so they form a stable prefix the
+    provider can cache between calls.
+    """
+    factory = factory_cls()
+    _, identify_schema = get_schema(target_lang, minify)
+    return {
+        "identify_messages": [
+            {"role": "system", "content": factory.create_identify_prompt(target_lang)},
+        ],
+        "identify_functions": [{"name": "identify_terms", "parameters": identify_schema}],
+        "fetch_messages": [
+            {"role": "system", "content": factory.create_prompt(target_lang)},
+        ],
+        # Keyed by the requested kind; None covers requests for both kinds
+        "fetch_functions": {
+            kind: [{"name": "deliver_report", "parameters": get_item_schema(target_lang, kind, minify)}]
+            for kind in (None, "vocabulary", "grammar")
+        },
+    }
+
+
+def _template(factory, target_lang: str) -> Dict[str, Any]:
+    return _request_template(type(factory), target_lang, _options["schema_minify"])
+
+
+def _identify_request(
+    img_b64: str,
+    factory,
+    target_lang: str,
+    model: Optional[str] = None,
+    options: Optional[Dict[str, Any]] = None,
+) -> Dict:
+    """Return the chat completion arguments of an identify call, by default for the primary model.
+
+    ``options`` are the image options the screenshot was encoded with, see
+    :func:`imaging.options_for`.
+    """
+    template = _template(factory, target_lang)
+    return dict(
+        model=model or get_model_router().primary("identify"),
+        messages=template["identify_messages"] + [
             {
                 "role": "user",
                 "content": [
-                    {"type": "text", "text": prompt},
-                    {"type": "image_url", "image_url": {"url": f"data:image/png;base64,{img_b64}"}},
+                    {
+                        "type": "image_url",
+                        "image_url": {
+                            "url": f"data:{imaging.image_mime(img_b64)};base64,{img_b64}",
+                            "detail": imaging.image_detail(options),
+                        },
+                    },
                 ],
             }
         ],
-        functions=[{"name": "identify_terms", "parameters": identify_schema}],
+        functions=template["identify_functions"],
         function_call={"name": "identify_terms"},
         max_tokens=200,
     )
-    args = response.choices[0].message.function_call.arguments
-    try:
-        result = json.loads(args)
-    except:
-        result = {}
-    return result
 
 
-def _fetch_details(vocab: List[str], grammar: List[str], factory, target_lang: str, api_key: str) -> Dict:
-    """Ask OpenAI for detailed explanations of given terms."""
-    global openai_client
-    if openai_client is None:
-        openai_client = openai.OpenAI(api_key=api_key)
-    item_schema, _ = get_schema(target_lang)
-    prompt = factory.create_prompt(target_lang)
-    message = prompt
-    #if vocab:
-    #    message += "\nVocabulary:\n" + "\n".join(vocab)
-    #if grammar:
-    #    message += "\nGrammar:\n" + "\n".join(grammar)
+def _fetch_route(vocab: List[str], grammar: List[str]) -> str:
+    """Return the model route of a detail request."""
+    return "grammar" if grammar and not vocab else "vocabulary"
+
+
+def _fetch_request(
+    vocab: List[str], grammar: List[str], factory, target_lang: str, model: Optional[str] = None
+) -> Dict:
+    """Return the chat completion arguments of a detail call.
+
+    A request for a single kind only carries that kind's schema. The model
+    defaults to the primary model of the request's route.
+    """
+    template = _template(factory, target_lang)
+    kind = None if vocab and grammar else ("vocabulary" if vocab else "grammar")
     user_content = json.dumps({
         "vocabs": vocab,
         "grammars": grammar
     }, ensure_ascii=False)
-
-    openai.api_key = api_key
-    
-    response = openai_client.chat.completions.create(
-        model="gpt-4.1-mini",
-        messages = [
-            {"role": "system", "content": message},
+    return dict(
+        model=model or get_model_router().primary(_fetch_route(vocab, grammar)),
+        messages=template["fetch_messages"] + [
             {"role": "user", "content": user_content}
         ],
-        functions=[{"name": "deliver_report", "parameters": item_schema}],
+        functions=template["fetch_functions"][kind],
         function_call={"name": "deliver_report"},
-        max_tokens=10000,
+        max_tokens=get_token_estimator().max_tokens_for(vocab, grammar),
     )
-    args = response.choices[0].message.function_call.arguments
 
+
+def _timeout_options(timeout: Optional[float]) -> Dict:
+    """Return the call options of a request limited to ``timeout`` seconds by the model router."""
+    if timeout is None:
+        return {}
+    return {"timeout": timeout, "retry_timeouts": False}
+
+
+def _parse_arguments(response) -> Dict:
+    """Decode the function call arguments of a chat completion.
+
+    Raises :class:`UnparseableResponse` with an empty result when they are
+    not a JSON object.
+    """
+    try:
+        args = response.choices[0].message.function_call.arguments
+    except Exception as e:
+        print(e)
+        raise UnparseableResponse(str(e), result={}) from e
+    return _decode_arguments(args)
+
+
+def _decode_arguments(args: str) -> Dict:
     try:
         result = json.loads(args)
     except Exception as e:
         print(e)
-        result = {}
+        raise UnparseableResponse(str(e), result={}) from e
+    if not isinstance(result, dict):
+        raise UnparseableResponse("function call arguments are not an object", result={})
+    return result
+
+
+def _parse_details(args: str, finish_reason: Optional[str]) -> Tuple[Dict, bool]:
+    """Decode ``deliver_report`` arguments, salvaging complete items from a broken payload.
+
+    Returns the details and whether the payload was complete.
+    """
+    try:
+        result = json.loads(args)
+        if isinstance(result, dict) and finish_reason != "length":
+            return result, True
+    except Exception as e:
+        logger.debug("Could not decode details: %s", e)
+    result = parse_partial_items(args or "")
+    logger.debug(
+        "Salvaged %d vocabulary and %d grammar items from an incomplete response (%s)",
+        len(result["vocabulary"]), len(result["grammar"]), finish_reason,
+    )
+    return result, False
+
+
+def _missing_terms(vocab: List[str], grammar: List[str], details: Dict) -> Tuple[List[str], List[str]]:
+    returned = items_by_term(details)
+    return (
+        [w for w in vocab if w not in returned["vocabulary"]],
+        [g for g in grammar if g not in returned["grammar"]],
+    )
+
+
+def _identify_terms(
+    img_b64: str,
+    factory,
+    target_lang: str,
+    api_key: str,
+    options: Optional[Dict[str, Any]] = None,
+) -> Dict:
+    """Ask OpenAI to identify vocabulary and grammar in the image encoded with ``options``."""
+    manager = get_client_manager()
+    client = manager.get(api_key)
+
+    def attempt(model: str, timeout: Optional[float]) -> Dict:
+        request = _identify_request(img_b64, factory, target_lang, model, options)
+        if in_attempt():
+            return _identify_streamed(client, timeout, request)
+        response = manager.call(
+            client.chat.completions.create,
+            stage="identify",
+            **_timeout_options(timeout),
+            **request,
+        )
+        manager.record_usage("identify", response.usage)
+        return _parse_arguments(response)
+
+    return get_model_router().call("identify", attempt)
+
+
+def _identify_streamed(client, timeout: Optional[float], request: Dict) -> Dict:
+    """Run an identify request of a hedged pair as a stream, so the losing one can be closed."""
+    manager = get_client_manager()
+    sent = time.monotonic()
+    stream = manager.call(
+        client.chat.completions.create,
+        stage="identify",
+        stream=True,
+        stream_options={"include_usage": True},
+        **_timeout_options(timeout),
+        **request,
+    )
+    deadline = _FirstTokenDeadline(stream, sent, timeout)
+    parts: List[str] = []
+    usage = None
+    try:
+        with cancellation.closing_on_cancel(stream):
+            for chunk in stream:
+                deadline.arrived()
+                if getattr(chunk, "usage", None) is not None:
+                    usage = chunk.usage
+                if not chunk.choices:
+                    continue
+                call = chunk.choices[0].delta.function_call
+                if call is not None and call.arguments:
+                    parts.append(call.arguments)
+    except Exception as e:
+        if deadline.expired:
+            raise httpx.ReadTimeout(f"{request['model']} did not start answering within {timeout} s") from e
+        raise
+    finally:
+        deadline.arrived()
+    if deadline.expired:
+        raise httpx.ReadTimeout(f"{request['model']} did not start answering within {timeout} s")
+    if usage is not None:
+        manager.record_usage("identify", usage)
+    return _decode_arguments("".join(parts))
+
+
+def _fetch_details(
+    vocab: List[str],
+    grammar: List[str],
+    factory,
+    target_lang: str,
+    api_key: str,
+    *,
+    on_item: Optional[Callable[[str, Dict], None]] = None,
+) -> Dict:
+    """Ask OpenAI for detailed explanations of given terms.
+
+    With ``on_item`` the completion is streamed and every vocabulary or
+    grammar object is cached and passed to ``on_item(kind, item)`` as soon as
+    it is complete.
+
+    A truncated or malformed response keeps its complete items, and only the
+    terms still missing are requested again, for at most
+    ``max_repair_rounds`` follow-up requests. Vocabulary and grammar are
+    requested separately and concurrently, each with its own schema.
+    """
+    if vocab and grammar:
+        return _fetch_kinds_concurrently(vocab, grammar, factory, target_lang, api_key, on_item=on_item)
+
+    merged: Dict[str, List[Dict]] = {"vocabulary": [], "grammar": []}
+    rounds = 0
+    while True:
+        try:
+            result, complete = _fetch_details_once(vocab, grammar, factory, target_lang, api_key, on_item)
+        except Exception:
+            if not rounds:
+                raise
+            logger.warning("Repair request failed, #vocab: %d, #grammar: %d", len(vocab), len(grammar))
+            break
+        for kind in merged:
+            merged[kind].extend(result.get(kind, []) or [])
+        if complete:
+            break
+        # Keep the salvaged items even if a repair request fails later
+        store_details(result)
+        vocab, grammar = _missing_terms(vocab, grammar, merged)
+        if not vocab and not grammar:
+            break
+        if rounds >= _options["max_repair_rounds"]:
+            logger.debug("Giving up on #vocab: %d, #grammar: %d after %d repair rounds", len(vocab), len(grammar), rounds)
+            break
+        rounds += 1
+        logger.debug("Repair round %d: re-requesting #vocab: %d, #grammar: %d", rounds, len(vocab), len(grammar))
+    return merged
+
+
+def _fetch_kinds_concurrently(
+    vocab: List[str],
+    grammar: List[str],
+    factory,
+    target_lang: str,
+    api_key: str,
+    *,
+    on_item: Optional[Callable[[str, Dict], None]] = None,
+) -> Dict:
+    """Fetch vocabulary and grammar in two parallel requests and merge them.
+
+    The result of one kind is kept when the other fails; only raises when
+    both fail.
+    """
+    merged: Dict[str, List[Dict]] = {"vocabulary": [], "grammar": []}
+    errors = []
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        futures = {
+            "vocabulary": telemetry.submit_in_context(
+                pool, _fetch_details, vocab, [], factory, target_lang, api_key, on_item=on_item
+            ),
+            "grammar": telemetry.submit_in_context(
+                pool, _fetch_details, [], grammar, factory, target_lang, api_key, on_item=on_item
+            ),
+        }
+        for kind, future in futures.items():
+            try:
+                merged[kind] = future.result().get(kind, []) or []
+            except Exception as e:
+                logger.warning("Fetching %s failed: %s", kind, e)
+                errors.append(e)
+    if len(errors) == len(futures):
+        raise errors[0]
+    return merged
+
+
+def _fetch_details_once(
+    vocab: List[str],
+    grammar: List[str],
+    factory,
+    target_lang: str,
+    api_key: str,
+    on_item: Optional[Callable[[str, Dict], None]] = None,
+) -> Tuple[Dict, bool]:
+    """Run a single detail request and return its items and whether it was complete.
+
+    The request goes through the model router; a model whose response has
+    no usable item at all is replaced by the route's next model. After a
+    streamed response broke off, the next model is only asked for the terms
+    not delivered yet, so ``on_item`` sees every term once.
+    """
+    route = _fetch_route(vocab, grammar)
+    if on_item is None:
+        return get_model_router().call(
+            route,
+            lambda model, timeout: _fetch_details_attempt(
+                vocab, grammar, factory, target_lang, api_key, None, model, timeout
+            ),
+        )
+
+    streamed: Dict[str, List[Dict]] = {"vocabulary": [], "grammar": []}
+
+    def deliver(kind: str, item: Dict) -> None:
+        streamed[kind].append(item)
+        on_item(kind, item)
+
+    def attempt(model: str, timeout: Optional[float]) -> Tuple[Dict, bool]:
+        earlier = {kind: list(items) for kind, items in streamed.items()}
+        missing_vocab, missing_grammar = _missing_terms(vocab, grammar, earlier)
+        if not missing_vocab and not missing_grammar:
+            return earlier, True
+        try:
+            result, complete = _fetch_details_attempt(
+                missing_vocab, missing_grammar, factory, target_lang, api_key, deliver, model, timeout
+            )
+        except UnparseableResponse as e:
+            result, complete = e.result
+            raise UnparseableResponse(str(e), result=(_with_earlier(earlier, result), complete)) from e
+        return _with_earlier(earlier, result), complete
+
+    return get_model_router().call(route, attempt)
+
+
+def _with_earlier(earlier: Dict[str, List[Dict]], result: Dict) -> Dict:
+    """Return ``result`` with the items an earlier model already streamed in front."""
+    merged = dict(result)
+    for kind, items in earlier.items():
+        merged[kind] = items + (result.get(kind, []) or [])
+    return merged
+
+
+class _FirstTokenDeadline:
+    """Close a stream whose first chunk has not arrived ``seconds`` after ``sent``.
+
+    Unlike the HTTP read timeout, which limits the gap between two chunks,
+    this limits the time the model takes to start answering.
+    """
+
+    def __init__(self, stream, sent: float, seconds: Optional[float]):
+        self.expired = False
+        self._lock = threading.Lock()
+        self._timer: Optional[threading.Timer] = None
+        if seconds is not None:
+            self._timer = threading.Timer(max(0.0, sent + seconds - time.monotonic()), self._expire, (stream,))
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _expire(self, stream) -> None:
+        with self._lock:
+            if self._timer is None:
+                return
+            self.expired = True
+        stream.close()
+
+    def arrived(self) -> None:
+        """Stop the deadline once the first chunk is read."""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+
+
+def _unusable(result: Dict, complete: bool, finish_reason: Optional[str]) -> bool:
+    """Return whether a detail response is malformed without any salvageable item."""
+    return not complete and finish_reason != "length" and not any(result.get(k) for k in KEY_FIELDS)
+
+
+def _fetch_details_attempt(
+    vocab: List[str],
+    grammar: List[str],
+    factory,
+    target_lang: str,
+    api_key: str,
+    on_item: Optional[Callable[[str, Dict], None]],
+    model: str,
+    timeout: Optional[float],
+) -> Tuple[Dict, bool]:
+    manager = get_client_manager()
+    client = manager.get(api_key)
+    request = _fetch_request(vocab, grammar, factory, target_lang, model)
+    options = _timeout_options(timeout)
+    if on_item is None:
+        response = manager.call(client.chat.completions.create, stage="fetch", **options, **request)
+        choice = response.choices[0]
+        call = choice.message.function_call
+        result, complete = _parse_details(call.arguments if call else "", choice.finish_reason)
+        _record_usage(response.usage, result)
+        if _unusable(result, complete, choice.finish_reason):
+            raise UnparseableResponse(f"no usable items from {model}", result=(result, complete))
+        return result, complete
+
+    parser = IncrementalItemParser()
+    parts: List[str] = []
+    usage = None
+    finish_reason = None
+    sent = time.monotonic()
+    # Only opening the stream is retried; items already delivered are cached
+    stream = manager.call(
+        client.chat.completions.create,
+        stage="fetch",
+        stream=True,
+        stream_options={"include_usage": True},
+        **options,
+        **request,
+    )
+    deadline = _FirstTokenDeadline(stream, sent, timeout)
+    # Cancelling closes the stream, which ends the read in progress
+    try:
+        with cancellation.closing_on_cancel(stream):
+            for chunk in stream:
+                deadline.arrived()
+                if getattr(chunk, "usage", None) is not None:
+                    usage = chunk.usage
+                if not chunk.choices:
+                    continue
+                finish_reason = chunk.choices[0].finish_reason or finish_reason
+                call = chunk.choices[0].delta.function_call
+                if call is None or not call.arguments:
+                    continue
+                parts.append(call.arguments)
+                for kind, item in parser.feed(call.arguments):
+                    store_details({kind: [item]})
+                    on_item(kind, item)
+    except Exception as e:
+        if deadline.expired:
+            raise httpx.ReadTimeout(f"{model} did not start answering within {timeout} s") from e
+        raise
+    finally:
+        deadline.arrived()
+    if deadline.expired:
+        raise httpx.ReadTimeout(f"{model} did not start answering within {timeout} s")
+    result, complete = _parse_details("".join(parts), finish_reason)
+    _record_usage(usage, result)
+    if _unusable(result, complete, finish_reason):
+        raise UnparseableResponse(f"no usable items from {model}", result=(result, complete))
+    return result, complete
+
+
+def _record_usage(usage, details: Dict) -> None:
+    """Record the token usage of a detail response and feed the batch size estimates."""
+    if usage is not None:
+        get_client_manager().record_usage("fetch", usage)
+        get_token_estimator().record(getattr(usage, "completion_tokens", None), details)
+
+
+def _split_chunks(vocab: List[str], grammar: List[str], chunk_size: int) -> List[Tuple[List[str], List[str]]]:
+    chunk_size = max(1, chunk_size)
+    chunks = [(vocab[i:i + chunk_size], []) for i in range(0, len(vocab), chunk_size)]
+    chunks += [([], grammar[i:i + chunk_size]) for i in range(0, len(grammar), chunk_size)]
+    return chunks
+
+
+def _plan_chunks(
+    vocab: List[str], grammar: List[str], chunk_size: Optional[int] = None
+) -> List[Tuple[List[str], List[str]]]:
+    """Split terms into per-kind chunks.
+
+    An explicit ``chunk_size`` gives fixed-size chunks. Otherwise, with
+    adaptive batching on, each chunk is sized so its expected output fits the
+    token budget, capped at ``detail_chunk_size`` terms.
+    """
+    if chunk_size or not _options["adaptive_batching"]:
+        return _split_chunks(vocab, grammar, chunk_size or _options["detail_chunk_size"])
+    return get_token_estimator().plan_batches(
+        vocab, grammar, _options["detail_token_budget"], _options["detail_chunk_size"]
+    )
+
+
+# Terms whose details are being fetched right now, see fetch_details_chunked
+_inflight: Dict[Tuple[str, str, str], Future] = {}
+_inflight_lock = threading.Lock()
+
+
+def _inflight_namespace(factory, target_lang: str, fetch_func) -> str:
+    fetch_name = getattr(fetch_func or _fetch_details, "__name__", "fetch")
+    return f"{target_lang}:{type(factory).__name__}:{fetch_name}"
+
+
+def _claim_inflight(
+    namespace: str, vocab: List[str], grammar: List[str]
+) -> Tuple[List[str], List[str], Dict[Tuple[str, str], Future], Dict[Future, Tuple[str, str]]]:
+    """Register the terms nobody is fetching yet and return the others' pending futures.
+
+    Returns the claimed vocabulary and grammar, the futures registered for
+    them keyed by ``(kind, term)``, and the futures of terms another call is
+    fetching. Every claimed future must be resolved with
+    :func:`_resolve_inflight`.
+    """
+    owned: Dict[str, List[str]] = {"vocabulary": [], "grammar": []}
+    claimed: Dict[Tuple[str, str], Future] = {}
+    shared: Dict[Future, Tuple[str, str]] = {}
+    with _inflight_lock:
+        for kind, terms in (("vocabulary", vocab), ("grammar", grammar)):
+            for term in terms:
+                key = (namespace, kind, term)
+                future = _inflight.get(key)
+                if future is None:
+                    future = _inflight[key] = Future()
+                    claimed[(kind, term)] = future
+                    owned[kind].append(term)
+                elif future not in shared and (kind, term) not in claimed:
+                    shared[future] = (kind, term)
+    return owned["vocabulary"], owned["grammar"], claimed, shared
+
+
+def _resolve_inflight(
+    namespace: str, claimed: Dict[Tuple[str, str], Future], kind: str, term: str, item: Optional[Dict]
+) -> None:
+    """Hand ``item`` to the callers waiting for a claimed term; other terms are ignored."""
+    with _inflight_lock:
+        future = claimed.pop((kind, term), None)
+        if future is None:
+            return
+        if _inflight.get((namespace, kind, term)) is future:
+            del _inflight[(namespace, kind, term)]
+    if not future.done():
+        future.set_result(item)
+
+
+def fetch_details_chunked(
+    vocab: List[str],
+    grammar: List[str],
+    factory,
+    target_lang: str,
+    api_key: str,
+    *,
+    fetch_func: Optional[Callable[[List[str], List[str], Any, str, str], Dict]] = None,
+    chunk_size: Optional[int] = None,
+    max_workers: Optional[int] = None,
+    on_chunk: Optional[Callable[[Dict], None]] = None,
+    on_item: Optional[Callable[[str, Dict], None]] = None,
+) -> Dict:
+    """Fetch details in chunks on a bounded worker pool and cache each chunk as it completes.
+
+    ``on_chunk`` is called with every chunk's ``deliver_report`` result after
+    it has been cached. ``on_item(kind, item)`` is called for every item; the
+    default fetcher streams so items arrive while a chunk is still being
+    generated, custom fetchers report their items when the chunk completes.
+    A failing chunk is reported and skipped unless every chunk fails, in
+    which case the first error is raised.
+
+    Terms already being fetched by another call are not requested again;
+    their items are taken from that call as soon as it receives them.
+    """
+    namespace = _inflight_namespace(factory, target_lang, fetch_func)
+    vocab, grammar, claimed, shared = _claim_inflight(namespace, vocab, grammar)
+    merged: Dict[str, List[Dict]] = {"vocabulary": [], "grammar": []}
+    errors: List[Exception] = []
+    chunks: List[Tuple[List[str], List[str]]] = []
+    # Everything after the claim runs under the finally below, so an error
+    # anywhere never leaves other callers waiting for the claimed terms
+    try:
+        def _item_ready(kind: str, item: Dict) -> None:
+            _resolve_inflight(namespace, claimed, kind, item.get(KEY_FIELDS[kind]), item)
+            on_item(kind, item)
+
+        streamed = on_item is not None and fetch_func is None
+        if streamed:
+            fetch = functools.partial(_fetch_details, on_item=_item_ready)
+        else:
+            fetch = fetch_func or _fetch_details
+        chunks = _plan_chunks(vocab, grammar, chunk_size)
+
+        def _merge(details: Dict) -> None:
+            store_details(details)
+            for kind in merged:
+                for item in details.get(kind, []) or []:
+                    merged[kind].append(item)
+                    if isinstance(item, dict):
+                        _resolve_inflight(namespace, claimed, kind, item.get(KEY_FIELDS[kind]), item)
+                    if on_item and not streamed:
+                        on_item(kind, item)
+            if on_chunk:
+                on_chunk(details)
+
+        def _release(v: List[str], g: List[str]) -> None:
+            # Terms the chunk did not return must not keep other callers waiting
+            for kind, terms in (("vocabulary", v), ("grammar", g)):
+                for term in terms:
+                    _resolve_inflight(namespace, claimed, kind, term, None)
+
+        if len(chunks) == 1 and not shared:
+            _merge(fetch(chunks[0][0], chunks[0][1], factory, target_lang, api_key))
+        elif chunks or shared:
+            workers = max(1, min(max_workers or _options["detail_max_workers"], len(chunks)))
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                futures = {
+                    telemetry.submit_in_context(pool, fetch, v, g, factory, target_lang, api_key): (v, g)
+                    for v, g in chunks
+                }
+                for future in as_completed([*futures, *shared]):
+                    if future in shared:
+                        kind, _ = shared[future]
+                        item = future.result()
+                        if item is not None:
+                            merged[kind].append(item)
+                            if on_item:
+                                on_item(kind, item)
+                        continue
+                    v, g = futures[future]
+                    try:
+                        details = future.result()
+                    except Exception as e:
+                        logger.warning("Detail chunk failed, #vocab: %d, #grammar: %d: %s", len(v), len(g), e)
+                        errors.append(e)
+                        _release(v, g)
+                        continue
+                    _merge(details)
+                    _release(v, g)
+    finally:
+        for kind, term in list(claimed):
+            _resolve_inflight(namespace, claimed, kind, term, None)
+    if errors and len(errors) == len(chunks):
+        raise errors[0]
+    return merged
+
+
+def _identify_cached(
+    img_b64: str,
+    factory,
+    target_lang: str,
+    api_key: str,
+    identify: Callable[[str, Any, str, str], Dict],
+) -> Dict:
+    """Run ``identify`` unless the same screen was identified before, see :class:`IdentifyCache`."""
+    identify_cache = get_identify_cache()
+    namespace = f"{target_lang}:{getattr(identify, '__name__', 'identify')}"
+    try:
+        screen = screen_from_b64(img_b64)
+    except Exception as e:
+        logger.warning("Could not hash screenshot: %s", e)
+        return identify(img_b64, factory, target_lang, api_key)
+    terms = identify_cache.get(screen, namespace)
+    telemetry.record("identify_cache_hit", terms is not None)
+    if terms is not None:
+        return terms
+    terms = identify(img_b64, factory, target_lang, api_key)
+    if terms:
+        identify_cache.put(screen, namespace, terms)
+    return terms
+
+
+def _merge_identified(results: List[Dict]) -> Dict:
+    """Merge the identify results of several tiles into one result.
+
+    Terms are deduplicated. A term reported at several levels is kept at the
+    level most tiles agree on; a tie goes to the harder level, levels being
+    listed hardest first as in ``IDENTIFY_RESPONSE_SCHEMA``.
+    """
+    levels: List[str] = []
+    votes: Dict[Tuple[str, str], Dict[str, int]] = {}
+    for result in results:
+        for level, info in (result or {}).items():
+            if level not in levels:
+                levels.append(level)
+            if not info:
+                continue
+            for kind in ("vocabulary", "grammar"):
+                for term in info.get(kind, []) or []:
+                    counts = votes.setdefault((kind, term), {})
+                    counts[level] = counts.get(level, 0) + 1
+
+    merged = {level: {"vocabulary": [], "grammar": []} for level in levels}
+    for (kind, term), counts in votes.items():
+        level = max(counts, key=lambda l: (counts[l], -levels.index(l)))
+        merged[level][kind].append(term)
+    return merged
+
+
+def _tile_images(img_b64: str, cols: int, rows: int) -> Optional[List[str]]:
+    try:
+        return imaging.tile_image_b64(img_b64, cols, rows, _options["identify_tile_overlap"])
+    except Exception as e:
+        logger.warning("Could not split screenshot into tiles: %s", e)
+        return None
+
+
+def _with_options(identify: Callable[..., Dict], options: Dict[str, Any]) -> Callable[[str, Any, str, str], Dict]:
+    """Bind the image ``options`` of the captured window to ``identify``."""
+
+    @functools.wraps(identify)
+    def with_options(img_b64: str, factory, target_lang: str, api_key: str) -> Dict:
+        return identify(img_b64, factory, target_lang, api_key, options)
+
+    return with_options
+
+
+def _with_hedging(identify: Callable[[str, Any, str, str], Dict]) -> Callable[[str, Any, str, str], Dict]:
+    """Wrap ``identify`` so a slow call is hedged when ``identify_hedge`` is on, see :mod:`hedging`."""
+    policy = get_hedge_policy()
+    if not policy.enabled:
+        return identify
+
+    @functools.wraps(identify)
+    def hedged(img_b64: str, factory, target_lang: str, api_key: str) -> Dict:
+        return hedged_call(policy, identify, img_b64, factory, target_lang, api_key)
+
+    return hedged
+
+
+def _with_tiling(identify: Callable[[str, Any, str, str], Dict]) -> Callable[[str, Any, str, str], Dict]:
+    """Wrap ``identify`` to run on the tiles of ``identify_tile_grid`` concurrently.
+
+    Tiles that fail are skipped; the call only raises when every tile failed.
+    """
+    cols, rows = imaging.parse_grid(_options["identify_tile_grid"])
+    if cols * rows <= 1:
+        return identify
+
+    def tiled(img_b64: str, factory, target_lang: str, api_key: str) -> Dict:
+        tiles = _tile_images(img_b64, cols, rows)
+        if not tiles:
+            return identify(img_b64, factory, target_lang, api_key)
+        results = []
+        errors = []
+        with ThreadPoolExecutor(max_workers=len(tiles)) as pool:
+            futures = [
+                telemetry.submit_in_context(pool, identify, tile, factory, target_lang, api_key)
+                for tile in tiles
+            ]
+            for future in futures:
+                try:
+                    results.append(future.result())
+                except Exception as e:
+                    logger.warning("Identify tile failed: %s", e)
+                    errors.append(e)
+        if len(errors) == len(tiles):
+            raise errors[0]
+        return _merge_identified(results)
+
+    # Keeps tiled results apart from whole-image results in the identify cache
+    tiled.__name__ = f"{getattr(identify, '__name__', 'identify')}@{cols}x{rows}"
+    return tiled
+
+
+def _collect_terms(terms: Dict) -> Tuple[List[str], List[str]]:
+    """Return the unique vocabulary and grammar of an identify result in order."""
+    vocab: List[str] = []
+    grammar: List[str] = []
+    for level_info in terms.values():
+        if not level_info:
+            continue
+        for w in level_info.get("vocabulary", []):
+            if w not in vocab:
+                vocab.append(w)
+        for g in level_info.get("grammar", []):
+            if g not in grammar:
+                grammar.append(g)
+    return vocab, grammar
+
+
+def _apply_level_index(terms: Dict, target_lang: str) -> Dict:
+    """Move identified terms to the level recorded in the local level index."""
+    if not _options["use_level_index"] or not terms:
+        return terms
+    index = get_level_index(target_lang)
+    if not len(index):
+        return terms
+    corrected, moved = index.classify(terms)
+    if moved:
+        logger.debug("Level index moved %d terms", moved)
+    return corrected
+
+
+def _skip_easy_terms(
+    terms: Dict,
+    vocab: List[str],
+    grammar: List[str],
+    target_lang: str,
+    learner_level: Optional[str],
+) -> Tuple[List[str], List[str], Dict[str, Set[str]]]:
+    """Drop terms well below ``learner_level`` from a detail fetch.
+
+    Returns the remaining vocabulary and grammar and the skipped terms by kind.
+    """
+    skipped: Dict[str, Set[str]] = {"vocabulary": set(), "grammar": set()}
+    margin = _options["level_skip_margin"]
+    if not learner_level or margin is None or margin < 0:
+        return vocab, grammar, skipped
+    easy = get_level_index(target_lang).levels_easier_than(learner_level, margin)
+    for level in easy:
+        info = terms.get(level) or {}
+        for kind in skipped:
+            skipped[kind].update(info.get(kind, []) or [])
+    if skipped["vocabulary"] or skipped["grammar"]:
+        logger.debug(
+            "Skipping details of %d vocabulary and %d grammar below %s",
+            len(skipped["vocabulary"]), len(skipped["grammar"]), learner_level,
+        )
+    return (
+        [w for w in vocab if w not in skipped["vocabulary"]],
+        [g for g in grammar if g not in skipped["grammar"]],
+        skipped,
+    )
+
+
+def _build_result(
+    terms: Dict,
+    vocab_cache: Dict[str, Dict],
+    grammar_cache: Dict[str, Dict],
+    keep_missing: bool = False,
+    keep: Optional[Dict[str, Set[str]]] = None,
+) -> Dict:
+    """Replace the term names of an identify result with their cached details.
+
+    Terms without details are dropped unless ``keep_missing`` is set or they
+    are listed in ``keep``, in which case they stay as plain names.
+    """
+    keep = keep or {"vocabulary": set(), "grammar": set()}
+    result = {}
+    for level, info in terms.items():
+        if not info:
+            result[level] = {"vocabulary": [], "grammar": []}
+            continue
+        vocab_list = [
+            vocab_cache.get(w, w) for w in info.get("vocabulary", [])
+            if keep_missing or w in vocab_cache or w in keep["vocabulary"]
+        ]
+        grammar_list = [
+            grammar_cache.get(g, g) for g in info.get("grammar", [])
+            if keep_missing or g in grammar_cache or g in keep["grammar"]
+        ]
+        result[level] = {"vocabulary": vocab_list, "grammar": grammar_list}
     return result
 
 
@@ -113,65 +949,91 @@ def analyze_image(
     img_b64: Optional[str] = None,
     identify_func: Optional[Callable[[str, Any, str, str], Dict]] = None,
     fetch_func: Optional[Callable[[List[str], List[str], Any, str, str], Dict]] = None,
+    use_identify_cache: bool = True,
+    learner_level: Optional[str] = None,
+    on_terms: Optional[Callable[[Dict], None]] = None,
+    on_item: Optional[Callable[[str, Dict], None]] = None,
 ) -> Dict:
     """Process screenshot through OpenAI with optional custom steps.
 
     ``identify_func`` and ``fetch_func`` allow callers to inject mock
     implementations of :func:`_identify_terms` and :func:`_fetch_details`.
+    With ``use_identify_cache`` a screen showing the same pixels as an
+    earlier one reuses its identify result instead of calling the vision
+    model again. When the
+    ``identify_tile_grid`` option is larger than 1x1 the screenshot is
+    identified tile by tile, see :func:`_with_tiling`.
+    Identified levels are corrected with the local level index, and terms
+    more than ``level_skip_margin`` levels easier than ``learner_level`` are
+    returned without fetching their details.
+    ``on_terms`` receives the result before new details are fetched, with
+    uncached terms left as plain names, and
+    ``on_item(kind, item)`` receives each new detail item as it arrives, so a
+    caller can display results progressively.
+    Metrics of the call are recorded with :mod:`telemetry`.
     """
+    with telemetry.capture("analyze"):
+        return _analyze_image(
+            title, target_lang, report_lang, api_key, img_b64, identify_func, fetch_func,
+            use_identify_cache, learner_level, on_terms, on_item,
+        )
+
+
+def _analyze_image(
+    title: str,
+    target_lang: str,
+    report_lang: str,
+    api_key: str,
+    img_b64: Optional[str],
+    identify_func: Optional[Callable[[str, Any, str, str], Dict]],
+    fetch_func: Optional[Callable[[List[str], List[str], Any, str, str], Dict]],
+    use_identify_cache: bool,
+    learner_level: Optional[str],
+    on_terms: Optional[Callable[[Dict], None]],
+    on_item: Optional[Callable[[str, Dict], None]],
+) -> Dict:
     if img_b64 is None:
         img_b64 = grab_window_image(title)
+    telemetry.attach_capture(img_b64)
     factory = get_prompt_factory(report_lang)
 
-    identify = identify_func or _identify_terms
-    terms = identify(img_b64, factory, target_lang, api_key)
+    terms = _identify_timed(
+        img_b64, factory, target_lang, api_key, identify_func, use_identify_cache, imaging.options_for(title)
+    )
 
-    cache = load_cache()
-    vocab_cache = cache.get("vocabulary", {})
-    grammar_cache = cache.get("grammar", {})
+    all_vocab, all_grammar = _collect_terms(terms)
+    cached = lookup_terms(all_vocab, all_grammar)
+    vocab_cache = cached["vocabulary"]
+    grammar_cache = cached["grammar"]
+    hits = len(vocab_cache) + len(grammar_cache)
+    telemetry.record("term_cache_hits", hits)
+    telemetry.record("term_cache_misses", len(all_vocab) + len(all_grammar) - hits)
+    if on_terms:
+        on_terms(_build_result(terms, vocab_cache, grammar_cache, keep_missing=True))
 
-    new_vocab: List[str] = []
-    new_grammar: List[str] = []
-    for level_info in terms.values():
-        if not level_info:
-            continue
-        for w in level_info.get("vocabulary", []):
-            if w not in vocab_cache and w not in new_vocab:
-                new_vocab.append(w)
-        for g in level_info.get("grammar", []):
-            if g not in grammar_cache and g not in new_grammar:
-                new_grammar.append(g)
+    new_vocab = [w for w in all_vocab if w not in vocab_cache]
+    new_grammar = [g for g in all_grammar if g not in grammar_cache]
+    missing = len(new_vocab) + len(new_grammar)
+    new_vocab, new_grammar, skipped = _skip_easy_terms(
+        terms, new_vocab, new_grammar, target_lang, learner_level
+    )
+    telemetry.record("terms_skipped", missing - len(new_vocab) - len(new_grammar))
 
-    details = {"vocabulary": [], "grammar": []}
-    fetch = fetch_func or _fetch_details
     print(new_vocab)
     print(new_grammar)
     if new_vocab or new_grammar:
-        details = fetch(new_vocab, new_grammar, factory, target_lang, api_key)
-        if len(details) == 0:
+        with telemetry.timer("fetch_ms"):
+            details = fetch_details_chunked(
+                new_vocab, new_grammar, factory, target_lang, api_key,
+                fetch_func=fetch_func, on_item=on_item,
+            )
+        if not details["vocabulary"] and not details["grammar"]:
             print(f"Got empty details, #vocab: {len(new_vocab)}, #grammar: {len(new_grammar)}")
-        for item in details.get("vocabulary", []):
-            word = item.get("word")
-            if word:
-                vocab_cache[word] = item
-        for item in details.get("grammar", []):
-            point = item.get("grammar_point")
-            if point:
-                grammar_cache[point] = item
-        cache["vocabulary"] = vocab_cache
-        cache["grammar"] = grammar_cache
-        save_cache(cache)
+        stored = items_by_term(details)
+        vocab_cache.update(stored["vocabulary"])
+        grammar_cache.update(stored["grammar"])
 
-    result = {}
-    for level, info in terms.items():
-        if not info:
-            result[level] = {"vocabulary": [], "grammar": []}
-            continue
-        vocab_list = [vocab_cache.get(w) for w in info.get("vocabulary", []) if w in vocab_cache]
-        grammar_list = [grammar_cache.get(g) for g in info.get("grammar", []) if g in grammar_cache]
-        result[level] = {"vocabulary": vocab_list, "grammar": grammar_list}
-
-    return result
+    return _build_result(terms, vocab_cache, grammar_cache, keep=skipped)
 
 
 def identify_image(
@@ -182,14 +1044,39 @@ def identify_image(
     *,
     img_b64: Optional[str] = None,
     identify_func: Optional[Callable[[str, Any, str, str], Dict]] = None,
+    use_identify_cache: bool = True,
 ) -> Dict:
     """Capture screenshot and only identify terms without fetching details."""
-    if img_b64 is None:
-        img_b64 = grab_window_image(title)
-    factory = get_prompt_factory(report_lang)
+    with telemetry.capture("identify"):
+        if img_b64 is None:
+            img_b64 = grab_window_image(title)
+        telemetry.attach_capture(img_b64)
+        factory = get_prompt_factory(report_lang)
+        return _identify_timed(
+            img_b64, factory, target_lang, api_key, identify_func, use_identify_cache, imaging.options_for(title)
+        )
 
-    identify = identify_func or _identify_terms
-    return identify(img_b64, factory, target_lang, api_key)
+
+def _identify_timed(
+    img_b64: str,
+    factory,
+    target_lang: str,
+    api_key: str,
+    identify_func: Optional[Callable[[str, Any, str, str], Dict]],
+    use_identify_cache: bool,
+    options: Dict[str, Any],
+) -> Dict:
+    """Identify the terms of the image, with tiling, the identify cache and the level index.
+
+    ``options`` are the image options of the captured window.
+    """
+    identify = _with_tiling(identify_func or _with_hedging(_with_options(_identify_terms, options)))
+    with telemetry.timer("identify_ms"):
+        if use_identify_cache:
+            terms = _identify_cached(img_b64, factory, target_lang, api_key, identify)
+        else:
+            terms = identify(img_b64, factory, target_lang, api_key)
+    return _apply_level_index(terms, target_lang)
 
 
 def fetch_details_only(
@@ -200,31 +1087,14 @@ def fetch_details_only(
     api_key: str,
     *,
     fetch_func: Optional[Callable[[List[str], List[str], Any, str, str], Dict]] = None,
+    on_item: Optional[Callable[[str, Dict], None]] = None,
 ) -> Dict:
     """Fetch details for the given vocabulary and grammar and update the cache."""
     if not vocab and not grammar:
         return {"vocabulary": [], "grammar": []}
 
-    cache = load_cache()
-    vocab_cache = cache.get("vocabulary", {})
-    grammar_cache = cache.get("grammar", {})
-
     factory = get_prompt_factory(report_lang)
-    fetch = fetch_func or _fetch_details
-    details = fetch(vocab, grammar, factory, target_lang, api_key)
-
-    for item in details.get("vocabulary", []):
-        word = item.get("word")
-        if word:
-            vocab_cache[word] = item
-
-    for item in details.get("grammar", []):
-        point = item.get("grammar_point")
-        if point:
-            grammar_cache[point] = item
-
-    cache["vocabulary"] = vocab_cache
-    cache["grammar"] = grammar_cache
-    save_cache(cache)
-
-    return details
+    with telemetry.capture("fetch"), telemetry.timer("fetch_ms"):
+        return fetch_details_chunked(
+            vocab, grammar, factory, target_lang, api_key, fetch_func=fetch_func, on_item=on_item
+        )
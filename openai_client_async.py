@@ -0,0 +1,458 @@
+"""Asyncio variant of the :mod:`openai_client` pipeline.
+
+The functions mirror :func:`openai_client.analyze_image`,
+:func:`openai_client.identify_image` and
+:func:`openai_client.fetch_details_only`, but run on ``openai.AsyncOpenAI`` so
+several analyses can overlap and any stage can be cancelled. Each stage runs
+under its own timeout (see :data:`DEFAULT_TIMEOUTS`); a stage that exceeds it
+raises :class:`asyncio.TimeoutError`.
+
+``identify_func`` and ``fetch_func`` may be coroutine functions such as
+:func:`mock_openai_client.mock_identify_terms_async` or plain functions, which
+are run in a worker thread.
+"""
+import asyncio
+import functools
+import inspect
+import logging
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from prompts import get_prompt_factory
+from cache import lookup_terms, store_details, items_by_term, KEY_FIELDS
+from identify_cache import get_identify_cache, screen_from_b64
+from client_pool import get_client_manager
+from hedging import get_hedge_policy, hedged_call_async
+from model_routing import get_model_router, UnparseableResponse
+import imaging
+import openai_client
+import telemetry
+from openai_client import (
+    _identify_request,
+    _fetch_request,
+    _fetch_route,
+    _timeout_options,
+    _unusable,
+    _parse_arguments,
+    _parse_details,
+    _missing_terms,
+    _collect_terms,
+    _build_result,
+    _apply_level_index,
+    _skip_easy_terms,
+    _merge_identified,
+    _tile_images,
+    _plan_chunks,
+    _inflight_namespace,
+    _claim_inflight,
+    _resolve_inflight,
+    _record_usage,
+)
+
+logger = logging.getLogger(__name__)
+
+# Seconds allowed per stage; None disables the timeout
+DEFAULT_TIMEOUTS: Dict[str, Optional[float]] = {
+    "capture": 10.0,
+    "identify": 60.0,
+    "fetch": 300.0,
+}
+
+
+async def _identify_terms_async(
+    img_b64: str,
+    factory,
+    target_lang: str,
+    api_key: str,
+    options: Optional[Dict[str, Any]] = None,
+) -> Dict:
+    """Ask OpenAI to identify vocabulary and grammar in the image encoded with ``options``."""
+    manager = get_client_manager()
+
+    async def attempt(model: str, timeout: Optional[float]) -> Dict:
+        response = await manager.call_async(
+            manager.get_async(api_key).chat.completions.create,
+            stage="identify",
+            **_timeout_options(timeout),
+            **_identify_request(img_b64, factory, target_lang, model, options),
+        )
+        manager.record_usage("identify", response.usage)
+        return _parse_arguments(response)
+
+    return await get_model_router().call_async("identify", attempt)
+
+
+async def _fetch_details_async(vocab: List[str], grammar: List[str], factory, target_lang: str, api_key: str) -> Dict:
+    """Ask OpenAI for detailed explanations of given terms.
+
+    Like :func:`openai_client._fetch_details`, complete items of a truncated
+    response are kept and only the missing terms are requested again, and
+    vocabulary and grammar are requested concurrently with their own schemas.
+    """
+    if vocab and grammar:
+        outcomes = await asyncio.gather(
+            _fetch_details_async(vocab, [], factory, target_lang, api_key),
+            _fetch_details_async([], grammar, factory, target_lang, api_key),
+            return_exceptions=True,
+        )
+        merged: Dict[str, List[Dict]] = {"vocabulary": [], "grammar": []}
+        errors = []
+        for kind, outcome in zip(("vocabulary", "grammar"), outcomes):
+            if isinstance(outcome, asyncio.CancelledError):
+                raise outcome
+            if isinstance(outcome, BaseException):
+                logger.warning("Fetching %s failed: %s", kind, outcome)
+                errors.append(outcome)
+            else:
+                merged[kind] = outcome.get(kind, []) or []
+        if len(errors) == len(outcomes):
+            raise errors[0]
+        return merged
+
+    merged: Dict[str, List[Dict]] = {"vocabulary": [], "grammar": []}
+    rounds = 0
+    while True:
+        try:
+            result, complete = await get_model_router().call_async(
+                _fetch_route(vocab, grammar),
+                lambda model, timeout: _fetch_details_attempt_async(
+                    vocab, grammar, factory, target_lang, api_key, model, timeout
+                ),
+            )
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            if not rounds:
+                raise
+            logger.warning("Repair request failed, #vocab: %d, #grammar: %d", len(vocab), len(grammar))
+            break
+        for kind in merged:
+            merged[kind].extend(result.get(kind, []) or [])
+        if complete:
+            break
+        store_details(result)
+        vocab, grammar = _missing_terms(vocab, grammar, merged)
+        if not vocab and not grammar or rounds >= openai_client._options["max_repair_rounds"]:
+            break
+        rounds += 1
+    return merged
+
+
+async def _fetch_details_attempt_async(
+    vocab: List[str],
+    grammar: List[str],
+    factory,
+    target_lang: str,
+    api_key: str,
+    model: str,
+    timeout: Optional[float],
+) -> Tuple[Dict, bool]:
+    manager = get_client_manager()
+    response = await manager.call_async(
+        manager.get_async(api_key).chat.completions.create,
+        stage="fetch",
+        **_timeout_options(timeout),
+        **_fetch_request(vocab, grammar, factory, target_lang, model),
+    )
+    choice = response.choices[0]
+    call = choice.message.function_call
+    result, complete = _parse_details(call.arguments if call else "", choice.finish_reason)
+    _record_usage(response.usage, result)
+    if _unusable(result, complete, choice.finish_reason):
+        raise UnparseableResponse(f"no usable items from {model}", result=(result, complete))
+    return result, complete
+
+
+async def _call(func: Callable[..., Any], *args) -> Any:
+    """Await ``func(*args)``, running plain functions in a worker thread."""
+    if inspect.iscoroutinefunction(func):
+        return await func(*args)
+    result = await asyncio.to_thread(func, *args)
+    if inspect.isawaitable(result):
+        result = await result
+    return result
+
+
+async def _stage(name: str, awaitable: Awaitable, timeouts: Optional[Dict[str, Optional[float]]]) -> Any:
+    limits = dict(DEFAULT_TIMEOUTS)
+    if timeouts:
+        limits.update(timeouts)
+    with telemetry.timer(f"{name}_ms"):
+        return await asyncio.wait_for(awaitable, limits.get(name))
+
+
+def _with_options_async(identify: Callable[..., Any], options: Dict[str, Any]) -> Callable[..., Any]:
+    """Async counterpart of :func:`openai_client._with_options`."""
+
+    @functools.wraps(identify)
+    async def with_options(img_b64: str, factory, target_lang: str, api_key: str) -> Dict:
+        return await identify(img_b64, factory, target_lang, api_key, options)
+
+    return with_options
+
+
+def _with_hedging_async(identify: Callable[..., Any]) -> Callable[..., Any]:
+    """Async counterpart of :func:`openai_client._with_hedging`; the slower request is cancelled."""
+    policy = get_hedge_policy()
+    if not policy.enabled:
+        return identify
+
+    @functools.wraps(identify)
+    async def hedged(img_b64: str, factory, target_lang: str, api_key: str) -> Dict:
+        return await hedged_call_async(policy, lambda: _call(identify, img_b64, factory, target_lang, api_key))
+
+    return hedged
+
+
+def _with_tiling_async(identify: Callable[..., Any]) -> Callable[..., Any]:
+    """Async counterpart of :func:`openai_client._with_tiling`."""
+    cols, rows = imaging.parse_grid(openai_client._options["identify_tile_grid"])
+    if cols * rows <= 1:
+        return identify
+
+    async def tiled(img_b64: str, factory, target_lang: str, api_key: str) -> Dict:
+        tiles = await asyncio.to_thread(_tile_images, img_b64, cols, rows)
+        if not tiles:
+            return await _call(identify, img_b64, factory, target_lang, api_key)
+        outcomes = await asyncio.gather(
+            *(_call(identify, tile, factory, target_lang, api_key) for tile in tiles),
+            return_exceptions=True,
+        )
+        results = []
+        errors = []
+        for outcome in outcomes:
+            if isinstance(outcome, asyncio.CancelledError):
+                raise outcome
+            if isinstance(outcome, BaseException):
+                logger.warning("Identify tile failed: %s", outcome)
+                errors.append(outcome)
+            else:
+                results.append(outcome)
+        if len(errors) == len(tiles):
+            raise errors[0]
+        return _merge_identified(results)
+
+    tiled.__name__ = f"{getattr(identify, '__name__', 'identify')}@{cols}x{rows}"
+    return tiled
+
+
+async def _identify_cached_async(
+    img_b64: str,
+    factory,
+    target_lang: str,
+    api_key: str,
+    identify: Callable[..., Any],
+) -> Dict:
+    identify_cache = get_identify_cache()
+    namespace = f"{target_lang}:{getattr(identify, '__name__', 'identify')}"
+    try:
+        screen = await asyncio.to_thread(screen_from_b64, img_b64)
+    except Exception as e:
+        logger.warning("Could not hash screenshot: %s", e)
+        return await _call(identify, img_b64, factory, target_lang, api_key)
+    # The lookup compares frames pixel by pixel, so it stays off the event loop
+    terms = await asyncio.to_thread(identify_cache.get, screen, namespace)
+    telemetry.record("identify_cache_hit", terms is not None)
+    if terms is not None:
+        return terms
+    terms = await _call(identify, img_b64, factory, target_lang, api_key)
+    if terms:
+        await asyncio.to_thread(identify_cache.put, screen, namespace, terms)
+    return terms
+
+
+async def fetch_details_chunked_async(
+    vocab: List[str],
+    grammar: List[str],
+    factory,
+    target_lang: str,
+    api_key: str,
+    *,
+    fetch_func: Optional[Callable[..., Any]] = None,
+    chunk_size: Optional[int] = None,
+    max_workers: Optional[int] = None,
+    on_chunk: Optional[Callable[[Dict], None]] = None,
+) -> Dict:
+    """Async counterpart of :func:`openai_client.fetch_details_chunked`.
+
+    Terms already being fetched by another call, sync or async, are not
+    requested again; their items are taken from that call.
+    """
+    fetch = fetch_func or _fetch_details_async
+    options = openai_client._options
+    namespace = _inflight_namespace(factory, target_lang, fetch_func)
+    vocab, grammar, claimed, shared = _claim_inflight(namespace, vocab, grammar)
+    merged: Dict[str, List[Dict]] = {"vocabulary": [], "grammar": []}
+    errors: List[BaseException] = []
+    chunks: List[Tuple[List[str], List[str]]] = []
+    tasks: Dict[asyncio.Future, Tuple[List[str], List[str]]] = {}
+    waiting: Dict[asyncio.Future, str] = {}
+
+    def _release(v: List[str], g: List[str]) -> None:
+        for kind, terms in (("vocabulary", v), ("grammar", g)):
+            for term in terms:
+                _resolve_inflight(namespace, claimed, kind, term, None)
+
+    try:
+        chunks = _plan_chunks(vocab, grammar, chunk_size)
+        semaphore = asyncio.Semaphore(max(1, max_workers or options["detail_max_workers"]))
+
+        async def _run(v: List[str], g: List[str]) -> Dict:
+            async with semaphore:
+                return await _call(fetch, v, g, factory, target_lang, api_key)
+
+        tasks = {asyncio.ensure_future(_run(v, g)): (v, g) for v, g in chunks}
+        # Shielded so cancelling this call never cancels the other caller's future
+        waiting = {
+            asyncio.ensure_future(asyncio.shield(asyncio.wrap_future(future))): kind
+            for future, (kind, _) in shared.items()
+        }
+        pending = set(tasks) | set(waiting)
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task in waiting:
+                    item = task.result()
+                    if item is not None:
+                        merged[waiting[task]].append(item)
+                    continue
+                v, g = tasks[task]
+                try:
+                    details = task.result()
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    logger.warning("Detail chunk failed: %s", e)
+                    errors.append(e)
+                    _release(v, g)
+                    continue
+                store_details(details)
+                for kind in merged:
+                    for item in details.get(kind, []) or []:
+                        merged[kind].append(item)
+                        if isinstance(item, dict):
+                            _resolve_inflight(namespace, claimed, kind, item.get(KEY_FIELDS[kind]), item)
+                if on_chunk:
+                    on_chunk(details)
+                _release(v, g)
+    finally:
+        for task in [*tasks, *waiting]:
+            task.cancel()
+        for kind, term in list(claimed):
+            _resolve_inflight(namespace, claimed, kind, term, None)
+    if errors and len(errors) == len(chunks):
+        raise errors[0]
+    return merged
+
+
+async def analyze_image_async(
+    title: str,
+    target_lang: str,
+    report_lang: str,
+    api_key: str,
+    *,
+    img_b64: Optional[str] = None,
+    identify_func: Optional[Callable[..., Any]] = None,
+    fetch_func: Optional[Callable[..., Any]] = None,
+    use_identify_cache: bool = True,
+    learner_level: Optional[str] = None,
+    timeouts: Optional[Dict[str, Optional[float]]] = None,
+) -> Dict:
+    """Async counterpart of :func:`openai_client.analyze_image`."""
+    with telemetry.capture("analyze"):
+        if img_b64 is None:
+            img_b64 = await _stage(
+                "capture", asyncio.to_thread(openai_client.grab_window_image, title), timeouts
+            )
+        telemetry.attach_capture(img_b64)
+        factory = get_prompt_factory(report_lang)
+
+        identify = _with_tiling_async(
+            identify_func or _with_hedging_async(_with_options_async(_identify_terms_async, imaging.options_for(title)))
+        )
+        if use_identify_cache:
+            identify_call = _identify_cached_async(img_b64, factory, target_lang, api_key, identify)
+        else:
+            identify_call = _call(identify, img_b64, factory, target_lang, api_key)
+        terms = _apply_level_index(await _stage("identify", identify_call, timeouts), target_lang)
+
+        all_vocab, all_grammar = _collect_terms(terms)
+        cached = lookup_terms(all_vocab, all_grammar)
+        vocab_cache = cached["vocabulary"]
+        grammar_cache = cached["grammar"]
+        hits = len(vocab_cache) + len(grammar_cache)
+        telemetry.record("term_cache_hits", hits)
+        telemetry.record("term_cache_misses", len(all_vocab) + len(all_grammar) - hits)
+
+        new_vocab = [w for w in all_vocab if w not in vocab_cache]
+        new_grammar = [g for g in all_grammar if g not in grammar_cache]
+        missing = len(new_vocab) + len(new_grammar)
+        new_vocab, new_grammar, skipped = _skip_easy_terms(
+            terms, new_vocab, new_grammar, target_lang, learner_level
+        )
+        telemetry.record("terms_skipped", missing - len(new_vocab) - len(new_grammar))
+        if new_vocab or new_grammar:
+            details = await _stage(
+                "fetch",
+                fetch_details_chunked_async(
+                    new_vocab, new_grammar, factory, target_lang, api_key, fetch_func=fetch_func
+                ),
+                timeouts,
+            )
+            stored = items_by_term(details)
+            vocab_cache.update(stored["vocabulary"])
+            grammar_cache.update(stored["grammar"])
+
+        return _build_result(terms, vocab_cache, grammar_cache, keep=skipped)
+
+
+async def identify_image_async(
+    title: str,
+    target_lang: str,
+    report_lang: str,
+    api_key: str,
+    *,
+    img_b64: Optional[str] = None,
+    identify_func: Optional[Callable[..., Any]] = None,
+    use_identify_cache: bool = True,
+    timeouts: Optional[Dict[str, Optional[float]]] = None,
+) -> Dict:
+    """Async counterpart of :func:`openai_client.identify_image`."""
+    with telemetry.capture("identify"):
+        if img_b64 is None:
+            img_b64 = await _stage(
+                "capture", asyncio.to_thread(openai_client.grab_window_image, title), timeouts
+            )
+        telemetry.attach_capture(img_b64)
+        factory = get_prompt_factory(report_lang)
+
+        identify = _with_tiling_async(
+            identify_func or _with_hedging_async(_with_options_async(_identify_terms_async, imaging.options_for(title)))
+        )
+        if use_identify_cache:
+            identify_call = _identify_cached_async(img_b64, factory, target_lang, api_key, identify)
+        else:
+            identify_call = _call(identify, img_b64, factory, target_lang, api_key)
+        return _apply_level_index(await _stage("identify", identify_call, timeouts), target_lang)
+
+
+async def fetch_details_only_async(
+    vocab: List[str],
+    grammar: List[str],
+    target_lang: str,
+    report_lang: str,
+    api_key: str,
+    *,
+    fetch_func: Optional[Callable[..., Any]] = None,
+    timeouts: Optional[Dict[str, Optional[float]]] = None,
+) -> Dict:
+    """Async counterpart of :func:`openai_client.fetch_details_only`."""
+    if not vocab and not grammar:
+        return {"vocabulary": [], "grammar": []}
+
+    factory = get_prompt_factory(report_lang)
+    with telemetry.capture("fetch"):
+        return await _stage(
+            "fetch",
+            fetch_details_chunked_async(vocab, grammar, factory, target_lang, api_key, fetch_func=fetch_func),
+            timeouts,
+        )
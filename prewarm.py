@@ -0,0 +1,194 @@
+"""Prewarm the term cache from a word/grammar list without starting the UI.
+
+Usage::
+
+    python prewarm.py jlpt_n3.txt --report-lang zh-TW
+    python prewarm.py words.csv --levels N2,N3 --batch-size 10 --mock
+
+Plain text lists group entries under level headers such as ``# N3``. An
+entry starting with ``〜`` is treated as grammar, anything else as
+vocabulary; a header like ``# N3 grammar`` forces the kind for its section.
+CSV lists have ``term,level,kind`` columns, with ``kind`` optional.
+
+Terms that are already cached are skipped, so an interrupted run can simply
+be started again. Terms the model did not return are remembered in a state
+file next to the list and retried up to ``--max-attempts`` times.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from typing import Dict, List, Tuple
+
+from cache import get_term_cache, lookup_terms
+from level_index import read_word_list
+from config import load_settings
+import openai_client
+from mock_openai_client import mock_fetch_details
+
+
+def _load_state(path: str) -> Dict:
+    if not os.path.exists(path):
+        return {"attempts": {}}
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except Exception:
+        return {"attempts": {}}
+
+
+def _save_state(path: str, state: Dict) -> None:
+    try:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(state, f, ensure_ascii=False)
+    except Exception:
+        pass
+
+
+def _batches(vocab: List[str], grammar: List[str], size: int) -> List[Tuple[List[str], List[str]]]:
+    result = []
+    for i in range(0, len(vocab), size):
+        result.append((vocab[i:i + size], []))
+    for i in range(0, len(grammar), size):
+        result.append(([], grammar[i:i + size]))
+    return result
+
+
+def prewarm(
+    levels: Dict[str, Dict[str, List[str]]],
+    target_lang: str,
+    report_lang: str,
+    api_key: str,
+    *,
+    fetch_func=None,
+    batch_size: int = 20,
+    max_attempts: int = 3,
+    state_path: str | None = None,
+) -> Dict:
+    """Fetch and cache details for every uncached term in ``levels``.
+
+    Returns counters for the terms that were already cached, fetched, and
+    still missing after the run.
+    """
+    state = _load_state(state_path) if state_path else {"attempts": {}}
+    attempts: Dict[str, int] = state.setdefault("attempts", {})
+    totals = {"cached": 0, "fetched": 0, "missing": 0, "skipped": 0}
+
+    todo: List[Tuple[str, List[str], List[str]]] = []
+    for level in sorted(levels):
+        vocab = list(dict.fromkeys(levels[level].get("vocabulary", [])))
+        grammar = list(dict.fromkeys(levels[level].get("grammar", [])))
+        cached = lookup_terms(vocab, grammar)
+        pending = {}
+        for kind, terms in (("vocabulary", vocab), ("grammar", grammar)):
+            pending[kind] = []
+            for term in terms:
+                if term in cached[kind]:
+                    totals["cached"] += 1
+                elif attempts.get(f"{kind}:{term}", 0) >= max_attempts:
+                    totals["skipped"] += 1
+                else:
+                    pending[kind].append(term)
+        for vocab_batch, grammar_batch in _batches(pending["vocabulary"], pending["grammar"], batch_size):
+            todo.append((level, vocab_batch, grammar_batch))
+
+    total_terms = sum(len(v) + len(g) for _, v, g in todo)
+    print(
+        f"{totals['cached']} cached, {totals['skipped']} skipped after {max_attempts} attempts, "
+        f"{total_terms} to fetch in {len(todo)} batches"
+    )
+
+    done = 0
+    started = time.monotonic()
+    for index, (level, vocab_batch, grammar_batch) in enumerate(todo, start=1):
+        try:
+            details = openai_client.fetch_details_only(
+                vocab_batch,
+                grammar_batch,
+                target_lang,
+                report_lang,
+                api_key,
+                fetch_func=fetch_func,
+            )
+        except Exception as e:
+            print(f"[{level}] batch {index}/{len(todo)} failed: {e}")
+            details = {}
+        returned = {
+            "vocabulary": {i.get("word") for i in details.get("vocabulary", []) or []},
+            "grammar": {i.get("grammar_point") for i in details.get("grammar", []) or []},
+        }
+        for kind, terms in (("vocabulary", vocab_batch), ("grammar", grammar_batch)):
+            for term in terms:
+                if term in returned[kind]:
+                    totals["fetched"] += 1
+                    attempts.pop(f"{kind}:{term}", None)
+                else:
+                    totals["missing"] += 1
+                    attempts[f"{kind}:{term}"] = attempts.get(f"{kind}:{term}", 0) + 1
+        if state_path:
+            _save_state(state_path, state)
+
+        done += len(vocab_batch) + len(grammar_batch)
+        elapsed = time.monotonic() - started
+        eta = elapsed / done * (total_terms - done) if done else 0.0
+        print(
+            f"[{level}] batch {index}/{len(todo)}: {done}/{total_terms} terms, "
+            f"{totals['fetched']} fetched, {totals['missing']} missing, "
+            f"{elapsed:.0f}s elapsed, ~{eta:.0f}s left"
+        )
+    return totals
+
+
+def main(argv: List[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Prefetch details for a JLPT word/grammar list.")
+    parser.add_argument("list", help="plain text or CSV word list")
+    parser.add_argument("--target-lang", default="Japanese")
+    parser.add_argument("--report-lang", default=None, help="defaults to the saved report language")
+    parser.add_argument("--levels", default="", help="comma separated levels to include, e.g. N3,N2")
+    parser.add_argument("--batch-size", type=int, default=20)
+    parser.add_argument("--max-attempts", type=int, default=3)
+    parser.add_argument("--state", default=None, help="progress file (default: <list>.prewarm.json)")
+    parser.add_argument("--api-key", default=None)
+    parser.add_argument("--mock", action="store_true", help="use mock_fetch_details instead of the API")
+    args = parser.parse_args(argv)
+
+    settings = load_settings()
+    openai_client.configure(settings)
+    report_lang = args.report_lang or settings.get("report_language", "en")
+    api_key = args.api_key or settings.get("api_key") or os.environ.get("OPENAI_API_KEY", "")
+    if not api_key and not args.mock:
+        print("API key not provided")
+        return 1
+
+    levels = read_word_list(args.list)
+    if args.levels:
+        wanted = {lvl.strip().upper() for lvl in args.levels.split(",") if lvl.strip()}
+        levels = {lvl: terms for lvl, terms in levels.items() if lvl in wanted}
+
+    state_path = args.state or f"{args.list}.prewarm.json"
+    try:
+        totals = prewarm(
+            levels,
+            args.target_lang,
+            report_lang,
+            api_key,
+            fetch_func=mock_fetch_details if args.mock else None,
+            batch_size=max(1, args.batch_size),
+            max_attempts=args.max_attempts,
+            state_path=state_path,
+        )
+    except KeyboardInterrupt:
+        print("Interrupted; run again to resume")
+        return 130
+    finally:
+        get_term_cache().close()
+    print(
+        f"Done: {totals['fetched']} fetched, {totals['cached']} already cached, "
+        f"{totals['missing']} missing, {totals['skipped']} skipped"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
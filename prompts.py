@@ -42,6 +42,10 @@ f"""
         )
 
 
+_CHINESE_FACTORY = ChinesePromptFactory()
+_ENGLISH_FACTORY = EnglishPromptFactory()
+
+
 def get_prompt_factory(language: str) -> PromptFactory:
-    return ChinesePromptFactory() if language.startswith("zh") else EnglishPromptFactory()
+    return _CHINESE_FACTORY if language.startswith("zh") else _ENGLISH_FACTORY
 
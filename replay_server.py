@@ -0,0 +1,403 @@
+"""Local stand-in for the OpenAI chat completions endpoint.
+
+Usage::
+
+    python replay_server.py record --upstream https://api.openai.com/v1
+    python replay_server.py replay --latency 0.8 --jitter 0.2 --fail-rate 0.05
+    python replay_server.py replay --synthesize --max-concurrent 4
+
+and set **API Base URL** in the settings (``api_base_url``) to the printed
+address, e.g. ``http://127.0.0.1:8765/v1``. The app then runs its real
+request code, the openai SDK and its HTTP pool against the server.
+
+``record`` forwards every request to ``--upstream`` with the caller's API key
+and saves the request and response in ``--dir``, keyed by
+:func:`request_key`. ``replay`` answers from those recordings; requests
+without a recording get a 404, or with ``--synthesize`` a response built by
+:class:`mock_openai_client.LatencyMock`.
+
+Both modes can add ``--latency`` (seconds before the response, varied by
+``--jitter``), answer streamed requests in chunks of ``--chunk-chars``
+characters every ``--chunk-interval`` seconds, fail a ``--fail-rate`` share
+of requests with one of ``--fail-status`` (429 responses carry
+``Retry-After``) and reject requests beyond ``--max-concurrent`` running
+ones with 429.
+"""
+import argparse
+import hashlib
+import json
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+
+from mock_openai_client import LatencyMock
+
+RECORDINGS_DIR = os.path.join(os.path.expanduser("~"), ".language_helper_recordings")
+DEFAULT_UPSTREAM = "https://api.openai.com/v1"
+
+DEFAULT_OPTIONS: Dict[str, Any] = {
+    "mode": "replay",
+    "dir": RECORDINGS_DIR,
+    "upstream": DEFAULT_UPSTREAM,
+    "synthesize": False,
+    "synthetic_terms": 10,
+    "latency": 0.0,
+    "jitter": 0.0,
+    "chunk_chars": 40,
+    "chunk_interval": 0.02,
+    "fail_rate": 0.0,
+    "fail_status": [429, 500, 503],
+    "retry_after": 1.0,
+    "max_concurrent": 0,
+    "quiet": False,
+}
+
+# Request fields that identify a request; stream options and the token
+# limit, which follows the client's running estimate, are left out so a
+# recording matches every variant of the same request.
+KEY_FIELDS = (
+    "model",
+    "messages",
+    "functions",
+    "function_call",
+    "tools",
+    "tool_choice",
+    "response_format",
+    "temperature",
+    "top_p",
+)
+
+
+def request_key(body: Dict) -> str:
+    """Return the hash a chat completion request is recorded under."""
+    normalized = {field: body[field] for field in KEY_FIELDS if body.get(field) is not None}
+    text = json.dumps(normalized, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def _recording_path(directory: str, key: str) -> str:
+    return os.path.join(directory, f"{key}.json")
+
+
+def load_recording(directory: str, key: str) -> Optional[Dict]:
+    path = _recording_path(directory, key)
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except Exception as e:
+        print(f"Could not read recording {path}: {e}")
+        return None
+
+
+def save_recording(directory: str, key: str, request: Dict, status: int, response: Dict) -> None:
+    os.makedirs(directory, exist_ok=True)
+    try:
+        with open(_recording_path(directory, key), "w", encoding="utf-8") as f:
+            json.dump({"request": request, "status": status, "response": response}, f, ensure_ascii=False, indent=2)
+    except Exception as e:
+        print(f"Could not save recording {key}: {e}")
+
+
+def _error_body(status: int, message: str) -> Dict:
+    kind = "rate_limit_error" if status == 429 else "server_error" if status >= 500 else "invalid_request_error"
+    return {"error": {"message": message, "type": kind, "code": None, "param": None}}
+
+
+def _completion(model: str, function_name: Optional[str], arguments: str) -> Dict:
+    """Return a chat completion whose message calls ``function_name`` with ``arguments``."""
+    message: Dict[str, Any] = {"role": "assistant", "content": None}
+    if function_name:
+        message["function_call"] = {"name": function_name, "arguments": arguments}
+    else:
+        message["content"] = arguments
+    return {
+        "id": f"chatcmpl-{uuid.uuid4().hex[:24]}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{
+            "index": 0,
+            "message": message,
+            "finish_reason": "function_call" if function_name else "stop",
+        }],
+        "usage": {
+            "prompt_tokens": 0,
+            "completion_tokens": max(1, len(arguments) // 3),
+            "total_tokens": max(1, len(arguments) // 3),
+            "prompt_tokens_details": {"cached_tokens": 0},
+        },
+    }
+
+
+def stream_chunks(completion: Dict, chunk_chars: int, include_usage: bool) -> List[Dict]:
+    """Split a chat completion into the chunks of its streamed form."""
+    choice = completion["choices"][0]
+    message = choice.get("message") or {}
+    call = message.get("function_call")
+    text = (call or {}).get("arguments") or message.get("content") or ""
+    base = {
+        "id": completion.get("id", f"chatcmpl-{uuid.uuid4().hex[:24]}"),
+        "object": "chat.completion.chunk",
+        "created": completion.get("created", int(time.time())),
+        "model": completion.get("model", ""),
+    }
+
+    def chunk(delta: Dict, finish_reason: Optional[str] = None) -> Dict:
+        return {**base, "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}]}
+
+    first: Dict[str, Any] = {"role": "assistant", "content": None if call else ""}
+    if call:
+        first["function_call"] = {"name": call.get("name"), "arguments": ""}
+    chunks = [chunk(first)]
+    size = max(1, chunk_chars)
+    for start in range(0, len(text), size):
+        piece = text[start:start + size]
+        chunks.append(chunk({"function_call": {"arguments": piece}} if call else {"content": piece}))
+    chunks.append(chunk({}, choice.get("finish_reason") or "stop"))
+    if include_usage and completion.get("usage"):
+        chunks.append({**base, "choices": [], "usage": completion["usage"]})
+    return chunks
+
+
+class ReplayServer(ThreadingHTTPServer):
+    """HTTP server answering chat completion requests from recordings."""
+
+    daemon_threads = True
+
+    def __init__(self, address: Tuple[str, int], options: Optional[Dict[str, Any]] = None):
+        super().__init__(address, ReplayHandler)
+        self.options = dict(DEFAULT_OPTIONS)
+        if options:
+            self.options.update(options)
+        self.random = random.Random()
+        self.mock = LatencyMock(terms=self.options["synthetic_terms"])
+        self._running = 0
+        self._lock = threading.Lock()
+        self.stats: Dict[str, int] = {
+            "requests": 0, "recorded": 0, "replayed": 0, "synthesized": 0,
+            "missing": 0, "faults": 0, "rejected": 0,
+        }
+
+    def handle_error(self, request, client_address) -> None:
+        # Clients that gave up on a request, e.g. a cancelled hedge, are expected
+        if isinstance(sys.exc_info()[1], ConnectionError):
+            return
+        super().handle_error(request, client_address)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def count(self, key: str) -> None:
+        with self._lock:
+            self.stats[key] += 1
+
+    def acquire(self) -> bool:
+        """Take a concurrency slot; ``False`` when ``max_concurrent`` are running."""
+        with self._lock:
+            limit = self.options["max_concurrent"]
+            if limit and self._running >= limit:
+                return False
+            self._running += 1
+            return True
+
+    def release(self) -> None:
+        with self._lock:
+            self._running -= 1
+
+    def latency(self) -> float:
+        latency = self.options["latency"]
+        jitter = self.options["jitter"]
+        with self._lock:
+            return max(0.0, latency * (1 + self.random.uniform(-jitter, jitter)))
+
+    def fault(self) -> Optional[int]:
+        """Return the status of an injected failure, or ``None``."""
+        with self._lock:
+            if self.random.random() >= self.options["fail_rate"]:
+                return None
+            return self.random.choice(self.options["fail_status"])
+
+    def synthesize(self, body: Dict) -> Dict:
+        """Build a response for ``body`` from the mock data."""
+        name = (body.get("function_call") or {}).get("name")
+        model = body.get("model", "")
+        if name == "identify_terms":
+            return _completion(model, name, json.dumps(self.mock.identify("", None, "", ""), ensure_ascii=False))
+        try:
+            terms = json.loads(body["messages"][-1]["content"])
+        except Exception:
+            terms = {}
+        items = self.mock.fetch(terms.get("vocabs", []), terms.get("grammars", []), None, "", "")
+        return _completion(model, name, json.dumps(items, ensure_ascii=False))
+
+
+class ReplayHandler(BaseHTTPRequestHandler):
+    server: ReplayServer
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format: str, *args) -> None:
+        if not self.server.options["quiet"]:
+            super().log_message(format, *args)
+
+    def _send_json(self, status: int, body: Dict, headers: Optional[Dict[str, str]] = None) -> None:
+        data = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _send_stream(self, completion: Dict, include_usage: bool) -> None:
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+        interval = self.server.options["chunk_interval"]
+        for chunk in stream_chunks(completion, self.server.options["chunk_chars"], include_usage):
+            self.wfile.write(f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n".encode("utf-8"))
+            self.wfile.flush()
+            if interval:
+                time.sleep(interval)
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+
+    def do_GET(self) -> None:
+        if self.path.rstrip("/").endswith("/stats"):
+            self._send_json(200, self.server.stats)
+            return
+        self._send_json(404, _error_body(404, f"Unknown path {self.path}"))
+
+    def do_POST(self) -> None:
+        length = int(self.headers.get("Content-Length") or 0)
+        raw = self.rfile.read(length)
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self._send_json(404, _error_body(404, f"Unknown path {self.path}"))
+            return
+        try:
+            body = json.loads(raw or b"{}")
+        except ValueError:
+            self._send_json(400, _error_body(400, "Request body is not JSON"))
+            return
+
+        server = self.server
+        server.count("requests")
+        if not server.acquire():
+            server.count("rejected")
+            self._send_json(
+                429, _error_body(429, "Too many concurrent requests"),
+                {"Retry-After": str(server.options["retry_after"])},
+            )
+            return
+        try:
+            self._answer(body)
+        finally:
+            server.release()
+
+    def _answer(self, body: Dict) -> None:
+        server = self.server
+        time.sleep(server.latency())
+        status = server.fault()
+        if status is not None:
+            server.count("faults")
+            headers = {"Retry-After": str(server.options["retry_after"])} if status == 429 else None
+            self._send_json(status, _error_body(status, f"Injected {status}"), headers)
+            return
+
+        key = request_key(body)
+        if server.options["mode"] == "record":
+            status, response = self._forward(body)
+            if status == 200:
+                save_recording(server.options["dir"], key, body, status, response)
+                server.count("recorded")
+        else:
+            recording = load_recording(server.options["dir"], key)
+            if recording is not None:
+                status, response = recording.get("status", 200), recording["response"]
+                server.count("replayed")
+            elif server.options["synthesize"]:
+                status, response = 200, server.synthesize(body)
+                server.count("synthesized")
+            else:
+                server.count("missing")
+                self._send_json(404, _error_body(404, f"No recording for request {key}"))
+                return
+
+        if status == 200 and body.get("stream"):
+            include_usage = bool((body.get("stream_options") or {}).get("include_usage"))
+            self._send_stream(response, include_usage)
+        else:
+            self._send_json(status, response)
+
+    def _forward(self, body: Dict) -> Tuple[int, Dict]:
+        """Send ``body`` upstream without streaming and return its status and JSON."""
+        upstream = {k: v for k, v in body.items() if k not in ("stream", "stream_options")}
+        headers = {"Content-Type": "application/json"}
+        if self.headers.get("Authorization"):
+            headers["Authorization"] = self.headers["Authorization"]
+        try:
+            response = httpx.post(
+                self.server.options["upstream"].rstrip("/") + "/chat/completions",
+                json=upstream, headers=headers, timeout=120.0,
+            )
+            return response.status_code, response.json()
+        except Exception as e:
+            return 502, _error_body(502, f"Upstream request failed: {e}")
+
+
+def start_server(host: str = "127.0.0.1", port: int = 0, **options) -> ReplayServer:
+    """Start a server on a background thread; ``port=0`` picks a free port."""
+    server = ReplayServer((host, port), options)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main(argv: List[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Record or replay OpenAI chat completions locally.")
+    parser.add_argument("mode", choices=["record", "replay"])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--dir", default=RECORDINGS_DIR, help="directory of the recordings")
+    parser.add_argument("--upstream", default=DEFAULT_UPSTREAM, help="API base URL to record from")
+    parser.add_argument("--synthesize", action="store_true", help="answer unrecorded requests with mock data")
+    parser.add_argument("--synthetic-terms", type=int, default=10, help="terms per synthesized identify result")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds before each response")
+    parser.add_argument("--jitter", type=float, default=0.0, help="relative latency variation, e.g. 0.2")
+    parser.add_argument("--chunk-chars", type=int, default=40, help="characters per streamed chunk")
+    parser.add_argument("--chunk-interval", type=float, default=0.02, help="seconds between streamed chunks")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="share of requests to fail")
+    parser.add_argument("--fail-status", type=int, nargs="+", default=[429, 500, 503])
+    parser.add_argument("--retry-after", type=float, default=1.0, help="Retry-After of 429 responses")
+    parser.add_argument("--max-concurrent", type=int, default=0, help="running requests before 429, 0 = no limit")
+    parser.add_argument("--quiet", action="store_true", help="do not log every request")
+    args = parser.parse_args(argv)
+
+    options = {k: v for k, v in vars(args).items() if k not in ("host", "port")}
+    server = ReplayServer((args.host, args.port), options)
+    print(f"{args.mode.capitalize()} server listening on {server.base_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(json.dumps(server.stats))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
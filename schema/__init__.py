@@ -1,13 +1,75 @@
+import functools
+import re
 from importlib import import_module
-from typing import Tuple
+from typing import Any, Optional, Tuple
 
 # Map language codes to schema modules
 _SCHEMAS = {
     'ja': 'schema.ja'
 }
 
-def get_schema(lang: str = 'ja') -> Tuple[dict, dict]:
-    """Return ITEM_SCHEMA and IDENTIFY_RESPONSE_SCHEMA for given language."""
+# "off" sends the schemas as written, "short" keeps the first sentence of each
+# description and "strip" removes descriptions
+SCHEMA_MINIFY_MODES = ["off", "short", "strip"]
+
+_SENTENCE_END = re.compile(r"(。|\.\s|；)")
+_EXAMPLE = re.compile(r"[，,]?\s*(例如|e\.g\.).*$")
+# Longer descriptions are cut at their first clause in "short" mode
+_SHORT_LIMIT = 40
+
+
+@functools.lru_cache(maxsize=None)
+def get_schema(lang: str = 'ja', minify: str = 'off') -> Tuple[dict, dict]:
+    """Return ITEM_SCHEMA and IDENTIFY_RESPONSE_SCHEMA for given language.
+
+    The schemas are shared between callers and must not be modified.
+    """
     module_name = _SCHEMAS.get(lang, 'schema.ja')
     module = import_module(module_name)
-    return module.ITEM_SCHEMA, module.IDENTIFY_RESPONSE_SCHEMA
+    return (
+        minify_schema(module.ITEM_SCHEMA, minify),
+        minify_schema(module.IDENTIFY_RESPONSE_SCHEMA, minify),
+    )
+
+
+@functools.lru_cache(maxsize=None)
+def get_item_schema(lang: str = 'ja', kind: Optional[str] = None, minify: str = 'off') -> dict:
+    """Return the detail schema for ``kind`` ("vocabulary" or "grammar").
+
+    Without ``kind`` the full ITEM_SCHEMA covering both kinds is returned.
+    """
+    if kind is None:
+        return get_schema(lang, minify)[0]
+    module = import_module(_SCHEMAS.get(lang, 'schema.ja'))
+    return minify_schema(module.KIND_SCHEMAS[kind], minify)
+
+
+def _shorten(text: str) -> str:
+    match = _SENTENCE_END.search(text)
+    if match:
+        text = text[:match.end()]
+    text = _EXAMPLE.sub("", text).strip()
+    if len(text) > _SHORT_LIMIT:
+        cut = text.find("，")
+        if cut > 0:
+            text = text[:cut]
+    return text
+
+
+def minify_schema(schema: Any, mode: str = 'short') -> Any:
+    """Return a copy of ``schema`` with shortened or removed descriptions."""
+    if mode not in ('short', 'strip'):
+        return schema
+    if isinstance(schema, dict):
+        result = {}
+        for key, value in schema.items():
+            # A property may itself be called "description"; only strings are texts
+            if key == 'description' and isinstance(value, str):
+                if mode == 'short':
+                    result[key] = _shorten(value)
+                continue
+            result[key] = minify_schema(value, mode)
+        return result
+    if isinstance(schema, list):
+        return [minify_schema(value, mode) for value in schema]
+    return schema
@@ -22,173 +22,189 @@ NAME_LIST_SCHEMA = {
     "required": ["vocabulary", "grammar"]
 }
 
-ITEM_SCHEMA = {
+VOCABULARY_ITEM_SCHEMA = {
   "type": "object",
-  "description": "包含日文單字 (vocabulary) 和文法 (grammar) 的完整分析資料。",
   "properties": {
-    "vocabulary": {
-      "type": "array",
-      "description": "單字清單，每個元素為一個單字的詳細資訊。",
-      "items": {
-        "type": "object",
-        "properties": {
-          "word": {"type": "string", "description": "單字（日文），例如『食べる』。"},
-          "reading": {"type": "string", "description": "單字的假名讀音，例如『たべる』。"},
-          "definition": {"type": "string", "description": "單字的中文釋義，例如『吃』。"},
-          "pos": {
-            "type": "object",
-            "description": "詞性資訊。",
-            "properties": {
-              "label": {"type": "string", "description": "詞性種類，例如：動詞、い形容詞、形動、名詞、副詞、接續詞、助詞、助動詞、感動詞、連體詞等。"},
-              "subtype": {"type": ["string", "null"], "description": "詞性細分類，例如：自五、他上一、名詞サ變、形容動詞ナ型、副詞タルト、ダナニ，無則為 null。"}
-            },
-            "required": ["label"]
-          },
-          "conjugation": {
-            "anyOf": [
-              {
+    "word": {"type": "string", "description": "單字（日文），例如『食べる』。"},
+    "reading": {"type": "string", "description": "單字的假名讀音，例如『たべる』。"},
+    "definition": {"type": "string", "description": "單字的中文釋義，例如『吃』。"},
+    "pos": {
+      "type": "object",
+      "description": "詞性資訊。",
+      "properties": {
+        "label": {"type": "string", "description": "詞性種類，例如：動詞、い形容詞、形動、名詞、副詞、接續詞、助詞、助動詞、感動詞、連體詞等。"},
+        "subtype": {"type": ["string", "null"], "description": "詞性細分類，例如：自五、他上一、名詞サ變、形容動詞ナ型、副詞タルト、ダナニ，無則為 null。"}
+      },
+      "required": ["label"]
+    },
+    "conjugation": {
+      "anyOf": [
+        {
+          "type": "object",
+          "description": "活用資訊，若不可活用則為 null。",
+          "properties": {
+            "forms": {"type": "array", "items": {"type": "string"}, "description": "詞形名稱列表，例如：基本形、未然形、連用形、終止形、連體形、假定形、命令形。"},
+            "examples": {
+              "type": "array",
+              "description": "詞形範例，每個範例包含實際變化後的形式與用法名稱。",
+              "items": {
                 "type": "object",
-                "description": "活用資訊，若不可活用則為 null。",
                 "properties": {
-                  "forms": {"type": "array", "items": {"type": "string"}, "description": "詞形名稱列表，例如：基本形、未然形、連用形、終止形、連體形、假定形、命令形。"},
-                  "examples": {
-                    "type": "array",
-                    "description": "詞形範例，每個範例包含實際變化後的形式與用法名稱。",
-                    "items": {
-                      "type": "object",
-                      "properties": {
-                        "form": {"type": "string", "description": "實際變化後的單字形式，可在括號補足語境，例如：食べ(ない)、綺麗に(掃除する)。"},
-                        "usage": {"type": "string", "description": "該詞形的名稱，例如：基本形、連體形等。"}
-                      },
-                      "required": ["form", "usage"]
-                    }
-                  }
+                  "form": {"type": "string", "description": "實際變化後的單字形式，可在括號補足語境，例如：食べ(ない)、綺麗に(掃除する)。"},
+                  "usage": {"type": "string", "description": "該詞形的名稱，例如：基本形、連體形等。"}
                 },
-                "required": ["forms"]
-              },
-              {"type": "null", "description": "不可活用時為 null。"}
-            ]
-          },
-          "transitivity": {
-            "anyOf": [
-              {
-                "type": "object",
-                "description": "動詞的自他分類資訊。非動詞則為 null。",
-                "properties": {
-                  "intransitive": {
-                    "type": ["object", "null"],
-                    "description": "自動詞資訊，包含 word、reading、type（通常為『自動詞』）。",
-                    "properties": {
-                      "word": {"type": "string"},
-                      "reading": {"type": "string"},
-                      "type": {"type": "string"}
-                    },
-                    "required": ["word", "reading", "type"]
-                  },
-                  "transitive": {
-                    "type": ["object", "null"],
-                    "description": "他動詞資訊，包含 word、reading、type（通常為『他動詞』）。",
-                    "properties": {
-                      "word": {"type": "string"},
-                      "reading": {"type": "string"},
-                      "type": {"type": "string"}
-                    },
-                    "required": ["word", "reading", "type"]
-                  }
-                }
-              },
-              {"type": "null", "description": "無自他分類時為 null。"}
-            ]
+                "required": ["form", "usage"]
+              }
+            }
           },
-          "related": {
-            "type": "array",
-            "description": "相關單字清單，列出與本單字意思相近、對立或易混淆的詞彙。",
-            "items": {
-              "type": "object",
+          "required": ["forms"]
+        },
+        {"type": "null", "description": "不可活用時為 null。"}
+      ]
+    },
+    "transitivity": {
+      "anyOf": [
+        {
+          "type": "object",
+          "description": "動詞的自他分類資訊。非動詞則為 null。",
+          "properties": {
+            "intransitive": {
+              "type": ["object", "null"],
+              "description": "自動詞資訊，包含 word、reading、type（通常為『自動詞』）。",
               "properties": {
-                "word": {"type": "string", "description": "相關單字（日文）。"},
-                "reading": {"type": "string", "description": "相關單字的假名。"},
-                "pos": {"type": "string", "description": "相關單字的詞性。"},
-                "subtype": {"type": ["string", "null"], "description": "相關單字的細分類，無則為 null。"},
-                "definition": {"type": "string", "description": "相關單字的中文釋義。"},
-                "difference": {"type": "string", "description": "與本單字的差異說明。"}
+                "word": {"type": "string"},
+                "reading": {"type": "string"},
+                "type": {"type": "string"}
               },
-              "required": ["word", "reading", "pos", "subtype", "definition", "difference"]
-            }
-          },
-          "examples": {
-            "type": "array",
-            "description": "該單字的例句清單。",
-            "items": {
-              "type": "object",
+              "required": ["word", "reading", "type"]
+            },
+            "transitive": {
+              "type": ["object", "null"],
+              "description": "他動詞資訊，包含 word、reading、type（通常為『他動詞』）。",
               "properties": {
-                "target_language": {"type": "string", "description": "日文例句。"},
-                "user_language": {"type": "string", "description": "中文翻譯。"}
+                "word": {"type": "string"},
+                "reading": {"type": "string"},
+                "type": {"type": "string"}
               },
-              "required": ["target_language", "user_language"]
+              "required": ["word", "reading", "type"]
             }
           }
         },
-        "required": ["word", "reading", "definition", "pos", "related", "examples"]
+        {"type": "null", "description": "無自他分類時為 null。"}
+      ]
+    },
+    "related": {
+      "type": "array",
+      "description": "相關單字清單，列出與本單字意思相近、對立或易混淆的詞彙。",
+      "items": {
+        "type": "object",
+        "properties": {
+          "word": {"type": "string", "description": "相關單字（日文）。"},
+          "reading": {"type": "string", "description": "相關單字的假名。"},
+          "pos": {"type": "string", "description": "相關單字的詞性。"},
+          "subtype": {"type": ["string", "null"], "description": "相關單字的細分類，無則為 null。"},
+          "definition": {"type": "string", "description": "相關單字的中文釋義。"},
+          "difference": {"type": "string", "description": "與本單字的差異說明。"}
+        },
+        "required": ["word", "reading", "pos", "subtype", "definition", "difference"]
       }
     },
-    "grammar": {
+    "examples": {
       "type": "array",
-      "description": "文法點清單，每個元素為一個文法的詳細資訊。",
+      "description": "該單字的例句清單。",
       "items": {
         "type": "object",
         "properties": {
-          "grammar_point": {"type": "string", "description": "文法點名稱，例如：『～ながら』。"},
-          "structure": {"type": "array", "items": {"type": "string"}, "description": "文法結構組成，例如：[\"動詞ます形\", \"ながら\"]。"},
-          "definition": {"type": "string", "description": "文法的中文釋義，例如：『一邊...一邊...』。"},
-          "usage_note": {"type": "string", "description": "使用上的注意事項，可留空。"},
-          "equivalent_expressions": {
-            "type": "array",
-            "description": "近義文法列表，列出與本文法意思相近但略有差異的其他表達。",
-            "items": {
-              "type": "object",
-              "properties": {
-                "expression": {"type": "string", "description": "近義文法的名稱，例如：『～つつ』。"},
-                "difference": {"type": "string", "description": "與本文法的差異說明。"}
-              },
-              "required": ["expression", "difference"]
-            }
-          },
-          "examples": {
-            "type": "array",
-            "description": "該文法點的例句清單。",
-            "items": {
-              "type": "object",
-              "properties": {
-                "target_language": {"type": "string", "description": "日文例句。"},
-                "user_language": {"type": "string", "description": "中文翻譯。"}
-              },
-              "required": ["target_language", "user_language"]
-            }
-          },
-          "tags": {"type": "array", "items": {"type": "string"}, "description": "自訂分類標籤，例如：『同時動作』『口語』等。"},
-          "related_vocabulary": {
-            "type": "array",
-            "description": "該文法常搭配的單字清單。",
-            "items": {
-              "type": "object",
-              "properties": {
-                "word": {"type": "string", "description": "單字（日文）。"},
-                "reading": {"type": "string", "description": "單字的假名。"},
-                "definition": {"type": "string", "description": "單字的中文釋義。"},
-                "relation": {"type": "string", "description": "與文法的搭配範例，例如：『勉強しながら......』，可用『......』表示省略部分。"}
-              },
-              "required": ["word", "definition"]
-            }
-          }
+          "target_language": {"type": "string", "description": "日文例句。"},
+          "user_language": {"type": "string", "description": "中文翻譯。"}
+        },
+        "required": ["target_language", "user_language"]
+      }
+    }
+  },
+  "required": ["word", "reading", "definition", "pos", "related", "examples"]
+}
+
+GRAMMAR_ITEM_SCHEMA = {
+  "type": "object",
+  "properties": {
+    "grammar_point": {"type": "string", "description": "文法點名稱，例如：『～ながら』。"},
+    "structure": {"type": "array", "items": {"type": "string"}, "description": "文法結構組成，例如：[\"動詞ます形\", \"ながら\"]。"},
+    "definition": {"type": "string", "description": "文法的中文釋義，例如：『一邊...一邊...』。"},
+    "usage_note": {"type": "string", "description": "使用上的注意事項，可留空。"},
+    "equivalent_expressions": {
+      "type": "array",
+      "description": "近義文法列表，列出與本文法意思相近但略有差異的其他表達。",
+      "items": {
+        "type": "object",
+        "properties": {
+          "expression": {"type": "string", "description": "近義文法的名稱，例如：『～つつ』。"},
+          "difference": {"type": "string", "description": "與本文法的差異說明。"}
+        },
+        "required": ["expression", "difference"]
+      }
+    },
+    "examples": {
+      "type": "array",
+      "description": "該文法點的例句清單。",
+      "items": {
+        "type": "object",
+        "properties": {
+          "target_language": {"type": "string", "description": "日文例句。"},
+          "user_language": {"type": "string", "description": "中文翻譯。"}
+        },
+        "required": ["target_language", "user_language"]
+      }
+    },
+    "tags": {"type": "array", "items": {"type": "string"}, "description": "自訂分類標籤，例如：『同時動作』『口語』等。"},
+    "related_vocabulary": {
+      "type": "array",
+      "description": "該文法常搭配的單字清單。",
+      "items": {
+        "type": "object",
+        "properties": {
+          "word": {"type": "string", "description": "單字（日文）。"},
+          "reading": {"type": "string", "description": "單字的假名。"},
+          "definition": {"type": "string", "description": "單字的中文釋義。"},
+          "relation": {"type": "string", "description": "與文法的搭配範例，例如：『勉強しながら......』，可用『......』表示省略部分。"}
         },
-        "required": ["grammar_point", "definition"]
+        "required": ["word", "definition"]
       }
     }
   },
+  "required": ["grammar_point", "definition"]
+}
+
+ITEM_SCHEMA = {
+  "type": "object",
+  "description": "包含日文單字 (vocabulary) 和文法 (grammar) 的完整分析資料。",
+  "properties": {
+    "vocabulary": {
+      "type": "array",
+      "description": "單字清單，每個元素為一個單字的詳細資訊。",
+      "items": VOCABULARY_ITEM_SCHEMA
+    },
+    "grammar": {
+      "type": "array",
+      "description": "文法點清單，每個元素為一個文法的詳細資訊。",
+      "items": GRAMMAR_ITEM_SCHEMA
+    }
+  },
   "required": ["vocabulary", "grammar"]
 }
 
+# deliver_report schemas asking for a single kind, so a request for
+# vocabulary does not carry the grammar subtree and vice versa
+KIND_SCHEMAS = {
+  kind: {
+    "type": "object",
+    "description": ITEM_SCHEMA["properties"][kind]["description"],
+    "properties": {kind: ITEM_SCHEMA["properties"][kind]},
+    "required": [kind]
+  }
+  for kind in ("vocabulary", "grammar")
+}
+
 
 RESPONSE_SCHEMA = {
     "type": "object",
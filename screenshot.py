@@ -2,10 +2,16 @@ import win32gui
 import win32ui
 import win32con
 import ctypes
+import logging
+import time
 import numpy as np
 from PIL import Image
-import io
-import base64
+
+import imaging
+import telemetry
+
+logger = logging.getLogger(__name__)
+
 
 def grab_window_image(title):
     hwnd = win32gui.FindWindow(None, title)
@@ -17,6 +23,8 @@ def grab_window_image(title):
     width = right - left
     height = bottom - top
 
+    started = time.perf_counter()
+
     # 建立 DC
     hwnd_dc = win32gui.GetWindowDC(hwnd)
     mfc_dc = win32ui.CreateDCFromHandle(hwnd_dc)
@@ -46,14 +54,15 @@ def grab_window_image(title):
     if result != 1:
         print("[警告] PrintWindow 失敗，可能該視窗不支援。")
 
-    # 轉為 BytesIO
-    buffer = io.BytesIO()
-    img.save(buffer, format='PNG')
-    buffer.seek(0)
-    img_bytes = buffer.read()
+    capture_ms = (time.perf_counter() - started) * 1000
 
-    # 編碼為 base64
-    img_b64 = base64.b64encode(img_bytes).decode('utf-8')
+    # 前處理並編碼為 base64
+    img_b64, stats = imaging.encode_image(img, imaging.options_for(title))
+    telemetry.note_capture({**stats, "capture_ms": capture_ms})
+    logger.debug(
+        "Encoded %dx%d %s: %d bytes in %.0f ms",
+        *stats["size"], stats["format"], stats["b64_bytes"], stats["encode_ms"],
+    )
 
     return img_b64
 
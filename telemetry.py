@@ -0,0 +1,183 @@
+"""Per-capture metrics written to a rotating JSONL log.
+
+A record is opened with :func:`capture` around one analysis; code running
+inside it adds figures with :func:`record` and :func:`add`. The record is
+carried in a :class:`contextvars.ContextVar`, so worker threads started with
+:func:`submit_in_context` contribute to the same record. When the outermost
+:func:`capture` exits, the record is appended to
+``~/.language_helper_telemetry.jsonl`` (rotated by size) and kept in memory
+for :func:`summary`.
+"""
+import contextvars
+import json
+import logging
+import logging.handlers
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+TELEMETRY_FILE = os.path.join(os.path.expanduser("~"), ".language_helper_telemetry.jsonl")
+MAX_BYTES = 1024 * 1024
+BACKUP_COUNT = 3
+# Records kept in memory for the summary
+RECENT_LIMIT = 500
+PERCENTILES = (50, 90, 99)
+
+_current: contextvars.ContextVar[Optional[Dict[str, Any]]] = contextvars.ContextVar("telemetry_record", default=None)
+_lock = threading.Lock()
+_recent: Deque[Dict[str, Any]] = deque(maxlen=RECENT_LIMIT)
+_logger: Optional[logging.Logger] = None
+_enabled = True
+_last_capture: Dict[str, Any] = {}
+
+
+def configure(settings: Dict) -> None:
+    global _enabled
+    _enabled = settings.get("telemetry", True)
+
+
+def _get_logger() -> logging.Logger:
+    global _logger
+    if _logger is None:
+        logger = logging.getLogger("language_helper.telemetry")
+        logger.propagate = False
+        logger.setLevel(logging.INFO)
+        try:
+            handler = logging.handlers.RotatingFileHandler(
+                TELEMETRY_FILE, maxBytes=MAX_BYTES, backupCount=BACKUP_COUNT, encoding="utf-8"
+            )
+            handler.setFormatter(logging.Formatter("%(message)s"))
+            logger.addHandler(handler)
+        except Exception:
+            logger.addHandler(logging.NullHandler())
+        _logger = logger
+        _load_recent()
+    return _logger
+
+
+def _load_recent() -> None:
+    """Seed the summary with the records of the current log file."""
+    if not os.path.exists(TELEMETRY_FILE):
+        return
+    try:
+        with open(TELEMETRY_FILE, "r", encoding="utf-8") as f:
+            lines = f.readlines()[-RECENT_LIMIT:]
+    except Exception:
+        return
+    for line in lines:
+        try:
+            _recent.append(json.loads(line))
+        except ValueError:
+            continue
+
+
+@contextmanager
+def capture(operation: str):
+    """Collect the metrics of one operation; nested captures join the outer record."""
+    if _current.get() is not None or not _enabled:
+        yield _current.get()
+        return
+    metrics: Dict[str, Any] = {"operation": operation, "time": time.time()}
+    token = _current.set(metrics)
+    started = time.perf_counter()
+    try:
+        yield metrics
+    except BaseException as e:
+        metrics["error"] = type(e).__name__
+        raise
+    finally:
+        _current.reset(token)
+        metrics["total_ms"] = (time.perf_counter() - started) * 1000
+        _write(metrics)
+
+
+def _write(metrics: Dict[str, Any]) -> None:
+    logger = _get_logger()
+    with _lock:
+        _recent.append(metrics)
+        logger.info(json.dumps(metrics, ensure_ascii=False))
+
+
+def record(key: str, value: Any) -> None:
+    """Set ``key`` on the current record, if any."""
+    metrics = _current.get()
+    if metrics is not None:
+        with _lock:
+            metrics[key] = value
+
+
+def add(key: str, value: float = 1) -> None:
+    """Add ``value`` to ``key`` on the current record, if any."""
+    metrics = _current.get()
+    if metrics is not None:
+        with _lock:
+            metrics[key] = metrics.get(key, 0) + value
+
+
+@contextmanager
+def timer(key: str):
+    """Add the elapsed milliseconds of the block to ``key``."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        add(key, (time.perf_counter() - started) * 1000)
+
+
+def submit_in_context(pool, func: Callable, *args, **kwargs):
+    """``pool.submit`` that runs ``func`` with the caller's telemetry record."""
+    return pool.submit(contextvars.copy_context().run, func, *args, **kwargs)
+
+
+def note_capture(stats: Dict[str, Any]) -> None:
+    """Remember the capture and encode figures of the latest screenshot.
+
+    Captures usually happen before the analysis that uploads them; the
+    figures are attached by :func:`attach_capture`.
+    """
+    with _lock:
+        _last_capture.clear()
+        _last_capture.update(stats)
+
+
+def attach_capture(img_b64: str) -> None:
+    """Add the noted capture figures to the current record if they belong to ``img_b64``."""
+    with _lock:
+        stats = dict(_last_capture)
+    record("image_bytes", len(img_b64))
+    if stats.get("b64_bytes") == len(img_b64):
+        # Each capture is counted once, even if its image is analyzed again
+        with _lock:
+            _last_capture.clear()
+        for key in ("capture_ms", "preprocess_ms", "encode_ms"):
+            if key in stats:
+                record(key, stats[key])
+
+
+def _percentile(ordered: List[float], pct: int) -> float:
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def summary(operation: Optional[str] = None) -> Dict[str, Dict[str, float]]:
+    """Return count, mean and percentiles of every numeric metric of recent records."""
+    _get_logger()
+    with _lock:
+        records = [dict(r) for r in _recent if operation is None or r.get("operation") == operation]
+    values: Dict[str, List[float]] = {}
+    for r in records:
+        for key, value in r.items():
+            if key == "time" or isinstance(value, bool) or not isinstance(value, (int, float)):
+                continue
+            values.setdefault(key, []).append(float(value))
+    result = {}
+    for key, samples in sorted(values.items()):
+        ordered = sorted(samples)
+        stats = {"count": len(ordered), "mean": sum(ordered) / len(ordered)}
+        for pct in PERCENTILES:
+            stats[f"p{pct}"] = _percentile(ordered, pct)
+        result[key] = stats
+    return result
@@ -0,0 +1,20 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import cache  # noqa: E402
+
+
+@pytest.fixture
+def term_cache(tmp_path, monkeypatch):
+    """Replace the process-wide term store and cache with empty ones in ``tmp_path``."""
+    store = cache.SqliteTermStore(str(tmp_path / "cache.sqlite3"))
+    term_cache = cache.TermCache(store, flush_interval=0)
+    monkeypatch.setattr(cache, "_store", store)
+    monkeypatch.setattr(cache, "_term_cache", term_cache)
+    yield term_cache
+    term_cache.close()
+    store.close()
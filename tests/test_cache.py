@@ -0,0 +1,106 @@
+import json
+
+from cache import JsonTermStore, SqliteTermStore, TermCache, items_by_term, lookup_terms, store_details
+
+
+def _vocab(word, definition="x"):
+    return {"word": word, "definition": definition}
+
+
+def test_sqlite_store_round_trip(tmp_path):
+    store = SqliteTermStore(str(tmp_path / "terms.sqlite3"))
+    store.upsert("vocabulary", {"食べる": _vocab("食べる", "吃")})
+    store.upsert("grammar", {"〜つつ": {"grammar_point": "〜つつ"}})
+
+    assert store.get_many("vocabulary", ["食べる", "飲む"]) == {"食べる": _vocab("食べる", "吃")}
+    assert store.get_many("grammar", ["食べる"]) == {}
+    assert store.load_all()["grammar"] == {"〜つつ": {"grammar_point": "〜つつ"}}
+    store.close()
+
+
+def test_sqlite_store_looks_up_more_terms_than_one_statement_binds(tmp_path):
+    store = SqliteTermStore(str(tmp_path / "terms.sqlite3"))
+    items = {f"w{i}": _vocab(f"w{i}") for i in range(1200)}
+    store.upsert("vocabulary", items)
+
+    assert store.get_many("vocabulary", list(items)) == items
+    store.close()
+
+
+def test_sqlite_store_replaces_items(tmp_path):
+    store = SqliteTermStore(str(tmp_path / "terms.sqlite3"))
+    store.upsert("vocabulary", {"a": _vocab("a", "old")})
+    store.upsert("vocabulary", {"a": _vocab("a", "new")})
+
+    assert store.get_many("vocabulary", ["a"])["a"]["definition"] == "new"
+    store.close()
+
+
+def test_json_cache_is_migrated_once(tmp_path):
+    legacy = tmp_path / "cache.json"
+    legacy.write_text(json.dumps({"vocabulary": {"a": _vocab("a")}, "grammar": {}}), encoding="utf-8")
+    store = SqliteTermStore(str(tmp_path / "terms.sqlite3"))
+
+    assert store.migrate_from_json(str(legacy)) == 1
+    assert store.get_many("vocabulary", ["a"]) == {"a": _vocab("a")}
+    # The legacy file is kept and not imported again
+    legacy.write_text(json.dumps({"vocabulary": {"b": _vocab("b")}}), encoding="utf-8")
+    assert store.migrate_from_json(str(legacy)) == 0
+    assert store.get_many("vocabulary", ["b"]) == {}
+    assert legacy.exists()
+    store.close()
+
+
+def test_json_store_round_trip(tmp_path):
+    store = JsonTermStore(str(tmp_path / "cache.json"))
+    store.upsert("vocabulary", {"a": _vocab("a")})
+
+    assert store.get_many("vocabulary", ["a", "b"]) == {"a": _vocab("a")}
+
+
+def test_term_cache_writes_behind(tmp_path):
+    store = SqliteTermStore(str(tmp_path / "terms.sqlite3"))
+    term_cache = TermCache(store, flush_interval=60)
+    term_cache.load()
+    term_cache.put("vocabulary", {"a": _vocab("a")})
+
+    # Visible at once, written to the store on close
+    assert term_cache.get_many("vocabulary", ["a"]) == {"a": _vocab("a")}
+    assert store.get_many("vocabulary", ["a"]) == {}
+    term_cache.close()
+    assert store.get_many("vocabulary", ["a"]) == {"a": _vocab("a")}
+    store.close()
+
+
+def test_term_cache_load_keeps_newer_entries(tmp_path):
+    store = SqliteTermStore(str(tmp_path / "terms.sqlite3"))
+    store.upsert("vocabulary", {"a": _vocab("a", "stored"), "b": _vocab("b")})
+    term_cache = TermCache(store, flush_interval=0)
+    term_cache.put("vocabulary", {"a": _vocab("a", "new")})
+    term_cache.load()
+
+    assert term_cache.get_many("vocabulary", ["a", "b"]) == {"a": _vocab("a", "new"), "b": _vocab("b")}
+    term_cache.close()
+    store.close()
+
+
+def test_term_cache_reads_through_before_load(tmp_path):
+    store = SqliteTermStore(str(tmp_path / "terms.sqlite3"))
+    store.upsert("grammar", {"〜つつ": {"grammar_point": "〜つつ"}})
+    term_cache = TermCache(store)
+
+    assert term_cache.get_many("grammar", ["〜つつ", "〜ながら"]) == {"〜つつ": {"grammar_point": "〜つつ"}}
+    term_cache.close()
+    store.close()
+
+
+def test_store_details_and_lookup(term_cache):
+    store_details({"vocabulary": [_vocab("a"), "broken", {"definition": "no word"}], "grammar": []})
+
+    assert lookup_terms(["a", "b"], ["〜つつ"]) == {"vocabulary": {"a": _vocab("a")}, "grammar": {}}
+
+
+def test_items_by_term_skips_items_without_key():
+    keyed = items_by_term({"vocabulary": [_vocab("a"), None, {}], "grammar": [{"grammar_point": "〜つつ"}]})
+
+    assert keyed == {"vocabulary": {"a": _vocab("a")}, "grammar": {"〜つつ": {"grammar_point": "〜つつ"}}}
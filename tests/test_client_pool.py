@@ -0,0 +1,67 @@
+import gc
+
+import httpx
+import openai
+import pytest
+
+from client_pool import ClientManager
+
+
+def _rate_limited(retry_after="0"):
+    request = httpx.Request("POST", "https://api.example/v1/chat/completions")
+    response = httpx.Response(429, headers={"retry-after": retry_after}, request=request)
+    return openai.RateLimitError("slow down", response=response, body=None)
+
+
+def test_same_key_reuses_client():
+    manager = ClientManager()
+
+    assert manager.get("key") is manager.get("key")
+    assert manager.get("key") is not manager.get("other")
+
+
+def test_configure_keeps_clients_in_use_open():
+    manager = ClientManager()
+    client = manager.get("key")
+    http_client = client._client
+
+    manager.configure({"read_timeout": 5.0})
+
+    assert manager.get("key") is not client
+    assert not http_client.is_closed
+    del client
+    gc.collect()
+    assert http_client.is_closed
+
+
+def test_unchanged_options_keep_clients():
+    manager = ClientManager()
+    client = manager.get("key")
+
+    manager.configure({"read_timeout": manager.options["read_timeout"], "api_base_url": ""})
+
+    assert manager.get("key") is client
+
+
+def test_call_retries_rate_limits():
+    manager = ClientManager({"backoff_base": 0, "backoff_max": 0})
+    errors = [_rate_limited(), _rate_limited()]
+
+    def request():
+        if errors:
+            raise errors.pop()
+        return "ok"
+
+    assert manager.call(request, stage="test") == "ok"
+    assert manager.stats()["test"]["retries"] == 2
+
+
+def test_call_gives_up_after_max_retries():
+    manager = ClientManager({"max_retries": 1, "backoff_base": 0, "backoff_max": 0})
+
+    def request():
+        raise _rate_limited()
+
+    with pytest.raises(openai.RateLimitError):
+        manager.call(request, stage="test")
+    assert manager.stats()["test"]["failures"] == 1
@@ -0,0 +1,108 @@
+import threading
+
+from cache import store_details
+from fetch_queue import FetchQueue
+
+
+def _queue(tmp_path, fetch=None, **kwargs):
+    return FetchQueue(fetch or (lambda *args: {}), path=str(tmp_path / "queue.json"), **kwargs)
+
+
+def _fetch_all(vocab, grammar, target_lang, report_lang):
+    return {
+        "vocabulary": [{"word": w} for w in vocab],
+        "grammar": [{"grammar_point": g} for g in grammar],
+    }
+
+
+def test_batches_by_priority_then_most_recent(tmp_path, term_cache):
+    queue = _queue(tmp_path, batch_size=2)
+    queue.enqueue(["a", "b"], ["〜x"], "Japanese", "en")
+    queue.enqueue(["c"], [], "Japanese", "en")
+    queue.enqueue(["d"], [], "Japanese", "en", priority=-1)
+
+    assert [e["term"] for e in queue._take_batch()] == ["d", "c"]
+    queue._entries = [e for e in queue._entries if e["term"] not in ("c", "d")]
+    assert [e["term"] for e in queue._take_batch()] == ["a", "b"]
+
+
+def test_batch_holds_a_single_kind_and_language(tmp_path, term_cache):
+    queue = _queue(tmp_path)
+    queue.enqueue([], ["〜x"], "Japanese", "en")
+    queue.enqueue(["a"], [], "Japanese", "zh-TW")
+
+    batch = queue._take_batch()
+
+    assert [(e["kind"], e["report_lang"]) for e in batch] == [("vocabulary", "zh-TW")]
+
+
+def test_enqueue_again_keeps_one_entry(tmp_path, term_cache):
+    queue = _queue(tmp_path)
+    queue.enqueue(["a"], [], "Japanese", "en", priority=1)
+    queue.enqueue(["a"], [], "Japanese", "en", priority=0)
+
+    assert len(queue) == 1
+    assert queue._entries[0]["priority"] == 0
+
+
+def test_queue_survives_restart(tmp_path, term_cache):
+    _queue(tmp_path).enqueue(["a"], ["〜x"], "Japanese", "en")
+
+    restored = _queue(tmp_path)
+
+    assert sorted((e["kind"], e["term"]) for e in restored._entries) == [("grammar", "〜x"), ("vocabulary", "a")]
+    assert restored.enqueue(["b"], [], "Japanese", "en") == 1
+    assert restored._entries[-1]["sequence"] > restored._entries[0]["sequence"]
+
+
+def test_fetched_terms_leave_the_queue(tmp_path, term_cache):
+    delivered = []
+    queue = _queue(tmp_path, _fetch_all, on_details=delivered.append)
+    queue.enqueue(["a", "b"], [], "Japanese", "en")
+
+    queue._fetch_batch(queue._take_batch())
+
+    assert len(queue) == 0
+    assert [item["word"] for item in delivered[0]["vocabulary"]] == ["a", "b"]
+    assert len(_queue(tmp_path)) == 0
+
+
+def test_cached_terms_are_not_requested(tmp_path, term_cache):
+    requested = []
+
+    def fetch(vocab, grammar, target_lang, report_lang):
+        requested.append(vocab)
+        return _fetch_all(vocab, grammar, target_lang, report_lang)
+
+    store_details({"vocabulary": [{"word": "a"}]})
+    queue = _queue(tmp_path, fetch)
+    queue.enqueue(["a", "b"], [], "Japanese", "en")
+
+    queue._fetch_batch(queue._take_batch())
+
+    assert requested == [["b"]]
+    assert len(queue) == 0
+
+
+def test_failed_terms_are_retried_then_dropped(tmp_path, term_cache):
+    queue = _queue(tmp_path, lambda *args: {"vocabulary": []}, max_attempts=2)
+    queue.enqueue(["a"], [], "Japanese", "en")
+
+    queue._fetch_batch(queue._take_batch())
+    assert queue._entries[0]["attempts"] == 1
+    assert queue._entries[0]["priority"] == 1
+    queue._fetch_batch(queue._take_batch())
+    assert len(queue) == 0
+
+
+def test_worker_waits_for_interactive_requests(tmp_path, term_cache):
+    done = threading.Event()
+    queue = _queue(tmp_path, _fetch_all, on_details=lambda details: done.set(), interval=0)
+    queue.start()
+    try:
+        with queue.interactive():
+            queue.enqueue(["a"], [], "Japanese", "en")
+            assert not done.wait(0.2)
+        assert done.wait(5)
+    finally:
+        queue.close()
@@ -0,0 +1,129 @@
+import asyncio
+import time
+
+import pytest
+
+from hedging import HedgePolicy, hedged_call, hedged_call_async
+
+
+def _policy(latencies, **options):
+    policy = HedgePolicy({"identify_hedge": True, "hedge_min_samples": len(latencies), **options})
+    for latency in latencies:
+        policy.finish(latency)
+    return policy
+
+
+def test_delay_waits_for_enough_samples():
+    policy = HedgePolicy({"hedge_min_samples": 3})
+    policy.finish(1.0)
+    assert policy.delay() is None
+
+    policy.finish(2.0)
+    policy.finish(3.0)
+    assert policy.delay() == 3.0
+
+
+def test_delay_uses_the_percentile():
+    policy = _policy([float(i) for i in range(1, 11)], hedge_percentile=50)
+    assert policy.delay() == 6.0
+
+
+def test_budget_limits_hedges():
+    policy = HedgePolicy({"hedge_budget": 0.5})
+    policy.start()
+    assert not policy.allow_hedge()
+    policy.start()
+    assert policy.allow_hedge()
+    assert not policy.allow_hedge()
+
+
+def _slow_primary():
+    calls = []
+
+    def call():
+        calls.append(None)
+        time.sleep(0.5 if len(calls) == 1 else 0.0)
+        return len(calls)
+
+    return call
+
+
+def test_hedge_win_records_latency_since_primary():
+    policy = _policy([0.1], hedge_budget=1.0)
+    started = time.monotonic()
+
+    assert hedged_call(policy, _slow_primary()) == 2
+
+    elapsed = time.monotonic() - started
+    assert policy.stats()["hedge_wins"] == 1
+    assert policy._latencies[-1] == pytest.approx(elapsed, abs=0.05)
+    assert policy._latencies[-1] >= 0.1
+
+
+def test_hedge_win_records_latency_since_primary_async():
+    policy = _policy([0.1], hedge_budget=1.0)
+    calls = []
+
+    async def call():
+        calls.append(None)
+        await asyncio.sleep(0.5 if len(calls) == 1 else 0.0)
+        return len(calls)
+
+    assert asyncio.run(hedged_call_async(policy, call)) == 2
+    assert policy.stats()["hedge_wins"] == 1
+    assert policy._latencies[-1] >= 0.1
+
+
+def test_hedge_win_closes_the_losing_stream():
+    import threading
+
+    import cancellation
+    from hedging import in_attempt
+
+    closed = threading.Event()
+    calls = []
+
+    class Stream:
+        def close(self):
+            closed.set()
+
+    def call():
+        calls.append(None)
+        assert in_attempt()
+        if len(calls) == 1:
+            with cancellation.closing_on_cancel(Stream()):
+                if not closed.wait(5):
+                    return "primary"
+                raise OSError("stream closed")
+        return "hedge"
+
+    policy = _policy([0.05], hedge_budget=1.0)
+
+    assert hedged_call(policy, call) == "hedge"
+    assert closed.wait(1)
+
+
+def test_cancelling_the_caller_cancels_both_attempts():
+    import threading
+
+    import cancellation
+
+    token = cancellation.CancelToken()
+    closed = []
+    started = threading.Barrier(2)
+
+    class Stream:
+        def close(self):
+            closed.append(self)
+
+    def call():
+        with cancellation.closing_on_cancel(Stream()):
+            started.wait(5)
+            cancellation.current_token().wait(5)
+
+    policy = _policy([0.01], hedge_budget=1.0)
+    threading.Timer(0.2, token.cancel).start()
+
+    with cancellation.cancel_scope(token), pytest.raises(cancellation.Cancelled):
+        hedged_call(policy, call)
+    assert len(closed) == 2
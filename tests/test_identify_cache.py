@@ -0,0 +1,92 @@
+from PIL import Image, ImageDraw
+
+from identify_cache import IdentifyCache, hamming_distance, screen_from_image
+
+TERMS = {"N3": {"vocabulary": ["考える"], "grammar": []}}
+
+
+def _frame(line: str) -> Image.Image:
+    """A 1280x720 game screen with a dialogue box at the bottom."""
+    img = Image.new("RGB", (1280, 720), (40, 60, 90))
+    draw = ImageDraw.Draw(img)
+    draw.rectangle((80, 80, 1200, 480), fill=(120, 140, 90))
+    draw.rectangle((60, 560, 1220, 690), fill=(245, 245, 240))
+    draw.text((90, 600), line, fill=(0, 0, 0))
+    return img
+
+
+def _cache(tmp_path, **kwargs):
+    return IdentifyCache(str(tmp_path / "identify_cache.json"), **kwargs)
+
+
+def test_frames_differing_in_one_text_line_miss(tmp_path):
+    first = screen_from_image(_frame("Where did you put the key?"))
+    second = screen_from_image(_frame("I left it on the kitchen table."))
+    # The whole-frame hash barely notices the new line
+    assert hamming_distance(first.hash, second.hash) <= 8
+    cache = _cache(tmp_path, threshold=64)
+    cache.put(first, "Japanese:identify", TERMS)
+
+    assert cache.get(second, "Japanese:identify") is None
+
+
+def test_identical_screen_hits(tmp_path):
+    cache = _cache(tmp_path)
+    cache.put(screen_from_image(_frame("Hello")), "Japanese:identify", TERMS)
+
+    assert cache.get(screen_from_image(_frame("Hello")), "Japanese:identify") == TERMS
+    assert cache.get(screen_from_image(_frame("Hello")), "Japanese:other") is None
+    assert cache.stats()["hits"] == 1
+
+
+def test_encoding_noise_hits_within_threshold(tmp_path):
+    img = _frame("Hello")
+    noisy = img.point(lambda v: min(255, v + 3))
+    cache = _cache(tmp_path, threshold=64)
+    cache.put(screen_from_image(img), "Japanese:identify", TERMS)
+
+    assert cache.get(screen_from_image(noisy), "Japanese:identify") == TERMS
+
+
+def test_only_identical_screens_hit_after_restart(tmp_path):
+    img = _frame("Hello")
+    cache = _cache(tmp_path, threshold=64)
+    cache.put(screen_from_image(img), "Japanese:identify", TERMS)
+    cache.close()
+
+    restored = _cache(tmp_path, threshold=64)
+
+    assert restored.get(screen_from_image(img), "Japanese:identify") == TERMS
+    assert restored.get(screen_from_image(img.point(lambda v: min(255, v + 3))), "Japanese:identify") is None
+
+
+def test_disabled_cache_never_hits(tmp_path):
+    screen = screen_from_image(_frame("Hello"))
+    cache = _cache(tmp_path, threshold=-1)
+    cache.put(screen, "Japanese:identify", TERMS)
+
+    assert cache.get(screen, "Japanese:identify") is None
+
+
+def test_least_recently_used_screen_is_evicted(tmp_path):
+    screens = [screen_from_image(_frame(f"line {i}")) for i in range(3)]
+    cache = _cache(tmp_path, max_entries=2)
+    cache.put(screens[0], "ns", TERMS)
+    cache.put(screens[1], "ns", TERMS)
+    cache.get(screens[0], "ns")
+    cache.put(screens[2], "ns", TERMS)
+
+    assert cache.get(screens[1], "ns") is None
+    assert cache.get(screens[0], "ns") == TERMS
+
+
+def test_writes_are_batched_in_the_background(tmp_path):
+    import os
+
+    cache = _cache(tmp_path, flush_interval=60)
+    for i in range(3):
+        cache.put(screen_from_image(_frame(f"line {i}")), "ns", TERMS)
+
+    assert not os.path.exists(cache.path)
+    cache.close()
+    assert _cache(tmp_path).stats()["entries"] == 3
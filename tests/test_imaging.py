@@ -0,0 +1,107 @@
+import base64
+import io
+
+from PIL import Image, ImageDraw
+
+import imaging
+
+
+def test_preprocess_downscales_and_converts():
+    img = Image.new("RGB", (400, 200), (10, 200, 30))
+
+    processed = imaging.preprocess_image(img, {"max_edge": 100, "grayscale": True})
+
+    assert processed.size == (100, 50)
+    assert processed.mode == "L"
+    assert img.size == (400, 200)
+
+
+def test_encode_image_formats():
+    img = Image.new("RGBA", (40, 20), (255, 0, 0, 128))
+
+    for fmt, mime in (("PNG", "image/png"), ("JPEG", "image/jpeg"), ("WEBP", "image/webp")):
+        img_b64, stats = imaging.encode_image(img, {"format": fmt})
+        assert imaging.image_mime(img_b64) == mime
+        assert Image.open(io.BytesIO(base64.b64decode(img_b64))).size == (40, 20)
+        assert stats["format"] == fmt and stats["b64_bytes"] == len(img_b64)
+    assert imaging.encode_image(img, {"format": "TIFF"})[1]["format"] == "PNG"
+
+
+def test_options_for_applies_window_profile(monkeypatch):
+    monkeypatch.setattr(imaging, "_profiles", {"Game": {"format": "JPEG", "max_edge": 640}})
+
+    assert imaging.options_for("Game")["format"] == "JPEG"
+    assert imaging.options_for("Game")["max_edge"] == 640
+    assert imaging.options_for("Other")["format"] == imaging._options["format"]
+
+
+def test_image_detail_follows_window_profile(monkeypatch):
+    monkeypatch.setattr(imaging, "_profiles", {"Game": {"detail": "low"}, "Bad": {"detail": "huge"}})
+
+    assert imaging.image_detail(imaging.options_for("Game")) == "low"
+    assert imaging.image_detail(imaging.options_for("Bad")) == "auto"
+
+
+def test_parse_grid():
+    assert imaging.parse_grid("3x2") == (3, 2)
+    assert imaging.parse_grid("2X3") == (2, 3)
+    assert imaging.parse_grid("0x2") == (1, 2)
+    assert imaging.parse_grid("three") == (1, 1)
+    assert imaging.parse_grid(None) == (1, 1)
+
+
+def test_split_tiles_overlap():
+    img = Image.new("RGB", (200, 100))
+
+    tiles = imaging.split_tiles(img, 2, 1, overlap=0.1)
+
+    assert [tile.size for tile in tiles] == [(110, 100), (110, 100)]
+    assert len(imaging.split_tiles(img, 3, 3)) == 9
+
+
+def test_image_diff_ratio():
+    black = Image.new("RGB", (40, 20), (0, 0, 0))
+    white = Image.new("RGB", (40, 20), (255, 255, 255))
+    half = black.copy()
+    ImageDraw.Draw(half).rectangle((0, 0, 19, 19), fill=(255, 255, 255))
+
+    assert imaging.image_diff_ratio(black, black) == 0
+    # Every band's histogram counts from zero again
+    assert imaging.image_diff_ratio(black, white) == 1
+    assert imaging.image_diff_ratio(black, half) == 0.5
+    assert imaging.image_diff_ratio(black, Image.new("L", (80, 40), 255)) == 1
+
+
+def test_changed_bbox():
+    previous = Image.new("RGB", (100, 80), (30, 30, 30))
+    current = previous.copy()
+    ImageDraw.Draw(current).rectangle((40, 50, 59, 59), fill=(250, 250, 250))
+
+    assert imaging.changed_bbox(previous, current, padding=5) == (35, 45, 65, 65)
+    assert imaging.changed_bbox(previous, current, padding=30) == (10, 20, 90, 80)
+    assert imaging.changed_bbox(previous, previous.copy()) is None
+    assert imaging.changed_bbox(previous, Image.new("RGB", (10, 10))) is None
+
+
+def test_changed_bbox_ignores_noise():
+    previous = Image.new("RGB", (50, 50), (100, 100, 100))
+    current = Image.new("RGB", (50, 50), (100 + imaging.DELTA_NOISE, 100, 100))
+
+    assert imaging.changed_bbox(previous, current) is None
+
+
+def test_box_area_ratio():
+    assert imaging.box_area_ratio((0, 0, 50, 40), (100, 80)) == 0.25
+    assert imaging.box_area_ratio((0, 0, 1, 1), (0, 0)) == 1.0
+
+
+def test_changed_region():
+    previous = Image.new("RGB", (200, 100), (30, 30, 30))
+    current = previous.copy()
+    ImageDraw.Draw(current).rectangle((10, 10, 29, 19), fill=(250, 250, 250))
+    full, _ = imaging.encode_image(current, imaging.options_for())
+
+    assert imaging.changed_region(current, full, None, 0, 0.5, imaging.options_for()) == full
+    region = imaging.changed_region(current, full, previous, 0, 0.5, imaging.options_for())
+    assert imaging.decode_image(region).size == (20, 10)
+    assert imaging.changed_region(current, full, previous, 0, 0.001, imaging.options_for()) == full
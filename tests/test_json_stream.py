@@ -0,0 +1,58 @@
+import json
+
+from json_stream import IncrementalItemParser, parse_partial_items
+
+DOCUMENT = json.dumps(
+    {
+        "vocabulary": [
+            {"word": "食べる", "definition": "吃 {not a brace}", "pos": {"label": "動詞"}},
+            {"word": "say \"hi\"", "examples": [{"form": "a}"}]},
+        ],
+        "grammar": [{"grammar_point": "〜つつ", "meaning": "[一邊]"}],
+    },
+    ensure_ascii=False,
+)
+
+
+def test_items_arrive_as_soon_as_they_are_complete():
+    parser = IncrementalItemParser()
+    found = []
+    for c in DOCUMENT:
+        found.extend(parser.feed(c))
+
+    expected = json.loads(DOCUMENT)
+    assert found == [
+        ("vocabulary", expected["vocabulary"][0]),
+        ("vocabulary", expected["vocabulary"][1]),
+        ("grammar", expected["grammar"][0]),
+    ]
+    assert parser.result() == expected
+
+
+def test_first_item_is_returned_before_the_document_ends():
+    parser = IncrementalItemParser()
+    end = DOCUMENT.index("}}") + 2
+
+    assert [kind for kind, _ in parser.feed(DOCUMENT[:end])] == ["vocabulary"]
+    assert [kind for kind, _ in parser.feed(DOCUMENT[end:])] == ["vocabulary", "grammar"]
+
+
+def test_truncated_document_keeps_complete_items():
+    cut = DOCUMENT.index('"grammar"') + 20
+
+    result = parse_partial_items(DOCUMENT[:cut])
+
+    assert [item["word"] for item in result["vocabulary"]] == ["食べる", 'say "hi"']
+    assert result["grammar"] == []
+
+
+def test_unknown_keys_are_ignored():
+    result = parse_partial_items('{"notes": [{"word": "x"}], "vocabulary": [{"word": "y"}]}')
+
+    assert result == {"grammar": [], "vocabulary": [{"word": "y"}]}
+
+
+def test_broken_item_is_skipped():
+    result = parse_partial_items('{"vocabulary": [{"word": }, {"word": "ok"}]}')
+
+    assert result["vocabulary"] == [{"word": "ok"}]
@@ -0,0 +1,52 @@
+from level_index import LevelIndex, normalize_term, read_word_list
+
+LEVELS = ["N1", "N2", "N3", "N4", "N5"]
+
+
+def test_levels_easier_than():
+    index = LevelIndex(LEVELS)
+
+    assert index.levels_easier_than("N3", 0) == {"N4", "N5"}
+    assert index.levels_easier_than("N3", 1) == {"N5"}
+    assert index.levels_easier_than("N2", 3) == set()
+    assert index.levels_easier_than("N5", 0) == set()
+    assert index.levels_easier_than("A1", 0) == set()
+
+
+def test_classify_moves_known_terms():
+    index = LevelIndex(LEVELS)
+    index.add({"N5": {"vocabulary": ["食べる"], "grammar": ["〜ながら"]}, "X9": {"vocabulary": ["x"]}})
+    terms = {"N1": {"vocabulary": ["食べる", "曖昧"], "grammar": ["ながら"]}, "N2": None}
+
+    result, moved = index.classify(terms)
+
+    assert moved == 2
+    assert result["N1"] == {"vocabulary": ["曖昧"], "grammar": []}
+    assert result["N5"] == {"vocabulary": ["食べる"], "grammar": ["ながら"]}
+    assert index.level_of("vocabulary", "x") is None
+
+
+def test_read_text_list(tmp_path):
+    path = tmp_path / "ja.txt"
+    path.write_text("# N3\n考える\n〜つつ\n# N2 grammar\nものの\n# comment\n", encoding="utf-8")
+
+    assert read_word_list(str(path)) == {
+        "N3": {"vocabulary": ["考える"], "grammar": ["〜つつ"]},
+        "N2": {"vocabulary": [], "grammar": ["ものの"]},
+    }
+
+
+def test_read_csv_list(tmp_path):
+    path = tmp_path / "ja.csv"
+    path.write_text("term,level,kind\n考える,n3,vocab\nものの,N2,grammar\n〜つつ\n", encoding="utf-8")
+
+    assert read_word_list(str(path)) == {
+        "N3": {"vocabulary": ["考える"], "grammar": []},
+        "N2": {"vocabulary": [], "grammar": ["ものの"]},
+        "N5": {"vocabulary": [], "grammar": ["〜つつ"]},
+    }
+
+
+def test_normalize_term():
+    assert normalize_term("grammar", " 〜つつ ") == "つつ"
+    assert normalize_term("vocabulary", "〜つつ") == "〜つつ"
@@ -0,0 +1,114 @@
+import base64
+import io
+from types import SimpleNamespace
+
+from PIL import Image
+
+import local_identify
+
+
+class FakeTesseract:
+    def __init__(self):
+        self.calls = 0
+
+    def get_tesseract_version(self):
+        self.calls += 1
+        return "5.0"
+
+    def image_to_string(self, img, lang):
+        return "勉 強 し な け れ ば\n\n な ら な い\n"
+
+
+def _word(surface, pos1, pos2="一般", orth_base=None, lemma=None):
+    feature = SimpleNamespace(pos1=pos1, pos2=pos2, orthBase=orth_base or surface, lemma=lemma or surface)
+    return SimpleNamespace(surface=surface, feature=feature)
+
+
+WORDS = [
+    _word("東京", "名詞", "固有名詞"),
+    _word("は", "助詞"),
+    _word("勉強", "名詞", "普通名詞"),
+    _word("し", "動詞", "非自立可能", "する"),
+    _word("食べ", "動詞", orth_base="食べる"),
+    _word("コーヒー", "名詞", "普通名詞", orth_base="*", lemma="コーヒー-coffee"),
+    _word("ね", "名詞"),
+    _word("ABC", "名詞", "普通名詞"),
+    _word("勉強", "名詞", "普通名詞"),
+]
+
+
+def _fake_tagger(monkeypatch, words=WORDS):
+    tagged = []
+
+    def tagger(text):
+        tagged.append(text)
+        return words
+
+    monkeypatch.setattr(local_identify, "_tagger", tagger)
+    return tagged
+
+
+def test_available_checks_tesseract_once_per_configure(monkeypatch):
+    fake = FakeTesseract()
+    monkeypatch.setattr(local_identify, "pytesseract", fake)
+    monkeypatch.setattr(local_identify, "fugashi", object())
+    monkeypatch.setattr(local_identify, "_availability", None)
+
+    assert local_identify.available() == (True, "")
+    assert local_identify.available() == (True, "")
+    assert fake.calls == 1
+
+    local_identify.configure({})
+    assert local_identify.available() == (True, "")
+    assert fake.calls == 2
+
+
+def test_available_reports_missing_packages(monkeypatch):
+    monkeypatch.setattr(local_identify, "pytesseract", None)
+    monkeypatch.setattr(local_identify, "_availability", None)
+
+    assert local_identify.available() == (False, "pytesseract is not installed")
+
+
+def test_extract_vocabulary_keeps_content_words_in_dictionary_form(monkeypatch):
+    _fake_tagger(monkeypatch)
+
+    assert local_identify.extract_vocabulary("text") == ["勉強", "食べる", "コーヒー"]
+
+
+def test_classify_places_terms_at_known_levels(monkeypatch):
+    _fake_tagger(monkeypatch)
+    monkeypatch.setattr(local_identify, "_options", dict(local_identify.DEFAULT_OPTIONS))
+    levels = {("vocabulary", "勉強"): "N5", ("vocabulary", "食べる"): "N5", ("vocabulary", "コーヒー"): "X9"}
+
+    result = local_identify.classify(
+        "勉強しなければならない", "Japanese", level_of=lambda kind, term: levels.get((kind, term))
+    )
+
+    assert list(result) == ["N1", "N2", "N3", "N4", "N5"]
+    assert result["N5"] == {"vocabulary": ["勉強", "食べる"], "grammar": []}
+    assert result["N4"] == {"vocabulary": [], "grammar": ["〜なければならない"]}
+    # Unknown and unlisted levels fall back to unknown_level
+    assert result["N1"] == {"vocabulary": ["コーヒー"], "grammar": []}
+    assert result["N2"] == result["N3"] == {"vocabulary": [], "grammar": []}
+
+
+def test_local_identify_terms_reads_the_screenshot(monkeypatch):
+    monkeypatch.setattr(local_identify, "pytesseract", FakeTesseract())
+    monkeypatch.setattr(local_identify, "fugashi", object())
+    monkeypatch.setattr(local_identify, "_availability", None)
+    monkeypatch.setattr(local_identify, "_options", dict(local_identify.DEFAULT_OPTIONS, unknown_level="N3"))
+    monkeypatch.setattr(
+        local_identify, "get_level_index", lambda lang: SimpleNamespace(level_of=lambda kind, term: None)
+    )
+    tagged = _fake_tagger(monkeypatch, WORDS[2:3])
+    buf = io.BytesIO()
+    Image.new("RGBA", (32, 16), "white").save(buf, format="PNG")
+
+    result = local_identify.local_identify_terms(
+        base64.b64encode(buf.getvalue()).decode(), None, "Japanese", ""
+    )
+
+    assert tagged == ["勉強しなければ\nならない"]
+    assert result["N3"]["vocabulary"] == ["勉強"]
+    assert not any(info["vocabulary"] for level, info in result.items() if level != "N3")
@@ -0,0 +1,50 @@
+import httpx
+import pytest
+
+from model_routing import DEFAULT_MODEL, ModelRouter, UnparseableResponse
+
+
+def test_routes_default_to_a_single_model():
+    router = ModelRouter()
+
+    assert router.models("vocabulary") == [DEFAULT_MODEL]
+    assert router.timeout("identify") == 60.0
+    assert router.timeout("vocabulary") is None
+
+
+def test_each_model_gets_the_route_timeout():
+    router = ModelRouter({
+        "model_routes": {"identify": ["a", "b"]},
+        "model_timeouts": {"identify": 5.0, "grammar": 0},
+    })
+    calls = []
+
+    def attempt(model, timeout):
+        calls.append((model, timeout))
+        if model == "a":
+            raise httpx.ReadTimeout("slow")
+        return model
+
+    assert router.call("identify", attempt) == "b"
+    assert calls == [("a", 5.0), ("b", 5.0)]
+    assert router.timeout("grammar") is None
+    assert router.stats()["a"]["fallbacks"] == 1
+
+
+def test_last_model_raises_its_timeout():
+    router = ModelRouter({"model_routes": {"identify": ["a"]}})
+
+    def attempt(model, timeout):
+        raise httpx.ReadTimeout("slow")
+
+    with pytest.raises(httpx.ReadTimeout):
+        router.call("identify", attempt)
+
+
+def test_unparseable_last_model_returns_its_result():
+    router = ModelRouter({"model_routes": {"grammar": ["a"]}})
+
+    def attempt(model, timeout):
+        raise UnparseableResponse("bad", result={})
+
+    assert router.call("grammar", attempt) == {}
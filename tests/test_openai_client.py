@@ -0,0 +1,237 @@
+import json
+
+import pytest
+
+pytest.importorskip("pygetwindow")
+
+import openai_client  # noqa: E402
+
+
+@pytest.fixture
+def options(monkeypatch):
+    monkeypatch.setattr(openai_client, "_options", dict(openai_client._options))
+    return openai_client._options
+
+
+def test_parse_details_complete():
+    args = json.dumps({"vocabulary": [{"word": "a"}], "grammar": []})
+
+    assert openai_client._parse_details(args, "stop") == ({"vocabulary": [{"word": "a"}], "grammar": []}, True)
+
+
+def test_parse_details_salvages_truncated_response():
+    args = json.dumps({"vocabulary": [{"word": "a"}, {"word": "b"}]})[:-10]
+
+    result, complete = openai_client._parse_details(args, "length")
+
+    assert not complete
+    assert result["vocabulary"] == [{"word": "a"}]
+
+
+def test_parse_details_treats_length_limited_json_as_incomplete():
+    args = json.dumps({"vocabulary": [{"word": "a"}]})
+
+    assert openai_client._parse_details(args, "length") == ({"vocabulary": [{"word": "a"}], "grammar": []}, False)
+
+
+def test_plan_chunks_fixed_size(options):
+    assert openai_client._plan_chunks(["a", "b", "c"], ["x"], chunk_size=2) == [
+        (["a", "b"], []), (["c"], []), ([], ["x"]),
+    ]
+    options["adaptive_batching"] = False
+    options["detail_chunk_size"] = 1
+    assert openai_client._plan_chunks(["a", "b"], []) == [(["a"], []), (["b"], [])]
+
+
+def test_repair_requests_only_missing_terms(options, monkeypatch, term_cache):
+    requests = []
+    responses = [
+        ({"vocabulary": [{"word": "a"}], "grammar": []}, False),
+        ({"vocabulary": [{"word": "b"}], "grammar": []}, False),
+        ({"vocabulary": [{"word": "c"}], "grammar": []}, True),
+    ]
+
+    def once(vocab, grammar, *args):
+        requests.append(list(vocab))
+        return responses[len(requests) - 1]
+
+    monkeypatch.setattr(openai_client, "_fetch_details_once", once)
+
+    result = openai_client._fetch_details(["a", "b", "c"], [], None, "Japanese", "key")
+
+    assert requests == [["a", "b", "c"], ["b", "c"], ["c"]]
+    assert [item["word"] for item in result["vocabulary"]] == ["a", "b", "c"]
+
+
+def test_repair_rounds_are_limited(options, monkeypatch, term_cache):
+    options["max_repair_rounds"] = 1
+    requests = []
+
+    def once(vocab, grammar, *args):
+        requests.append(list(vocab))
+        return {"vocabulary": [], "grammar": []}, False
+
+    monkeypatch.setattr(openai_client, "_fetch_details_once", once)
+
+    assert openai_client._fetch_details(["a"], [], None, "Japanese", "key")["vocabulary"] == []
+    assert len(requests) == 2
+
+
+def test_failed_repair_keeps_salvaged_items(options, monkeypatch, term_cache):
+    calls = []
+
+    def once(vocab, grammar, *args):
+        calls.append(vocab)
+        if len(calls) > 1:
+            raise RuntimeError("repair failed")
+        return {"vocabulary": [{"word": "a"}], "grammar": []}, False
+
+    monkeypatch.setattr(openai_client, "_fetch_details_once", once)
+
+    result = openai_client._fetch_details(["a", "b"], [], None, "Japanese", "key")
+
+    assert result["vocabulary"] == [{"word": "a"}]
+    assert term_cache.get_many("vocabulary", ["a"]) == {"a": {"word": "a"}}
+
+
+def _items(vocab, grammar, *args):
+    return {"vocabulary": [{"word": w} for w in vocab], "grammar": [{"grammar_point": g} for g in grammar]}
+
+
+def test_concurrent_callers_share_inflight_terms(options, term_cache):
+    import threading
+
+    started = threading.Event()
+    release = threading.Event()
+    requested = []
+
+    def slow_fetch(vocab, grammar, *args):
+        requested.append(list(vocab))
+        started.set()
+        release.wait(5)
+        return _items(vocab, grammar)
+
+    results = {}
+    first = threading.Thread(
+        target=lambda: results.setdefault("first", openai_client.fetch_details_chunked(
+            ["a", "b"], [], None, "Japanese", "key", fetch_func=slow_fetch, chunk_size=8,
+        ))
+    )
+    first.start()
+    assert started.wait(5)
+    second = threading.Thread(
+        target=lambda: results.setdefault("second", openai_client.fetch_details_chunked(
+            ["b", "c"], [], None, "Japanese", "key", fetch_func=slow_fetch, chunk_size=8,
+        ))
+    )
+    second.start()
+    release.set()
+    first.join(5)
+    second.join(5)
+
+    assert requested == [["a", "b"], ["c"]]
+    assert sorted(item["word"] for item in results["second"]["vocabulary"]) == ["b", "c"]
+    assert not openai_client._inflight
+
+
+def test_claimed_terms_are_released_when_planning_fails(options, monkeypatch, term_cache):
+    def broken_plan(*args):
+        raise RuntimeError("no plan")
+
+    monkeypatch.setattr(openai_client, "_plan_chunks", broken_plan)
+    waiting = openai_client._claim_inflight
+
+    with pytest.raises(RuntimeError):
+        openai_client.fetch_details_chunked(["a"], [], None, "Japanese", "key", fetch_func=_items)
+
+    assert not openai_client._inflight
+    namespace = openai_client._inflight_namespace(None, "Japanese", _items)
+    vocab, _, claimed, shared = waiting(namespace, ["a"], [])
+    assert vocab == ["a"] and not shared
+    openai_client._resolve_inflight(namespace, claimed, "vocabulary", "a", None)
+
+
+def test_late_release_does_not_resolve_a_newer_claim(options):
+    namespace = "test"
+    _, _, first, _ = openai_client._claim_inflight(namespace, ["a"], [])
+    openai_client._resolve_inflight(namespace, first, "vocabulary", "a", {"word": "a"})
+    _, _, second, _ = openai_client._claim_inflight(namespace, ["a"], [])
+
+    openai_client._resolve_inflight(namespace, first, "vocabulary", "a", None)
+
+    assert not second[("vocabulary", "a")].done()
+    openai_client._resolve_inflight(namespace, second, "vocabulary", "a", None)
+    assert not openai_client._inflight
+
+
+def test_fallback_after_partial_stream_skips_delivered_terms(monkeypatch, term_cache):
+    import httpx
+    from model_routing import ModelRouter
+
+    router = ModelRouter({"model_routes": {"vocabulary": ["a", "b"]}})
+    monkeypatch.setattr(openai_client, "get_model_router", lambda: router)
+    requests = []
+
+    def attempt(vocab, grammar, factory, target_lang, api_key, on_item, model, timeout):
+        requests.append((model, list(vocab)))
+        if model == "a":
+            on_item("vocabulary", {"word": "x"})
+            raise httpx.ReadTimeout("stalled")
+        for word in vocab:
+            on_item("vocabulary", {"word": word})
+        return {"vocabulary": [{"word": w} for w in vocab], "grammar": []}, True
+
+    monkeypatch.setattr(openai_client, "_fetch_details_attempt", attempt)
+    delivered = []
+
+    result, complete = openai_client._fetch_details_once(
+        ["x", "y"], [], None, "Japanese", "key", lambda kind, item: delivered.append(item["word"])
+    )
+
+    assert requests == [("a", ["x", "y"]), ("b", ["y"])]
+    assert delivered == ["x", "y"]
+    assert complete and [item["word"] for item in result["vocabulary"]] == ["x", "y"]
+
+
+def test_first_token_deadline_closes_a_silent_stream():
+    import threading
+    import time
+
+    closed = threading.Event()
+
+    class Stream:
+        def close(self):
+            closed.set()
+
+    deadline = openai_client._FirstTokenDeadline(Stream(), time.monotonic(), 0.05)
+    assert closed.wait(2) and deadline.expired
+
+    quiet = threading.Event()
+
+    class QuietStream:
+        def close(self):
+            quiet.set()
+
+    deadline = openai_client._FirstTokenDeadline(QuietStream(), time.monotonic(), 0.05)
+    deadline.arrived()
+    assert not quiet.wait(0.2) and not deadline.expired
+
+
+def test_identify_request_uses_the_window_image_detail(monkeypatch):
+    import imaging
+
+    monkeypatch.setattr(imaging, "_profiles", {"Game": {"detail": "low"}})
+    seen = []
+
+    def identify(img_b64, factory, target_lang, api_key, options=None):
+        request = openai_client._identify_request(img_b64, factory, target_lang, "model", options)
+        seen.append(request["messages"][-1]["content"][0]["image_url"]["detail"])
+        return {}
+
+    monkeypatch.setattr(openai_client, "_identify_terms", identify)
+    for title in ("Game", "Other"):
+        openai_client.identify_image(
+            title, "Japanese", "English", "key", img_b64="iVBORw0KGgo=", use_identify_cache=False
+        )
+
+    assert seen == ["low", imaging.image_detail(imaging.options_for("Other"))]
@@ -0,0 +1,142 @@
+import asyncio
+import base64
+import io
+
+import pytest
+from PIL import Image
+
+pytest.importorskip("pygetwindow")
+
+import identify_cache  # noqa: E402
+import openai_client  # noqa: E402
+import openai_client_async  # noqa: E402
+from mock_openai_client import mock_fetch_details_async  # noqa: E402
+
+
+@pytest.fixture
+def options(monkeypatch):
+    monkeypatch.setattr(openai_client, "_options", dict(openai_client._options, use_level_index=False))
+    return openai_client._options
+
+
+@pytest.fixture
+def screens(tmp_path, monkeypatch):
+    cache = identify_cache.IdentifyCache(str(tmp_path / "identify.json"))
+    monkeypatch.setattr(identify_cache, "_identify_cache", cache)
+    yield cache
+    cache.close()
+
+
+def _png_b64() -> str:
+    buf = io.BytesIO()
+    Image.new("RGB", (64, 32), "white").save(buf, format="PNG")
+    return base64.b64encode(buf.getvalue()).decode()
+
+
+def _terms(result):
+    return sorted(
+        item["word"] if "word" in item else item["grammar_point"]
+        for info in result.values()
+        for kind in ("vocabulary", "grammar")
+        for item in info[kind]
+    )
+
+
+def test_analyze_reuses_identified_screens(options, term_cache, screens):
+    identified = []
+
+    async def identify(img_b64, factory, target_lang, api_key):
+        identified.append(img_b64)
+        return {"N2": {"vocabulary": ["絡まる"], "grammar": ["〜わけではない"]}, "N5": None}
+
+    async def run():
+        return [
+            await openai_client_async.analyze_image_async(
+                "Game", "Japanese", "English", "key", img_b64=_png_b64(),
+                identify_func=identify, fetch_func=mock_fetch_details_async,
+            )
+            for _ in range(2)
+        ]
+
+    first, second = asyncio.run(run())
+
+    assert len(identified) == 1
+    assert _terms(first) == _terms(second) == ["〜わけではない", "絡まる"]
+    assert first["N5"] == {"vocabulary": [], "grammar": []}
+
+
+def test_slow_stage_times_out(options, term_cache):
+    async def identify(img_b64, factory, target_lang, api_key):
+        await asyncio.sleep(5)
+
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(openai_client_async.identify_image_async(
+            "Game", "Japanese", "English", "key", img_b64=_png_b64(), identify_func=identify,
+            use_identify_cache=False, timeouts={"identify": 0.05},
+        ))
+
+
+def test_repair_requests_only_missing_terms(options, monkeypatch, term_cache):
+    requests = []
+    responses = [
+        ({"vocabulary": [{"word": "a"}], "grammar": []}, False),
+        ({"vocabulary": [{"word": "b"}], "grammar": []}, True),
+    ]
+
+    async def attempt(vocab, grammar, *args):
+        requests.append(list(vocab))
+        return responses[len(requests) - 1]
+
+    monkeypatch.setattr(openai_client_async, "_fetch_details_attempt_async", attempt)
+
+    result = asyncio.run(openai_client_async._fetch_details_async(["a", "b"], [], None, "Japanese", "key"))
+
+    assert requests == [["a", "b"], ["b"]]
+    assert [item["word"] for item in result["vocabulary"]] == ["a", "b"]
+    assert term_cache.get_many("vocabulary", ["a"]) == {"a": {"word": "a"}}
+
+
+def test_concurrent_calls_share_inflight_terms(options, term_cache):
+    requested = []
+
+    async def slow_fetch(vocab, grammar, *args):
+        requested.append(list(vocab))
+        await asyncio.sleep(0.05)
+        return {"vocabulary": [{"word": w} for w in vocab], "grammar": []}
+
+    async def run():
+        first = asyncio.ensure_future(openai_client_async.fetch_details_chunked_async(
+            ["a", "b"], [], None, "Japanese", "key", fetch_func=slow_fetch, chunk_size=8,
+        ))
+        await asyncio.sleep(0.01)
+        second = await openai_client_async.fetch_details_chunked_async(
+            ["b", "c"], [], None, "Japanese", "key", fetch_func=slow_fetch, chunk_size=8,
+        )
+        return await first, second
+
+    first, second = asyncio.run(run())
+
+    assert requested == [["a", "b"], ["c"]]
+    assert sorted(item["word"] for item in second["vocabulary"]) == ["b", "c"]
+    assert not openai_client._inflight
+
+
+def test_cancelled_waiter_leaves_the_owner_running(options, term_cache):
+    async def slow_fetch(vocab, grammar, *args):
+        await asyncio.sleep(0.1)
+        return {"vocabulary": [{"word": w} for w in vocab], "grammar": []}
+
+    async def run():
+        owner = asyncio.ensure_future(openai_client_async.fetch_details_chunked_async(
+            ["a"], [], None, "Japanese", "key", fetch_func=slow_fetch,
+        ))
+        await asyncio.sleep(0.01)
+        waiter = asyncio.ensure_future(openai_client_async.fetch_details_chunked_async(
+            ["a"], [], None, "Japanese", "key", fetch_func=slow_fetch,
+        ))
+        await asyncio.sleep(0.01)
+        waiter.cancel()
+        return await owner
+
+    assert asyncio.run(run())["vocabulary"] == [{"word": "a"}]
+    assert not openai_client._inflight
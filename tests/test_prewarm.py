@@ -0,0 +1,32 @@
+import json
+
+import pytest
+
+pytest.importorskip("pygetwindow")
+
+import prewarm  # noqa: E402
+
+
+def test_mock_prewarm_caches_every_term(tmp_path, monkeypatch, term_cache):
+    monkeypatch.setattr(prewarm, "load_settings", lambda: {})
+    word_list = tmp_path / "n3.txt"
+    word_list.write_text("# N3\n考える\n届く\n〜つつ\n# N2\n絡まる\n", encoding="utf-8")
+    state = tmp_path / "n3.state.json"
+    state.write_text(json.dumps({"attempts": {"vocabulary:届く": 1}}), encoding="utf-8")
+
+    assert prewarm.main([str(word_list), "--mock", "--batch-size", "2", "--state", str(state)]) == 0
+
+    assert set(term_cache.store.get_many("vocabulary", ["考える", "届く", "絡まる"])) == {"考える", "届く", "絡まる"}
+    assert term_cache.store.get_many("grammar", ["〜つつ"])["〜つつ"]["grammar_point"] == "〜つつ"
+    assert json.loads(state.read_text(encoding="utf-8")) == {"attempts": {}}
+
+
+def test_second_run_finds_everything_cached(tmp_path, term_cache):
+    levels = {"N3": {"vocabulary": ["考える", "届く"], "grammar": ["〜つつ"]}}
+    state = str(tmp_path / "state.json")
+
+    first = prewarm.prewarm(levels, "Japanese", "en", "", fetch_func=prewarm.mock_fetch_details, state_path=state)
+    second = prewarm.prewarm(levels, "Japanese", "en", "", fetch_func=prewarm.mock_fetch_details, state_path=state)
+
+    assert first == {"cached": 0, "fetched": 3, "missing": 0, "skipped": 0}
+    assert second == {"cached": 3, "fetched": 0, "missing": 0, "skipped": 0}
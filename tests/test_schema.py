@@ -0,0 +1,60 @@
+import pytest
+
+from schema import SCHEMA_MINIFY_MODES, get_item_schema, get_schema, minify_schema
+
+
+def _descriptions(schema):
+    if isinstance(schema, dict):
+        found = [v for k, v in schema.items() if k == "description" and isinstance(v, str)]
+        for value in schema.values():
+            found.extend(_descriptions(value))
+        return found
+    if isinstance(schema, list):
+        return [d for value in schema for d in _descriptions(value)]
+    return []
+
+
+def _without_descriptions(schema):
+    return minify_schema(schema, "strip")
+
+
+def test_off_returns_schema_unchanged():
+    schema = {"type": "object", "description": "Long text, e.g. an example."}
+
+    assert minify_schema(schema, "off") is schema
+
+
+@pytest.mark.parametrize("mode", SCHEMA_MINIFY_MODES)
+@pytest.mark.parametrize("kind", [None, "vocabulary", "grammar"])
+def test_minified_schemas_keep_structure(mode, kind):
+    baseline = get_item_schema("ja", kind)
+    minified = get_item_schema("ja", kind, mode)
+
+    assert _without_descriptions(minified) == _without_descriptions(baseline)
+    assert _without_descriptions(get_schema("ja", mode)[1]) == _without_descriptions(get_schema("ja")[1])
+
+
+def test_strip_removes_descriptions_but_keeps_description_properties():
+    schema = {
+        "type": "object",
+        "description": "An item.",
+        "properties": {"description": {"type": "string", "description": "A text."}},
+    }
+
+    assert minify_schema(schema, "strip") == {"type": "object", "properties": {"description": {"type": "string"}}}
+
+
+def test_short_keeps_first_sentence_without_examples():
+    schema = {"description": "The word. Use its dictionary form, e.g. 食べる."}
+
+    assert minify_schema(schema, "short") == {"description": "The word."}
+    assert minify_schema({"description": "單字的中文釋義，例如『吃』。"}, "short") == {"description": "單字的中文釋義"}
+
+
+def test_short_is_smaller_than_baseline():
+    baseline = _descriptions(get_item_schema("ja"))
+    short = _descriptions(get_item_schema("ja", None, "short"))
+
+    assert len(short) == len(baseline)
+    assert sum(map(len, short)) < sum(map(len, baseline))
+    assert _descriptions(get_item_schema("ja", None, "strip")) == []
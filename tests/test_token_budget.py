@@ -0,0 +1,69 @@
+import json
+
+from token_budget import DEFAULT_ESTIMATES, MAX_MAX_TOKENS, MIN_MAX_TOKENS, TokenEstimator
+
+
+def _estimator(tmp_path, **kwargs):
+    return TokenEstimator(str(tmp_path / "token_stats.json"), **kwargs)
+
+
+def test_starts_from_defaults(tmp_path):
+    estimator = _estimator(tmp_path)
+
+    assert estimator.estimate("vocabulary") == DEFAULT_ESTIMATES["vocabulary"]
+    assert estimator.estimate("grammar") == DEFAULT_ESTIMATES["grammar"]
+
+
+def test_record_splits_tokens_by_item_size(tmp_path):
+    estimator = _estimator(tmp_path)
+    details = {
+        "vocabulary": [{"word": "a" * 40}, {"word": "b" * 40}],
+        "grammar": [{"grammar_point": "c" * 31}],
+    }
+
+    estimator.record(300, details)
+
+    # Three items of the same JSON size share the tokens evenly
+    assert estimator.estimate("vocabulary") == 100
+    assert estimator.estimate("grammar") == 100
+
+
+def test_record_moves_average_and_persists(tmp_path):
+    estimator = _estimator(tmp_path, alpha=0.5)
+    estimator.record(400, {"vocabulary": [{"word": "a"}]})
+    estimator.record(200, {"vocabulary": [{"word": "a"}]})
+
+    assert estimator.estimate("vocabulary") == 300
+    assert estimator.estimate("grammar") == DEFAULT_ESTIMATES["grammar"]
+    with open(tmp_path / "token_stats.json", encoding="utf-8") as f:
+        assert json.load(f)["vocabulary"] == {"tokens_per_item": 300, "samples": 2}
+    assert _estimator(tmp_path).estimate("vocabulary") == 300
+
+
+def test_record_without_usage_or_items_is_ignored(tmp_path):
+    estimator = _estimator(tmp_path)
+    estimator.record(None, {"vocabulary": [{"word": "a"}]})
+    estimator.record(500, {"vocabulary": []})
+
+    assert estimator.stats()["vocabulary"]["samples"] == 0
+
+
+def test_plan_batches_fits_budget(tmp_path):
+    estimator = _estimator(tmp_path)
+    vocab = [f"v{i}" for i in range(12)]
+    grammar = [f"g{i}" for i in range(3)]
+
+    batches = estimator.plan_batches(vocab, grammar, budget=3500)
+
+    # 3500 / 700 per vocabulary item and 3500 / 500 per grammar item
+    assert batches == [(vocab[:5], []), (vocab[5:10], []), (vocab[10:], []), ([], grammar)]
+    assert estimator.plan_batches(vocab, [], budget=3500, max_items=4)[0] == (vocab[:4], [])
+    assert estimator.plan_batches(vocab[:1], [], budget=10) == [(vocab[:1], [])]
+
+
+def test_max_tokens_has_headroom_and_limits(tmp_path):
+    estimator = _estimator(tmp_path)
+
+    assert estimator.max_tokens_for(["a"] * 2, ["b"]) == int((2 * 700 + 500) * 1.5)
+    assert estimator.max_tokens_for([], []) == MIN_MAX_TOKENS
+    assert estimator.max_tokens_for(["a"] * 100, []) == MAX_MAX_TOKENS
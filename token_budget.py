@@ -0,0 +1,132 @@
+import json
+import math
+import os
+import threading
+from typing import Dict, List, Optional, Tuple
+
+TOKEN_STATS_FILE = os.path.join(os.path.expanduser("~"), ".language_helper_token_stats.json")
+
+# Starting guesses for output tokens per item before anything was observed
+DEFAULT_ESTIMATES = {"vocabulary": 700.0, "grammar": 500.0}
+DEFAULT_TOKEN_BUDGET = 4000
+# Weight of the newest observation in the running average
+SMOOTHING = 0.2
+# Extra room on top of the estimate so a verbose batch is not truncated
+HEADROOM = 1.5
+MIN_MAX_TOKENS = 1000
+MAX_MAX_TOKENS = 16000
+
+
+class TokenEstimator:
+    """Running estimate of output tokens per vocabulary and grammar item.
+
+    Every response reports its completion tokens; they are split between the
+    kinds in proportion to the JSON size of the returned items and folded into
+    an exponential moving average that is persisted across runs.
+    """
+
+    def __init__(self, path: str = TOKEN_STATS_FILE, alpha: float = SMOOTHING):
+        self.path = path
+        self.alpha = alpha
+        self._lock = threading.Lock()
+        self._stats: Dict[str, Dict[str, float]] = {
+            kind: {"tokens_per_item": value, "samples": 0}
+            for kind, value in DEFAULT_ESTIMATES.items()
+        }
+        self._load()
+
+    def estimate(self, kind: str) -> float:
+        with self._lock:
+            return self._stats[kind]["tokens_per_item"]
+
+    def record(self, completion_tokens: Optional[int], details: Dict) -> None:
+        """Update the estimates from one ``deliver_report`` response."""
+        if not completion_tokens:
+            return
+        sizes = {}
+        counts = {}
+        for kind in self._stats:
+            items = details.get(kind, []) or []
+            counts[kind] = len(items)
+            sizes[kind] = sum(len(json.dumps(item, ensure_ascii=False)) for item in items)
+        total_size = sum(sizes.values())
+        if not total_size:
+            return
+        with self._lock:
+            for kind, count in counts.items():
+                if not count:
+                    continue
+                per_item = completion_tokens * sizes[kind] / total_size / count
+                stats = self._stats[kind]
+                if stats["samples"]:
+                    stats["tokens_per_item"] += self.alpha * (per_item - stats["tokens_per_item"])
+                else:
+                    stats["tokens_per_item"] = per_item
+                stats["samples"] += 1
+        self._save()
+
+    def plan_batches(
+        self,
+        vocab: List[str],
+        grammar: List[str],
+        budget: int = DEFAULT_TOKEN_BUDGET,
+        max_items: Optional[int] = None,
+    ) -> List[Tuple[List[str], List[str]]]:
+        """Split the terms into per-kind batches whose expected output fits ``budget``."""
+        batches: List[Tuple[List[str], List[str]]] = []
+        for kind, terms in (("vocabulary", vocab), ("grammar", grammar)):
+            size = max(1, int(budget // max(1.0, self.estimate(kind))))
+            if max_items:
+                size = min(size, max_items)
+            for i in range(0, len(terms), size):
+                chunk = terms[i:i + size]
+                batches.append((chunk, []) if kind == "vocabulary" else ([], chunk))
+        return batches
+
+    def max_tokens_for(self, vocab: List[str], grammar: List[str]) -> int:
+        """Return a ``max_tokens`` limit with headroom for the given terms."""
+        expected = len(vocab) * self.estimate("vocabulary") + len(grammar) * self.estimate("grammar")
+        return int(min(MAX_MAX_TOKENS, max(MIN_MAX_TOKENS, math.ceil(expected * HEADROOM))))
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            return {kind: dict(values) for kind, values in self._stats.items()}
+
+    def _load(self) -> None:
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except Exception:
+            return
+        for kind, values in data.items():
+            if kind in self._stats:
+                try:
+                    self._stats[kind] = {
+                        "tokens_per_item": float(values["tokens_per_item"]),
+                        "samples": int(values["samples"]),
+                    }
+                except Exception:
+                    continue
+
+    def _save(self) -> None:
+        data = self.stats()
+        try:
+            with open(self.path, "w", encoding="utf-8") as f:
+                json.dump(data, f)
+        except Exception:
+            pass
+
+
+_estimator: Optional[TokenEstimator] = None
+_estimator_lock = threading.Lock()
+
+
+def get_token_estimator() -> TokenEstimator:
+    """Return the process-wide :class:`TokenEstimator`."""
+    global _estimator
+    with _estimator_lock:
+        if _estimator is None:
+            _estimator = TokenEstimator()
+        return _estimator
@@ -1,18 +1,33 @@
-from typing import List
+from typing import Callable, List
+import functools
 from PyQt5 import QtWidgets, QtCore, QtGui
 import base64
 import io
-from PIL import Image, ImageChops
+from PIL import Image
 import pygetwindow as gw
 
-from display import DisplayArea, WordEntry
+from display import DisplayArea, WordEntry, parse_words
 
 import config
 from config import t, UI_STRINGS, save_settings
 from openai_client import analyze_image
 import openai_client
 from mock_openai_client import mock_identify_terms, mock_fetch_details
+import local_identify
+from local_identify import local_identify_terms
 from screenshot import grab_window_image
+from cache import get_term_cache
+from fetch_queue import FetchQueue, DEFAULT_BATCH_SIZE, DEFAULT_INTERVAL
+from identify_cache import get_identify_cache, DEFAULT_THRESHOLD
+from token_budget import DEFAULT_TOKEN_BUDGET
+import imaging
+import telemetry
+from client_pool import get_client_manager
+from hedging import get_hedge_policy, DEFAULT_OPTIONS as HEDGE_OPTIONS
+from model_routing import ROUTES, get_model_router
+from workers import Task
+from imaging import IMAGE_FORMATS, IMAGE_DETAILS, TILE_GRIDS
+from schema import SCHEMA_MINIFY_MODES
 
 
 class SettingsDialog(QtWidgets.QDialog):
@@ -45,11 +60,212 @@ class SettingsDialog(QtWidgets.QDialog):
         self.test_mode_box.setChecked(settings.get("test_mode", False))
         form.addRow(self.test_mode_box)
 
+        self.identify_engine_combo = QtWidgets.QComboBox()
+        self.identify_engine_combo.addItem(t("OpenAI"), "openai")
+        self.identify_engine_combo.addItem(t("Local (OCR)"), "local")
+        engine_index = self.identify_engine_combo.findData(settings.get("identify_engine", "openai"))
+        self.identify_engine_combo.setCurrentIndex(max(0, engine_index))
+        ok, reason = local_identify.available()
+        if not ok:
+            self.identify_engine_combo.setItemData(1, reason, QtCore.Qt.ToolTipRole)
+        form.addRow(t("Identify Engine"), self.identify_engine_combo)
+
+        self.level_index_box = QtWidgets.QCheckBox(t("Correct Levels with Word Lists"))
+        self.level_index_box.setChecked(settings.get("use_level_index", True))
+        form.addRow(self.level_index_box)
+
+        self.skip_margin_spin = QtWidgets.QSpinBox()
+        self.skip_margin_spin.setRange(-1, 5)
+        self.skip_margin_spin.setSpecialValueText(t("Off"))
+        self.skip_margin_spin.setValue(settings.get("level_skip_margin", 1))
+        form.addRow(t("Skip Details Levels Below Yours"), self.skip_margin_spin)
+
+        self.background_fetch_box = QtWidgets.QCheckBox(t("Fetch Details in Background"))
+        self.background_fetch_box.setChecked(settings.get("background_fetch", True))
+        form.addRow(self.background_fetch_box)
+
+        self.telemetry_box = QtWidgets.QCheckBox(t("Record Telemetry"))
+        self.telemetry_box.setChecked(settings.get("telemetry", True))
+        form.addRow(self.telemetry_box)
+
+        # Performance knobs stay out of the first-run form
+        advanced = QtWidgets.QFormLayout()
+
+        self.similar_threshold_spin = QtWidgets.QSpinBox()
+        self.similar_threshold_spin.setRange(-1, 64)
+        self.similar_threshold_spin.setSpecialValueText(t("Off"))
+        self.similar_threshold_spin.setValue(settings.get("identify_cache_threshold", DEFAULT_THRESHOLD))
+        advanced.addRow(t("Similar Screen Threshold"), self.similar_threshold_spin)
+
+        self.tile_grid_combo = QtWidgets.QComboBox()
+        self.tile_grid_combo.addItems(TILE_GRIDS)
+        self.tile_grid_combo.setCurrentText(settings.get("identify_tile_grid", "1x1"))
+        advanced.addRow(t("Identify Tiles"), self.tile_grid_combo)
+
+        self.tile_overlap_spin = QtWidgets.QDoubleSpinBox()
+        self.tile_overlap_spin.setRange(0.0, 0.5)
+        self.tile_overlap_spin.setSingleStep(0.05)
+        self.tile_overlap_spin.setValue(settings.get("identify_tile_overlap", 0.15))
+        advanced.addRow(t("Tile Overlap"), self.tile_overlap_spin)
+
+        self.delta_capture_box = QtWidgets.QCheckBox(t("Send Changed Region Only"))
+        self.delta_capture_box.setChecked(settings.get("delta_capture", False))
+        advanced.addRow(self.delta_capture_box)
+
+        self.delta_max_area_spin = QtWidgets.QDoubleSpinBox()
+        self.delta_max_area_spin.setRange(0.05, 1.0)
+        self.delta_max_area_spin.setSingleStep(0.05)
+        self.delta_max_area_spin.setValue(settings.get("delta_max_area", 0.5))
+        advanced.addRow(t("Max Changed Area"), self.delta_max_area_spin)
+
+        self.chunk_size_spin = QtWidgets.QSpinBox()
+        self.chunk_size_spin.setRange(1, 100)
+        self.chunk_size_spin.setValue(settings.get("detail_chunk_size", 8))
+        advanced.addRow(t("Terms per Request"), self.chunk_size_spin)
+
+        self.max_workers_spin = QtWidgets.QSpinBox()
+        self.max_workers_spin.setRange(1, 16)
+        self.max_workers_spin.setValue(settings.get("detail_max_workers", 4))
+        advanced.addRow(t("Parallel Requests"), self.max_workers_spin)
+
+        self.token_budget_spin = QtWidgets.QSpinBox()
+        self.token_budget_spin.setRange(500, 16000)
+        self.token_budget_spin.setSingleStep(500)
+        self.token_budget_spin.setValue(settings.get("detail_token_budget", DEFAULT_TOKEN_BUDGET))
+        advanced.addRow(t("Token Budget per Request"), self.token_budget_spin)
+
+        self.schema_minify_combo = QtWidgets.QComboBox()
+        for mode in SCHEMA_MINIFY_MODES:
+            self.schema_minify_combo.addItem(t(f"Schema: {mode}"), mode)
+        minify_index = self.schema_minify_combo.findData(settings.get("schema_minify", "off"))
+        self.schema_minify_combo.setCurrentIndex(max(0, minify_index))
+        advanced.addRow(t("Schema Descriptions"), self.schema_minify_combo)
+
+        self.background_batch_spin = QtWidgets.QSpinBox()
+        self.background_batch_spin.setRange(1, 20)
+        self.background_batch_spin.setValue(settings.get("background_fetch_batch", DEFAULT_BATCH_SIZE))
+        advanced.addRow(t("Background Batch Size"), self.background_batch_spin)
+
+        self.background_interval_spin = QtWidgets.QDoubleSpinBox()
+        self.background_interval_spin.setRange(0.0, 600.0)
+        self.background_interval_spin.setValue(settings.get("background_fetch_interval", DEFAULT_INTERVAL))
+        advanced.addRow(t("Seconds Between Background Batches"), self.background_interval_spin)
+
+        self.connect_timeout_spin = QtWidgets.QDoubleSpinBox()
+        self.connect_timeout_spin.setRange(1, 120)
+        self.connect_timeout_spin.setValue(settings.get("connect_timeout", 10.0))
+        advanced.addRow(t("Connect Timeout (s)"), self.connect_timeout_spin)
+
+        self.read_timeout_spin = QtWidgets.QDoubleSpinBox()
+        self.read_timeout_spin.setRange(5, 600)
+        self.read_timeout_spin.setValue(settings.get("read_timeout", 120.0))
+        advanced.addRow(t("Read Timeout (s)"), self.read_timeout_spin)
+
+        self.max_retries_spin = QtWidgets.QSpinBox()
+        self.max_retries_spin.setRange(0, 10)
+        self.max_retries_spin.setValue(settings.get("max_retries", 3))
+        advanced.addRow(t("Max Retries"), self.max_retries_spin)
+
+        self.hedge_box = QtWidgets.QCheckBox(t("Hedge Slow Identify Requests"))
+        self.hedge_box.setChecked(settings.get("identify_hedge", HEDGE_OPTIONS["identify_hedge"]))
+        advanced.addRow(self.hedge_box)
+
+        self.hedge_percentile_spin = QtWidgets.QSpinBox()
+        self.hedge_percentile_spin.setRange(50, 99)
+        self.hedge_percentile_spin.setValue(settings.get("hedge_percentile", HEDGE_OPTIONS["hedge_percentile"]))
+        advanced.addRow(t("Hedge After Latency Percentile"), self.hedge_percentile_spin)
+
+        self.hedge_budget_spin = QtWidgets.QDoubleSpinBox()
+        self.hedge_budget_spin.setRange(0.0, 1.0)
+        self.hedge_budget_spin.setSingleStep(0.05)
+        self.hedge_budget_spin.setValue(settings.get("hedge_budget", HEDGE_OPTIONS["hedge_budget"]))
+        advanced.addRow(t("Max Share of Hedged Requests"), self.hedge_budget_spin)
+
+        routes = get_model_router().options["model_routes"]
+        routes = {**routes, **(settings.get("model_routes") or {})}
+        self.route_edits = {}
+        for route in ROUTES:
+            edit = QtWidgets.QLineEdit(", ".join(routes.get(route) or []))
+            edit.setToolTip(t("Primary model first, then fallbacks, separated by commas"))
+            self.route_edits[route] = edit
+            advanced.addRow(t(f"Models: {route}"), edit)
+
+        timeouts = get_model_router().options["model_timeouts"]
+        timeouts = {**timeouts, **(settings.get("model_timeouts") or {})}
+        self.route_timeout_spins = {}
+        for route in ROUTES:
+            spin = QtWidgets.QDoubleSpinBox()
+            spin.setRange(0, 600)
+            spin.setSpecialValueText(t("Off"))
+            spin.setValue(timeouts.get(route) or 0)
+            self.route_timeout_spins[route] = spin
+            advanced.addRow(t(f"First Token Timeout: {route} (s)"), spin)
+
+        model_stats = get_model_router().stats()
+        if model_stats:
+            columns = ["calls", "failures", "fallbacks", "latency_p50", "latency_p90"]
+            stats_table = QtWidgets.QTableWidget(len(model_stats), len(columns))
+            stats_table.setHorizontalHeaderLabels(columns)
+            stats_table.setVerticalHeaderLabels(list(model_stats))
+            for row, stats in enumerate(model_stats.values()):
+                for col, column in enumerate(columns):
+                    value = stats.get(column, "")
+                    text = f"{value:.2f}" if isinstance(value, float) else str(value)
+                    stats_table.setItem(row, col, QtWidgets.QTableWidgetItem(text))
+            stats_table.setEditTriggers(QtWidgets.QAbstractItemView.NoEditTriggers)
+            stats_table.setMaximumHeight(120)
+            advanced.addRow(t("Model Latency (s)"), stats_table)
+
+        self.api_base_url_edit = QtWidgets.QLineEdit(settings.get("api_base_url") or "")
+        self.api_base_url_edit.setPlaceholderText("https://api.openai.com/v1")
+        advanced.addRow(t("API Base URL"), self.api_base_url_edit)
+
+        self.max_edge_spin = QtWidgets.QSpinBox()
+        self.max_edge_spin.setRange(0, 8192)
+        self.max_edge_spin.setSingleStep(256)
+        self.max_edge_spin.setSpecialValueText(t("Off"))
+        self.max_edge_spin.setValue(settings.get("image_max_edge", 0))
+        advanced.addRow(t("Max Image Edge (px)"), self.max_edge_spin)
+
+        self.grayscale_box = QtWidgets.QCheckBox(t("Grayscale"))
+        self.grayscale_box.setChecked(settings.get("image_grayscale", False))
+        advanced.addRow(self.grayscale_box)
+
+        self.autocontrast_box = QtWidgets.QCheckBox(t("Normalize Contrast"))
+        self.autocontrast_box.setChecked(settings.get("image_autocontrast", False))
+        advanced.addRow(self.autocontrast_box)
+
+        self.image_format_combo = QtWidgets.QComboBox()
+        self.image_format_combo.addItems(IMAGE_FORMATS)
+        self.image_format_combo.setCurrentText(settings.get("image_format", "PNG"))
+        advanced.addRow(t("Image Format"), self.image_format_combo)
+
+        self.image_quality_spin = QtWidgets.QSpinBox()
+        self.image_quality_spin.setRange(10, 100)
+        self.image_quality_spin.setValue(settings.get("image_quality", 85))
+        advanced.addRow(t("Image Quality"), self.image_quality_spin)
+
+        self.image_detail_combo = QtWidgets.QComboBox()
+        self.image_detail_combo.addItems(IMAGE_DETAILS)
+        self.image_detail_combo.setCurrentText(settings.get("image_detail", "auto"))
+        advanced.addRow(t("Image Detail"), self.image_detail_combo)
+
         button = QtWidgets.QPushButton(t("Continue"))
         button.clicked.connect(self.accept)
 
+        general_page = QtWidgets.QWidget()
+        general_page.setLayout(form)
+        advanced_page = QtWidgets.QWidget()
+        advanced_page.setLayout(advanced)
+        advanced_scroll = QtWidgets.QScrollArea()
+        advanced_scroll.setWidgetResizable(True)
+        advanced_scroll.setWidget(advanced_page)
+        tabs = QtWidgets.QTabWidget()
+        tabs.addTab(general_page, t("General"))
+        tabs.addTab(advanced_scroll, t("Advanced"))
+
         layout = QtWidgets.QVBoxLayout()
-        layout.addLayout(form)
+        layout.addWidget(tabs)
         layout.addWidget(button)
         self.setLayout(layout)
 
@@ -59,10 +275,51 @@ class SettingsDialog(QtWidgets.QDialog):
             "ui_language": self.ui_lang_combo.currentText(),
             "report_language": self.report_lang_combo.currentText(),
             "test_mode": self.test_mode_box.isChecked(),
+            "identify_engine": self.identify_engine_combo.currentData(),
+            "use_level_index": self.level_index_box.isChecked(),
+            "level_skip_margin": self.skip_margin_spin.value(),
+            "identify_cache_threshold": self.similar_threshold_spin.value(),
+            "identify_tile_grid": self.tile_grid_combo.currentText(),
+            "identify_tile_overlap": self.tile_overlap_spin.value(),
+            "delta_capture": self.delta_capture_box.isChecked(),
+            "delta_max_area": self.delta_max_area_spin.value(),
+            "detail_chunk_size": self.chunk_size_spin.value(),
+            "detail_max_workers": self.max_workers_spin.value(),
+            "detail_token_budget": self.token_budget_spin.value(),
+            "background_fetch": self.background_fetch_box.isChecked(),
+            "background_fetch_batch": self.background_batch_spin.value(),
+            "background_fetch_interval": self.background_interval_spin.value(),
+            "connect_timeout": self.connect_timeout_spin.value(),
+            "read_timeout": self.read_timeout_spin.value(),
+            "max_retries": self.max_retries_spin.value(),
+            "api_base_url": self.api_base_url_edit.text().strip(),
+            "model_routes": {
+                route: [m.strip() for m in edit.text().split(",") if m.strip()]
+                for route, edit in self.route_edits.items()
+            },
+            "model_timeouts": {
+                route: spin.value() or None for route, spin in self.route_timeout_spins.items()
+            },
+            "identify_hedge": self.hedge_box.isChecked(),
+            "hedge_percentile": self.hedge_percentile_spin.value(),
+            "hedge_budget": self.hedge_budget_spin.value(),
+            "telemetry": self.telemetry_box.isChecked(),
+            "schema_minify": self.schema_minify_combo.currentData(),
+            "image_max_edge": self.max_edge_spin.value(),
+            "image_grayscale": self.grayscale_box.isChecked(),
+            "image_autocontrast": self.autocontrast_box.isChecked(),
+            "image_format": self.image_format_combo.currentText(),
+            "image_quality": self.image_quality_spin.value(),
+            "image_detail": self.image_detail_combo.currentText(),
         }
 
 
 class MainWindow(QtWidgets.QWidget):
+    # Emitted from worker threads; Qt queues them onto the GUI thread
+    terms_identified = QtCore.pyqtSignal(dict)
+    item_arrived = QtCore.pyqtSignal(str, dict)
+    background_details = QtCore.pyqtSignal(dict)
+
     def __init__(self, settings: dict):
         super().__init__()
         self.settings = settings
@@ -70,10 +327,14 @@ class MainWindow(QtWidgets.QWidget):
         self.report_language = settings.get("report_language", "en")
         self.test_mode = settings.get("test_mode", False)
         config.current_ui_language = settings.get("ui_language", "en")
-        self.identify_func = mock_identify_terms if self.test_mode else None
+        self.identify_func = self._select_identify_func()
         self.fetch_func = mock_fetch_details if self.test_mode else None
         self.setWindowTitle(t("Screenshot Language Helper"))
         self.resize(1500, 800)
+        self.term_cache = get_term_cache()
+        self.term_cache.load()
+        self.fetch_queue = FetchQueue(self._background_fetch, on_details=self.background_details.emit)
+        self.apply_runtime_settings()
 
         layout = QtWidgets.QHBoxLayout()
 
@@ -133,8 +394,35 @@ class MainWindow(QtWidgets.QWidget):
         self.fetch_details_button.clicked.connect(self.fetch_selected_details)
         right_layout.addWidget(self.fetch_details_button, alignment=QtCore.Qt.AlignCenter)
 
+        self.progress_bar = QtWidgets.QProgressBar()
+        self.progress_bar.setFixedSize(150, 15)
+        self.progress_bar.setFormat("%v/%m")
+        self.progress_bar.hide()
+        right_layout.addWidget(self.progress_bar, alignment=QtCore.Qt.AlignCenter)
+
+        self.status_label = QtWidgets.QLabel()
+        self.status_label.setFixedWidth(150)
+        self.status_label.setWordWrap(True)
+        right_layout.addWidget(self.status_label, alignment=QtCore.Qt.AlignCenter)
+
+        self.cancel_button = QtWidgets.QPushButton(t("Cancel"))
+        self.cancel_button.setFixedSize(150, 25)
+        self.cancel_button.clicked.connect(self.cancel_task)
+        self.cancel_button.hide()
+        right_layout.addWidget(self.cancel_button, alignment=QtCore.Qt.AlignCenter)
+
+        self.pause_queue_button = QtWidgets.QPushButton()
+        self.pause_queue_button.setFixedSize(150, 25)
+        self.pause_queue_button.clicked.connect(self.toggle_background_fetch)
+        right_layout.addWidget(self.pause_queue_button, alignment=QtCore.Qt.AlignCenter)
+        self._update_pause_button()
+
         right_layout.addStretch(1)
 
+        self.stats_button = QtWidgets.QPushButton(t("Statistics"))
+        self.stats_button.clicked.connect(self.show_statistics)
+        right_layout.addWidget(self.stats_button, alignment=QtCore.Qt.AlignRight)
+
         self.settings_button = QtWidgets.QPushButton(t("Settings"))
         self.settings_button.clicked.connect(self.open_settings)
         right_layout.addWidget(self.settings_button, alignment=QtCore.Qt.AlignRight)
@@ -144,16 +432,21 @@ class MainWindow(QtWidgets.QWidget):
         self.words: List[WordEntry] = []
         self.last_image = None
         self.last_img_b64 = None
+        # Capture, identify and fetch run as one task at a time on this pool
+        self.task_pool = QtCore.QThreadPool(self)
+        self.task: Task | None = None
+        # Tasks not finished yet, incl. cancelled ones still winding down
+        self._running_tasks: set = set()
+        # Always queued, so streamed items reach the display through the event
+        # loop and never run display code on the thread that emitted them
+        queued = QtCore.Qt.QueuedConnection
+        self.terms_identified.connect(self._on_terms_identified, queued)
+        self.item_arrived.connect(self._on_item_arrived, queued)
+        self.background_details.connect(self._apply_details, queued)
+        self.fetch_queue.start()
 
     def load_language_config(self) -> dict:
-        import json
-        import os
-        path = os.path.join(os.path.dirname(__file__), "language_config.json")
-        try:
-            with open(path, "r", encoding="utf-8") as f:
-                return json.load(f)
-        except Exception:
-            return {"English": ["A1", "A2", "B1", "B2", "C1", "C2"]}
+        return config.load_language_config()
 
     def update_levels(self, language: str, update_display: bool=True) -> None:
         levels = self.languages.get(language, [])
@@ -163,69 +456,109 @@ class MainWindow(QtWidgets.QWidget):
             self.update_display()
 
     def capture_and_analyze_all(self, img_b64: str | None = None, pil_image: Image.Image | None = None):
-        if not self.api_key and not self.test_mode:
-            QtWidgets.QMessageBox.warning(self, t("Error"), t("API key not provided"))
-            return
-        title = self.window_combo.currentText()
-        if img_b64 is None:
-            img_b64 = openai_client.grab_window_image(title)
-        if pil_image is None and img_b64 is not None:
-            pil_image = Image.open(io.BytesIO(base64.b64decode(img_b64)))
-        if self.last_image is not None and pil_image is not None:
-            diff = self._image_diff_ratio(self.last_image, pil_image)
-            if diff <= 0.03:
-                if QtWidgets.QMessageBox.question(
-                    self,
-                    t("Warning"),
-                    t("Screenshot looks similar to previous one. Proceed?"),
-                    QtWidgets.QMessageBox.Yes | QtWidgets.QMessageBox.No,
-                ) != QtWidgets.QMessageBox.Yes:
-                    return
-        data = analyze_image(
-            title,
-            self.language_combo.currentText(),
-            self.report_language,
-            self.api_key,
-            img_b64=img_b64,
-            identify_func=self.identify_func,
-            fetch_func=self.fetch_func,
-        )
-        self.last_image = pil_image
-        self.last_img_b64 = img_b64
-        self.words = self.parse_words(data)
-        self.update_display()
+        self._capture(img_b64, pil_image, self._analyze_all)
 
     def capture_and_identify(self, img_b64: str | None = None, pil_image: Image.Image | None = None):
+        self._capture(img_b64, pil_image, self._identify)
+
+    def _capture(self, img_b64: str | None, pil_image: Image.Image | None, proceed) -> None:
+        """Grab and decode the window on a worker, then ``proceed(title, img_b64, pil_image)``."""
+        if self.task is not None:
+            return
         if not self.api_key and not self.test_mode:
             QtWidgets.QMessageBox.warning(self, t("Error"), t("API key not provided"))
             return
         title = self.window_combo.currentText()
-        if img_b64 is None:
-            img_b64 = openai_client.grab_window_image(title)
-        if pil_image is None and img_b64 is not None:
-            pil_image = Image.open(io.BytesIO(base64.b64decode(img_b64)))
-        if self.last_image is not None and pil_image is not None:
-            diff = self._image_diff_ratio(self.last_image, pil_image)
-            if diff <= 0.03:
-                if QtWidgets.QMessageBox.question(
-                    self,
-                    t("Warning"),
-                    t("Screenshot looks similar to previous one. Proceed?"),
-                    QtWidgets.QMessageBox.Yes | QtWidgets.QMessageBox.No,
-                ) != QtWidgets.QMessageBox.Yes:
-                    return
-        data = openai_client.identify_image(
-            title,
-            self.language_combo.currentText(),
-            self.report_language,
-            self.api_key,
-            img_b64=img_b64,
-            identify_func=self.identify_func,
-        )
-        self.last_image = pil_image
-        self.last_img_b64 = img_b64
-        self.words = self.parse_words(data)
-        self.update_display()
+        last_image = self.last_image
+
+        def work(task: Task):
+            captured_b64, image = img_b64, pil_image
+            if captured_b64 is None:
+                captured_b64 = openai_client.grab_window_image(title)
+            if image is None and captured_b64 is not None:
+                image = Image.open(io.BytesIO(base64.b64decode(captured_b64)))
+                image.load()
+            diff = None
+            if last_image is not None and image is not None:
+                diff = imaging.image_diff_ratio(last_image, image)
+            return captured_b64, image, diff
+
+        self._start_task(t("Capturing..."), work, lambda captured: self._captured(title, captured, proceed))
+
+    def _captured(self, title: str, captured, proceed) -> None:
+        img_b64, pil_image, diff = captured
+        if diff is not None and diff <= 0.03:
+            if QtWidgets.QMessageBox.question(
+                self,
+                t("Warning"),
+                t("Screenshot looks similar to previous one. Proceed?"),
+                QtWidgets.QMessageBox.Yes | QtWidgets.QMessageBox.No,
+            ) != QtWidgets.QMessageBox.Yes:
+                return
+        proceed(title, img_b64, pil_image)
+
+    def _analyze_all(self, title: str, img_b64: str, pil_image: Image.Image | None) -> None:
+        target_lang = self.language_combo.currentText()
+        learner_level = self.level_combo.currentText()
+        report_language, api_key = self.report_language, self.api_key
+        fetching = t("Fetching details...")
+
+        region = self._changed_region(title, pil_image, img_b64)
+
+        def work(task: Task):
+            send_b64 = region()
+
+            def on_terms(data: dict) -> None:
+                task.relay(self.terms_identified)(data)
+                task.report(fetching)
+
+            return analyze_image(
+                title,
+                target_lang,
+                report_language,
+                api_key,
+                img_b64=send_b64,
+                identify_func=self.identify_func,
+                fetch_func=self.fetch_func,
+                learner_level=learner_level,
+                on_terms=on_terms,
+                on_item=task.relay(self.item_arrived),
+            )
+
+        def done(data: dict) -> None:
+            self.last_image = pil_image
+            self.last_img_b64 = img_b64
+            # Entries were filled in progressively; only rebuild to drop terms
+            # whose details never arrived
+            if any(not e.data for e in self.words) or not self.words:
+                self.words = self.parse_words(data)
+                self.update_display()
+
+        self._start_task(t("Identifying terms..."), work, done)
+
+    def _identify(self, title: str, img_b64: str, pil_image: Image.Image | None) -> None:
+        target_lang = self.language_combo.currentText()
+        report_language, api_key = self.report_language, self.api_key
+        region = self._changed_region(title, pil_image, img_b64)
+
+        def work(task: Task):
+            return openai_client.identify_image(
+                title,
+                target_lang,
+                report_language,
+                api_key,
+                img_b64=region(),
+                identify_func=self.identify_func,
+            )
+
+        def done(data: dict) -> None:
+            self.last_image = pil_image
+            self.last_img_b64 = img_b64
+            self.words = self.parse_words(data)
+            self.update_display()
+            self._enqueue_missing()
+
+        self._start_task(t("Identifying terms..."), work, done)
 
     def open_settings(self):
         dialog = SettingsDialog(self.settings)
@@ -236,10 +569,37 @@ class MainWindow(QtWidgets.QWidget):
             self.report_language = self.settings.get("report_language", "en")
             self.test_mode = self.settings.get("test_mode", False)
             config.current_ui_language = self.settings.get("ui_language", "en")
-            self.identify_func = mock_identify_terms if self.test_mode else None
+            self.identify_func = self._select_identify_func()
             self.fetch_func = mock_fetch_details if self.test_mode else None
+            self.apply_runtime_settings()
             self.refresh_ui_texts()
 
+    def _select_identify_func(self):
+        if self.test_mode:
+            return mock_identify_terms
+        if self.settings.get("identify_engine") == "local":
+            return local_identify_terms
+        return None
+
+    def apply_runtime_settings(self):
+        openai_client.configure(self.settings)
+        local_identify.configure(self.settings)
+        get_identify_cache().threshold = self.settings.get("identify_cache_threshold", DEFAULT_THRESHOLD)
+        self.fetch_queue.batch_size = self.settings.get("background_fetch_batch", DEFAULT_BATCH_SIZE)
+        self.fetch_queue.interval = self.settings.get("background_fetch_interval", DEFAULT_INTERVAL)
+        if self.settings.get("background_fetch", True) and not self.settings.get("background_fetch_paused", False):
+            self.fetch_queue.resume()
+        else:
+            self.fetch_queue.pause()
+
+    def closeEvent(self, event):
+        if self.task is not None:
+            self.task.cancel()
+        self.task_pool.waitForDone(5000)
+        self.fetch_queue.close()
+        self.term_cache.close()
+        super().closeEvent(event)
+
     def refresh_ui_texts(self):
         self.setWindowTitle(t("Screenshot Language Helper"))
         self.label_target_language.setText(t("Target Language"))
@@ -251,43 +611,11 @@ class MainWindow(QtWidgets.QWidget):
         self.view_last_button.setText(t("View the latest screenshot"))
         self.fetch_details_button.setText(t("Fetch Details"))
         self.settings_button.setText(t("Settings"))
+        self.cancel_button.setText(t("Cancel"))
+        self._update_pause_button()
 
     def parse_words(self, data: dict) -> List[WordEntry]:
-        result: List[WordEntry] = []
-        levels = self.languages.get(self.language_combo.currentText(), [])
-        for level_key, info in data.items():
-            try:
-                difficulty = levels.index(level_key) + 1
-            except ValueError:
-                difficulty = len(levels)
-            for vocab in info.get("vocabulary", []):
-                if isinstance(vocab, str):
-                    word = vocab
-                    pos_text = "Unknown"
-                    data = {}
-                else:
-                    word = vocab.get("word", "")
-                    pos = vocab.get("pos", {})
-                    subtype = pos.get('subtype')
-                    label = pos.get('label', 'Unknown')
-                    pos_text = f"{label},{subtype}" if subtype is not None else label
-                    data = vocab
-                result.append(WordEntry(word, difficulty, data, pos=pos_text))
-            for gram in info.get("grammar", []):
-                if isinstance(gram, str):
-                    word = gram
-                    data = {}
-                else:
-                    word = gram.get("grammar_point", "")
-                    data = gram
-                result.append(WordEntry(word, difficulty, data, is_grammar=True))
-        
-        result = sorted(
-            result,
-            key=lambda x: (x.is_grammar, x.pos, x.difficulty)
-        )
-
-        return result
+        return parse_words(data, self.languages.get(self.language_combo.currentText(), []))
 
     def update_display(self):
         level = self.level_combo.currentIndex() + 1
@@ -336,65 +664,263 @@ class MainWindow(QtWidgets.QWidget):
         vbox.addWidget(close_btn, alignment=QtCore.Qt.AlignCenter)
         dialog.exec_()
 
+    def show_statistics(self):
+        """Show percentiles of the recorded telemetry and the API call statistics per stage."""
+        dialog = QtWidgets.QDialog(self)
+        dialog.setWindowTitle(t("Statistics"))
+        dialog.resize(720, 520)
+        vbox = QtWidgets.QVBoxLayout(dialog)
+
+        columns = ["count", "mean", "p50", "p90", "p99"]
+        vbox.addWidget(QtWidgets.QLabel(t("Per-capture Metrics")))
+        summary = telemetry.summary()
+        metrics_table = QtWidgets.QTableWidget(len(summary), len(columns))
+        metrics_table.setHorizontalHeaderLabels(columns)
+        metrics_table.setVerticalHeaderLabels(list(summary))
+        for row, stats in enumerate(summary.values()):
+            for col, column in enumerate(columns):
+                value = stats[column]
+                text = str(int(value)) if column == "count" else f"{value:.1f}"
+                metrics_table.setItem(row, col, QtWidgets.QTableWidgetItem(text))
+        metrics_table.setEditTriggers(QtWidgets.QAbstractItemView.NoEditTriggers)
+        vbox.addWidget(metrics_table)
+
+        vbox.addWidget(QtWidgets.QLabel(t("API Calls This Session")))
+        stage_stats = get_client_manager().stats()
+        fields = sorted({field for stats in stage_stats.values() for field in stats})
+        calls_table = QtWidgets.QTableWidget(len(stage_stats), len(fields))
+        calls_table.setHorizontalHeaderLabels(fields)
+        calls_table.setVerticalHeaderLabels(list(stage_stats))
+        for row, stats in enumerate(stage_stats.values()):
+            for col, field in enumerate(fields):
+                value = stats.get(field, "")
+                text = f"{value:.2f}" if isinstance(value, float) else str(value)
+                calls_table.setItem(row, col, QtWidgets.QTableWidgetItem(text))
+        calls_table.setEditTriggers(QtWidgets.QAbstractItemView.NoEditTriggers)
+        vbox.addWidget(calls_table)
+
+        hedges = get_hedge_policy().stats()
+        vbox.addWidget(QtWidgets.QLabel(
+            t("Hedged identify requests: {hedges} of {requests} ({rate:.0%}), {wins} answered first").format(
+                hedges=hedges["hedges"], requests=hedges["requests"],
+                rate=hedges["hedge_rate"], wins=hedges["hedge_wins"],
+            )
+        ))
+
+        vbox.addWidget(QtWidgets.QLabel(t("Log file: {path}").format(path=telemetry.TELEMETRY_FILE)))
+        close_btn = QtWidgets.QPushButton(t("Close"))
+        close_btn.clicked.connect(dialog.accept)
+        vbox.addWidget(close_btn, alignment=QtCore.Qt.AlignCenter)
+        dialog.exec_()
+
     def fetch_selected_details(self):
+        if self.task is not None:
+            return
         vocab_indexes = self.display_area.vocab_list.selectedIndexes()
         grammar_indexes = self.display_area.grammar_list.selectedIndexes()
 
         vocab_terms = []
-        vocab_entries = []
         for idx in vocab_indexes:
             entry = self.display_area._vocab_entries[idx.row()]
             if not entry.data:
                 vocab_terms.append(entry.word)
-                vocab_entries.append(entry)
 
         grammar_terms = []
-        grammar_entries = []
         for idx in grammar_indexes:
             entry = self.display_area._grammar_entries[idx.row()]
             if not entry.data:
                 grammar_terms.append(entry.word)
-                grammar_entries.append(entry)
 
         if not vocab_terms and not grammar_terms:
             return
 
-        details = openai_client.fetch_details_only(
-            vocab_terms,
-            grammar_terms,
+        target_lang = self.language_combo.currentText()
+        report_language, api_key = self.report_language, self.api_key
+        self._start_task(
+            t("Fetching details..."),
+            lambda task: openai_client.fetch_details_only(
+                vocab_terms,
+                grammar_terms,
+                target_lang,
+                report_language,
+                api_key,
+                fetch_func=self.fetch_func,
+                on_item=task.relay(self.item_arrived),
+            ),
+            self._apply_details,
+        )
+        self._show_item_progress(len(vocab_terms) + len(grammar_terms))
+
+    def toggle_background_fetch(self):
+        self.settings["background_fetch_paused"] = not self.settings.get("background_fetch_paused", False)
+        save_settings(self.settings)
+        self.apply_runtime_settings()
+        self._update_pause_button()
+
+    def _update_pause_button(self):
+        if self.settings.get("background_fetch_paused", False):
+            self.pause_queue_button.setText(t("Resume Background Fetch"))
+        else:
+            self.pause_queue_button.setText(t("Pause Background Fetch"))
+        self.pause_queue_button.setEnabled(self.settings.get("background_fetch", True))
+
+    def _enqueue_missing(self):
+        """Queue the visible terms without details for a background fetch."""
+        if not self.settings.get("background_fetch", True):
+            return
+        level = self.level_combo.currentIndex() + 1
+        missing = [e for e in self.words if not e.data and e.difficulty <= level]
+        self.fetch_queue.enqueue(
+            [e.word for e in missing if not e.is_grammar],
+            [e.word for e in missing if e.is_grammar],
             self.language_combo.currentText(),
             self.report_language,
-            self.api_key,
-            fetch_func=self.fetch_func,
         )
 
-        for item in details.get("vocabulary", []):
+    def _background_fetch(self, vocab: List[str], grammar: List[str], target_lang: str, report_lang: str) -> dict:
+        if not self.api_key and not self.test_mode:
+            raise RuntimeError("API key not provided")
+        return openai_client.fetch_details_only(
+            vocab, grammar, target_lang, report_lang, self.api_key, fetch_func=self.fetch_func
+        )
+
+    def _start_task(self, status: str, func, on_done) -> None:
+        """Run ``func(task)`` on the task pool and pass its result to ``on_done``.
+
+        One task runs at a time: the action buttons are disabled meanwhile and
+        show the busy indicator and the Cancel button instead. Background
+        fetches wait until the task is done.
+        """
+        task = Task(func, guard=self.fetch_queue.interactive)
+        task.signals.progress.connect(lambda text: None if task.cancelled else self.status_label.setText(text))
+        task.signals.finished.connect(lambda result: self._task_finished(task, on_done, result))
+        task.signals.failed.connect(lambda error: self._task_failed(task, error))
+        task.signals.cancelled.connect(lambda: self._task_cancelled(task))
+        self.task = task
+        self._running_tasks.add(task)
+        self._set_busy(True, status)
+        self.task_pool.start(task)
+
+    def cancel_task(self):
+        """Cancel the running task; its late results are dropped.
+
+        A request that is not streamed cannot be interrupted, so the window
+        stays busy until the task has wound down and no new task overlaps it.
+        """
+        if self.task is None or self.task.cancelled:
+            return
+        self.task.cancel()
+        self._set_busy(True, t("Cancelling..."))
+        self.cancel_button.setEnabled(False)
+
+    def _task_cancelled(self, task: Task) -> None:
+        self._running_tasks.discard(task)
+        if task is not self.task:
+            return
+        self.task = None
+        self._set_busy(False, t("Cancelled"))
+
+    def _task_finished(self, task: Task, on_done, result) -> None:
+        if task.cancelled:
+            self._task_cancelled(task)
+            return
+        self._running_tasks.discard(task)
+        if task is not self.task:
+            return
+        self.task = None
+        self._set_busy(False)
+        on_done(result)
+
+    def _task_failed(self, task: Task, error: Exception) -> None:
+        if task.cancelled:
+            self._task_cancelled(task)
+            return
+        self._running_tasks.discard(task)
+        if task is not self.task:
+            return
+        self.task = None
+        self._set_busy(False)
+        QtWidgets.QMessageBox.warning(self, t("Error"), str(error))
+
+    def _set_busy(self, busy: bool, status: str = "") -> None:
+        for button in (
+            self.capture_button,
+            self.analyze_all_button,
+            self.preview_button,
+            self.fetch_details_button,
+            self.settings_button,
+        ):
+            button.setEnabled(not busy)
+        # A zero range shows the busy indicator until the item count is known
+        self.progress_bar.setRange(0, 0)
+        self.progress_bar.setTextVisible(False)
+        self.progress_bar.setVisible(busy)
+        self.cancel_button.setVisible(busy)
+        self.cancel_button.setEnabled(busy)
+        self.status_label.setText(status)
+
+    def _show_item_progress(self, total: int) -> None:
+        """Switch the running task's progress bar to counting ``total`` fetched items."""
+        if self.task is None or not total:
+            return
+        self.progress_bar.setRange(0, total)
+        self.progress_bar.setValue(0)
+        self.progress_bar.setTextVisible(True)
+
+    def _on_terms_identified(self, data: dict):
+        self.words = self.parse_words(data)
+        self.update_display()
+        self._show_item_progress(sum(1 for e in self.words if not e.data))
+
+    def _on_item_arrived(self, kind: str, item: dict):
+        if self.task is not None and self.progress_bar.maximum():
+            self.progress_bar.setValue(min(self.progress_bar.maximum(), self.progress_bar.value() + 1))
+        if self._apply_item(kind, item):
+            self.display_area.refresh_entries()
+
+    def _apply_item(self, kind: str, item: dict) -> bool:
+        """Attach a fetched detail item to the matching entries."""
+        updated = False
+        if kind == "vocabulary":
             word = item.get("word")
-            for e in vocab_entries:
-                if e.word == word:
+            for e in self.words:
+                if not e.is_grammar and e.word == word:
                     e.data = item
                     e.description = item.get("definition", "")
                     pos = item.get("pos", {})
                     subtype = pos.get("subtype")
                     label = pos.get("label", "Unknown")
                     e.pos = f"{label},{subtype}" if subtype is not None else label
-        for item in details.get("grammar", []):
+                    updated = True
+        elif kind == "grammar":
             point = item.get("grammar_point")
-            for e in grammar_entries:
-                if e.word == point:
+            for e in self.words:
+                if e.is_grammar and e.word == point:
                     e.data = item
-
-        self.update_display()
-
-    @staticmethod
-    def _image_diff_ratio(img1: Image.Image, img2: Image.Image) -> float:
-        img1 = img1.convert("RGB")
-        img2 = img2.convert("RGB")
-        if img1.size != img2.size:
-            img2 = img2.resize(img1.size)
-        diff = ImageChops.difference(img1, img2)
-        hist = diff.histogram()
-        sq = sum(i * hist[i] for i in range(len(hist)))
-        max_diff = 255 * img1.size[0] * img1.size[1] * 3
-        return sq / max_diff
-
+                    updated = True
+        return updated
+
+    def _apply_details(self, details: dict):
+        for kind in ("vocabulary", "grammar"):
+            for item in details.get(kind, []):
+                self._apply_item(kind, item)
+        self.display_area.refresh_entries()
+
+    def _changed_region(self, title: str, pil_image: Image.Image | None, img_b64: str) -> Callable[[], str]:
+        """Return a function that computes the image to identify on the worker.
+
+        The delta capture settings and the last capture are read here, on the
+        GUI thread; see :func:`imaging.changed_region`. The full frame is used
+        when delta capture is off.
+        """
+        if not self.settings.get("delta_capture", False) or pil_image is None:
+            return lambda: img_b64
+        return functools.partial(
+            imaging.changed_region,
+            pil_image,
+            img_b64,
+            self.last_image,
+            self.settings.get("delta_padding", 16),
+            self.settings.get("delta_max_area", 0.5),
+            imaging.options_for(title),
+        )
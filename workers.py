@@ -0,0 +1,81 @@
+"""Run capture, identify and fetch work on a Qt thread pool.
+
+A :class:`Task` runs its function on a pool thread inside a
+:func:`cancellation.cancel_scope`, so :meth:`Task.cancel` interrupts the
+API calls, retries and streams below it. Results, errors and progress come
+back through the signals of :class:`TaskSignals`, which Qt queues onto the
+GUI thread.
+"""
+import logging
+from contextlib import nullcontext
+from typing import Any, Callable, ContextManager, Optional
+
+from PyQt5 import QtCore
+
+import cancellation
+from cancellation import Cancelled, CancelToken
+
+logger = logging.getLogger(__name__)
+
+
+class TaskSignals(QtCore.QObject):
+    progress = QtCore.pyqtSignal(str)
+    finished = QtCore.pyqtSignal(object)
+    failed = QtCore.pyqtSignal(object)
+    cancelled = QtCore.pyqtSignal()
+
+
+class Task(QtCore.QRunnable):
+    """Run ``func(task)`` on a pool thread and emit exactly one of
+    ``finished(result)``, ``failed(error)`` or ``cancelled()``.
+
+    ``guard`` returns a context manager held while ``func`` runs, e.g.
+    :meth:`fetch_queue.FetchQueue.interactive`. Errors raised after
+    :meth:`cancel`, such as reads from a closed stream, count as cancelled.
+    """
+
+    def __init__(self, func: Callable[["Task"], Any], guard: Optional[Callable[[], ContextManager]] = None):
+        super().__init__()
+        # The owner keeps the task alive until one of the final signals
+        self.setAutoDelete(False)
+        self.func = func
+        self.guard = guard
+        self.token = CancelToken()
+        self.signals = TaskSignals()
+
+    def cancel(self) -> None:
+        self.token.cancel()
+
+    @property
+    def cancelled(self) -> bool:
+        return self.token.cancelled
+
+    def report(self, text: str) -> None:
+        """Emit ``progress(text)``; raises :class:`Cancelled` once cancelled."""
+        self.token.check()
+        self.signals.progress.emit(text)
+
+    def relay(self, signal) -> Callable[..., None]:
+        """Return a callback that emits ``signal`` until the task is cancelled."""
+
+        def emit(*args) -> None:
+            if not self.token.cancelled:
+                signal.emit(*args)
+
+        return emit
+
+    def run(self) -> None:
+        try:
+            with self.guard() if self.guard else nullcontext(), cancellation.cancel_scope(self.token):
+                result = self.func(self)
+                self.token.check()
+        except Cancelled:
+            self.signals.cancelled.emit()
+        except Exception as e:
+            if self.token.cancelled:
+                self.signals.cancelled.emit()
+            else:
+                logger.debug("Task failed: %s", e, exc_info=True)
+                self.signals.failed.emit(e)
+        else:
+            self.signals.finished.emit(result)